@@ -0,0 +1,80 @@
+import pandas
+import pytest
+
+from nato_encoder import CSV_PATH, NatoEncoder, main
+
+
+@pytest.fixture(scope="module")
+def encoder() -> NatoEncoder:
+    return NatoEncoder()
+
+
+def iterrows_table() -> dict:
+    """The table built by the original main.py."""
+    data = pandas.read_csv(CSV_PATH)
+    return {row.letter: row.code for (_, row) in data.iterrows()}
+
+
+def test_letters_match_original_table(encoder: NatoEncoder) -> None:
+    original = iterrows_table()
+    for word in ("PYTHON", "Alphabet", "phonetic", "benchmark"):
+        assert encoder.encode(word) == [original[letter] for letter in word.upper()]
+
+
+def test_digits_punctuation_and_unknown_characters(encoder: NatoEncoder) -> None:
+    assert encoder.encode("a3!") == ["Alfa", "Tree", "Exclamation"]
+    assert encoder.encode("é") == ["É"]
+
+
+def test_encode_line_joins_code_words(encoder: NatoEncoder) -> None:
+    for line in ("Hi 5?", "x", "é1", ""):
+        assert encoder.encode_line(line) == " ".join(encoder.encode(line))
+
+
+def test_encode_block_keeps_line_breaks(encoder: NatoEncoder) -> None:
+    assert encoder.encode_block("ab\ncd\n") == "Alfa Bravo\nCharlie Delta\n"
+    assert encoder.encode_block("ab\r\ncd\n") == "Alfa Bravo\nCharlie Delta\n"
+
+
+def test_custom_separator() -> None:
+    encoder = NatoEncoder(separator="-")
+    assert encoder.encode_line("ab") == "Alfa-Bravo"
+    assert encoder.encode_block("ab\nc\n") == "Alfa-Bravo\nCharlie\n"
+
+
+def test_encode_file_writes_one_line_per_word(encoder: NatoEncoder, tmp_path) -> None:
+    words = [f"word{i}" for i in range(1000)]
+    source = tmp_path / "words.txt"
+    destination = tmp_path / "words.nato"
+    source.write_text("\n".join(words), encoding="utf-8")  # no final newline
+
+    # A small chunk size makes the lines span many chunks
+    count = encoder.encode_file(str(source), str(destination), chunk_size=64)
+
+    assert count == len(words)
+    assert destination.read_text(encoding="utf-8").splitlines() == [encoder.encode_line(word) for word in words]
+
+
+def test_empty_separator() -> None:
+    encoder = NatoEncoder(separator="")
+    assert encoder.encode_line("ab") == "AlfaBravo"
+    assert encoder.encode_line("é") == "É"
+    assert encoder.encode_block("ab\nc\n") == "AlfaBravo\nCharlie\n"
+
+
+def test_unknown_characters_do_not_grow_the_table_without_limit() -> None:
+    encoder = NatoEncoder()
+    known = len(encoder._line_translation)
+    text = "".join(chr(code) for code in range(0x4E00, 0x4E00 + 20_000))
+    assert encoder.encode_block(text + "\n") == " ".join(text) + "\n"
+    assert known < len(encoder._line_translation) <= encoder._line_translation.max_size
+
+
+def test_main_reports_throughput_against_iterrows(tmp_path, capsys) -> None:
+    source = tmp_path / "words.txt"
+    source.write_text("\n".join(f"word{i}" for i in range(2000)) + "\n", encoding="utf-8")
+    main([str(source)])
+    out = capsys.readouterr().out
+    assert "Encoded 2,000 lines" in out
+    assert "iterrows comprehension:" in out and "x faster" in out
+    assert (tmp_path / "words.txt.nato").read_text(encoding="utf-8").startswith("Whiskey Oscar Romeo Delta Zero\n")
@@ -0,0 +1,78 @@
+import math
+import time
+from typing import Callable, Optional
+
+AfterFunc = Callable[..., str]
+CancelFunc = Callable[[str], None]
+
+
+class DeadlineCountdown:
+    """Count down to a monotonic-clock deadline without accumulating drift.
+
+    The remaining time is always recomputed from ``clock()`` instead of being
+    decremented per tick, so late callbacks never push the deadline back.
+    Only one timer is pending at a time and it is scheduled for the instant the
+    displayed second changes, so the Tk loop wakes once per displayed second.
+    """
+
+    def __init__(
+        self,
+        after: AfterFunc,
+        after_cancel: CancelFunc,
+        on_tick: Callable[[int], None],
+        on_finish: Callable[[], None],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize with Tk-style after/after_cancel and display callbacks."""
+        self._after = after
+        self._after_cancel = after_cancel
+        self._on_tick = on_tick
+        self._on_finish = on_finish
+        self._clock = clock
+        self.deadline: Optional[float] = None
+        self.timer: Optional[str] = None
+        self._shown: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        """Return True while a countdown is in progress."""
+        return self.timer is not None
+
+    def start(self, duration: int, chain: bool = False) -> None:
+        """Start counting down duration seconds.
+
+        With chain=True the new deadline is measured from the previous deadline
+        rather than from now, so back-to-back sessions do not drift either.
+        """
+        self.cancel()
+        base = self.deadline if chain and self.deadline is not None else self._clock()
+        self.deadline = base + duration
+        self._shown = None
+        self._tick()
+
+    def cancel(self) -> None:
+        """Cancel the pending timer, if any."""
+        if self.timer is not None:
+            self._after_cancel(self.timer)
+            self.timer = None
+
+    def remaining(self) -> float:
+        """Return the seconds left until the deadline (never negative)."""
+        if self.deadline is None:
+            return 0.0
+        return max(self.deadline - self._clock(), 0.0)
+
+    def _tick(self) -> None:
+        """Redraw if the displayed second changed and sleep until the next change."""
+        self.timer = None
+        remaining = self.remaining()
+        shown = math.ceil(remaining)
+        if shown != self._shown:
+            self._shown = shown
+            self._on_tick(shown)
+        if remaining <= 0:
+            self._on_finish()
+            return
+        # The display changes when remaining drops to shown - 1.
+        delay_ms = max(math.ceil((remaining - (shown - 1)) * 1000), 1)
+        self.timer = self._after(delay_ms, self._tick)
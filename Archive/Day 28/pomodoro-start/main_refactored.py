@@ -1,8 +1,9 @@
 import tkinter as tk
 import math
-from typing import Optional
 import os
 
+from countdown import DeadlineCountdown
+
 
 class PomodoroTimer:
     """Pomodoro Timer Application using Tkinter."""
@@ -20,8 +21,13 @@ class PomodoroTimer:
     def __init__(self) -> None:
         """Initialize the Pomodoro Timer application."""
         self.reps = 0
-        self.timer: Optional[str] = None
         self.window = tk.Tk()
+        self.countdown = DeadlineCountdown(
+            self.window.after,
+            self.window.after_cancel,
+            on_tick=self.count_down,
+            on_finish=self._finish_session,
+        )
         self.setup_window()
         self.create_widgets()
         self.layout_widgets()
@@ -131,17 +137,18 @@ class PomodoroTimer:
     
     def reset_timer(self) -> None:
         """Reset the timer to initial state."""
-        if self.timer is not None:
-            self.window.after_cancel(self.timer)
-            self.timer = None
+        self.countdown.cancel()
         
         self.canvas.itemconfig(self.timer_text, text="00:00")
         self.title_label.config(text="Timer", fg=self.GREEN)
         self.check_marks.config(text="")
         self.reps = 0
     
-    def start_timer(self) -> None:
-        """Start the timer based on current repetition."""
+    def start_timer(self, chain: bool = False) -> None:
+        """Start the timer based on current repetition.
+
+        chain=True starts the next session from the previous deadline.
+        """
         self.reps += 1
         
         work_sec = self.WORK_MIN * 60
@@ -150,21 +157,21 @@ class PomodoroTimer:
         
         if self.reps % 8 == 0:
             # Long break after 4 work sessions
-            self._start_countdown(long_break_sec, "Long Break", self.RED)
+            self._start_countdown(long_break_sec, "Long Break", self.RED, chain)
         elif self.reps % 2 == 0:
             # Short break after work session
-            self._start_countdown(short_break_sec, "Short Break", self.PINK)
+            self._start_countdown(short_break_sec, "Short Break", self.PINK, chain)
         else:
             # Work session
-            self._start_countdown(work_sec, "Work", self.GREEN)
+            self._start_countdown(work_sec, "Work", self.GREEN, chain)
     
-    def _start_countdown(self, duration: int, title: str, color: str) -> None:
+    def _start_countdown(self, duration: int, title: str, color: str, chain: bool = False) -> None:
         """Start countdown with given duration and update UI."""
         self.title_label.config(text=title, fg=color)
-        self.count_down(duration)
+        self.countdown.start(duration, chain=chain)
     
     def count_down(self, count: int) -> None:
-        """Countdown mechanism."""
+        """Redraw the timer; called by the countdown when the second changes."""
         count_min = math.floor(count / 60)
         count_sec = count % 60
         
@@ -173,14 +180,11 @@ class PomodoroTimer:
         
         # Update timer display
         self.canvas.itemconfig(self.timer_text, text=f"{count_min}:{count_sec_str}")
-        
-        if count > 0:
-            # Continue countdown
-            self.timer = self.window.after(1000, self.count_down, count - 1)
-        else:
-            # Timer finished, start next session and update check marks
-            self.start_timer()
-            self._update_check_marks()
+    
+    def _finish_session(self) -> None:
+        """Start the next session and update check marks."""
+        self.start_timer(chain=True)
+        self._update_check_marks()
     
     def _update_check_marks(self) -> None:
         """Update check marks based on completed work sessions."""
@@ -0,0 +1,141 @@
+import heapq
+import itertools
+import random
+from typing import Any, Callable, Dict, List, Tuple
+
+from countdown import DeadlineCountdown
+
+SESSION_SEC = 25 * 60
+MAX_COST = 0.02
+
+
+class FakeClock:
+    """Manually advanced clock standing in for time.monotonic."""
+
+    def __init__(self, start: float = 1000.0) -> None:
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeScheduler:
+    """Tk-style after/after_cancel driven by a FakeClock.
+
+    Each callback fires a random latency after its due time, modelling the
+    wake-up delay and redraw work a real Tk tick pays before calling after().
+    """
+
+    def __init__(self, clock: FakeClock, max_cost: float = MAX_COST, seed: int = 0) -> None:
+        self.clock = clock
+        self.max_cost = max_cost
+        self.wakeups = 0
+        self._random = random.Random(seed)
+        self._queue: List[Tuple[float, int, str]] = []
+        self._callbacks: Dict[str, Tuple[Callable[..., Any], Tuple[Any, ...]]] = {}
+        self._ids = itertools.count()
+
+    def after(self, ms: int, func: Callable[..., Any], *args: Any) -> str:
+        seq = next(self._ids)
+        timer_id = f"after#{seq}"
+        heapq.heappush(self._queue, (self.clock.now + ms / 1000, seq, timer_id))
+        self._callbacks[timer_id] = (func, args)
+        return timer_id
+
+    def after_cancel(self, timer_id: str) -> None:
+        self._callbacks.pop(timer_id, None)
+
+    def run_until(self, end: float) -> None:
+        """Fire every pending callback due before end."""
+        while self._queue and self._queue[0][0] <= end:
+            due, _, timer_id = heapq.heappop(self._queue)
+            callback = self._callbacks.pop(timer_id, None)
+            if callback is None:
+                continue
+            self.clock.now = max(self.clock.now, due) + self._random.uniform(0, self.max_cost)
+            self.wakeups += 1
+            func, args = callback
+            func(*args)
+
+
+def run_sessions(hours: float = 8) -> Dict[str, Any]:
+    """Run back-to-back chained sessions and record when each one finished."""
+    clock = FakeClock()
+    scheduler = FakeScheduler(clock)
+    start = clock.now
+    sessions = int(hours * 3600 // SESSION_SEC)
+    finished_at: List[float] = []
+    state = {"ticks": 0, "max_lag": 0.0}
+
+    def on_tick(shown: int) -> None:
+        state["ticks"] += 1
+        # The ideal moment the display should have switched to `shown`
+        ideal = countdown.deadline - shown
+        state["max_lag"] = max(state["max_lag"], clock.now - ideal)
+
+    def on_finish() -> None:
+        finished_at.append(clock.now)
+        if len(finished_at) < sessions:
+            countdown.start(SESSION_SEC, chain=True)
+
+    countdown = DeadlineCountdown(scheduler.after, scheduler.after_cancel, on_tick, on_finish, clock)
+    countdown.start(SESSION_SEC)
+    scheduler.run_until(start + hours * 3600 + 60)
+    return {
+        "ideal": [start + (i + 1) * SESSION_SEC for i in range(sessions)],
+        "finished_at": finished_at,
+        "max_display_lag": state["max_lag"],
+        "wakeups_per_tick": scheduler.wakeups / state["ticks"],
+    }
+
+
+def test_sessions_finish_on_schedule_despite_jitter() -> None:
+    result = run_sessions()
+
+    assert len(result["finished_at"]) == len(result["ideal"]) == 19
+    lateness = [actual - ideal for actual, ideal in zip(result["finished_at"], result["ideal"])]
+    # Each finish is late by at most one wake-up (1 ms rounding plus jitter)
+    # and the lateness does not build up over eight hours.
+    assert all(0 <= late <= MAX_COST + 0.001 for late in lateness)
+
+
+def test_display_changes_once_per_second_and_on_time() -> None:
+    result = run_sessions(hours=1)
+
+    assert result["max_display_lag"] <= MAX_COST + 0.001
+    assert result["wakeups_per_tick"] < 1.01
+
+
+def test_after_1000_countdown_drifts() -> None:
+    # The original countdown re-armed after(1000) on every tick
+    clock = FakeClock()
+    scheduler = FakeScheduler(clock)
+    start = clock.now
+    total = 8 * 3600
+
+    def count_down(count: int) -> None:
+        if count > 0:
+            scheduler.after(1000, count_down, count - 1)
+
+    count_down(total)
+    scheduler.run_until(float("inf"))
+
+    assert clock.now - (start + total) > 100
+
+
+def test_cancel_stops_the_countdown() -> None:
+    clock = FakeClock()
+    scheduler = FakeScheduler(clock, max_cost=0)
+    shown: List[int] = []
+    finished: List[bool] = []
+    countdown = DeadlineCountdown(scheduler.after, scheduler.after_cancel, shown.append, lambda: finished.append(True), clock)
+
+    countdown.start(5)
+    scheduler.run_until(clock.now + 2)
+    countdown.cancel()
+    scheduler.run_until(float("inf"))
+
+    assert shown == [5, 4, 3]
+    assert not finished
+    assert not countdown.running
+    assert 2.9 < countdown.remaining() <= 3
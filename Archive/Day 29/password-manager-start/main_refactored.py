@@ -1,9 +1,10 @@
 import tkinter as tk
-from tkinter import messagebox
-from random import choice, randint, shuffle
+from tkinter import messagebox, simpledialog
 from typing import Optional
 import os
-import string
+
+from password_generator import PasswordGenerator
+from vault import PasswordVault, VaultError
 
 
 class PasswordManager:
@@ -16,11 +17,15 @@ class PasswordManager:
     ENTRY_WIDTH = 36
     PASSWORD_ENTRY_WIDTH = 21
     DATA_FILE = "secret.txt"
+    VAULT_FILE = "vault"
     LOGO_FILE = "logo.png"
+    MAX_PASSWORD_ATTEMPTS = 3
 
     def __init__(self) -> None:
         """Initialize the Password Manager application."""
         self.window = tk.Tk()
+        self.vault = self._open_vault()
+        self.password_generator = PasswordGenerator()
 
         # Initialize widgets as None first, then create them
         self.canvas: tk.Canvas
@@ -39,6 +44,7 @@ class PasswordManager:
         # Button widgets
         self.generate_password_button: tk.Button
         self.add_button: tk.Button
+        self.search_button: tk.Button
 
         self._setup_window()
         self._create_widgets()
@@ -48,6 +54,48 @@ class PasswordManager:
         """Configure the main window."""
         self.window.title(self.WINDOW_TITLE)
         self.window.config(padx=self.WINDOW_PADDING, pady=self.WINDOW_PADDING)
+        self.window.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _open_vault(self) -> PasswordVault:
+        """Ask for the master password and open the vault, importing secret.txt once."""
+        self.window.withdraw()
+        is_new = not os.path.exists(self.VAULT_FILE + PasswordVault.META_SUFFIX)
+        for _ in range(self.MAX_PASSWORD_ATTEMPTS):
+            master_password = simpledialog.askstring(
+                "Master Password", "Enter your master password:", show="*", parent=self.window
+            )
+            if not master_password:
+                break
+            if is_new:
+                # A typo here would lock the user out of every imported entry
+                confirmation = simpledialog.askstring(
+                    "Master Password", "Confirm your master password:", show="*", parent=self.window
+                )
+                if confirmation != master_password:
+                    messagebox.showerror("Error", "The passwords do not match.")
+                    continue
+            try:
+                vault = PasswordVault(self.VAULT_FILE, master_password)
+            except VaultError as e:
+                messagebox.showerror("Error", str(e))
+                continue
+            if is_new and os.path.exists(self.DATA_FILE):
+                self._import_data_file(vault)
+            self.window.deiconify()
+            return vault
+        self.window.destroy()
+        raise SystemExit("Vault not opened")
+
+    def _import_data_file(self, vault: PasswordVault) -> None:
+        """Move the plaintext secret.txt into the vault and delete it."""
+        imported = vault.import_text_file(self.DATA_FILE)
+        os.remove(self.DATA_FILE)
+        messagebox.showinfo(
+            "Import",
+            f"Imported {imported} entries from {self.DATA_FILE} into the encrypted vault.\n"
+            f"The plaintext {self.DATA_FILE} has been deleted.",
+            parent=self.window,
+        )
 
     def _create_widgets(self) -> None:
         """Create all GUI widgets."""
@@ -98,7 +146,7 @@ class PasswordManager:
 
     def _create_entries(self) -> None:
         """Create all entry widgets."""
-        self.website_entry = tk.Entry(width=self.ENTRY_WIDTH)
+        self.website_entry = tk.Entry(width=self.PASSWORD_ENTRY_WIDTH)
         self.email_entry = tk.Entry(width=self.ENTRY_WIDTH)
         self.password_entry = tk.Entry(width=self.PASSWORD_ENTRY_WIDTH, show="*")
 
@@ -113,6 +161,7 @@ class PasswordManager:
         self.add_button = tk.Button(
             text="Add", width=self.ENTRY_WIDTH, command=self.save_password
         )
+        self.search_button = tk.Button(text="Search", width=13, command=self.search_password)
 
     def _setup_layout(self) -> None:
         """Configure the grid layout for all widgets."""
@@ -125,33 +174,21 @@ class PasswordManager:
         self.password_label.grid(column=0, row=3)
 
         # Entries
-        self.website_entry.grid(column=1, row=1, columnspan=2)
+        self.website_entry.grid(column=1, row=1)
         self.website_entry.focus()
         self.email_entry.grid(column=1, row=2, columnspan=2)
         self.password_entry.grid(column=1, row=3)
 
         # Buttons
+        self.search_button.grid(column=2, row=1)
         self.generate_password_button.grid(column=2, row=3)
         self.add_button.grid(column=1, row=4, columnspan=2)
 
     def generate_password(self) -> None:
         """Generate a secure random password and insert it into the password entry."""
         try:
-            # Use string module for cleaner character sets
-            letters = string.ascii_letters
-            numbers = string.digits
-            symbols = "!#$%&()*+"
-
-            # Generate password components
-            password_letters = [choice(letters) for _ in range(randint(8, 10))]
-            password_symbols = [choice(symbols) for _ in range(randint(2, 4))]
-            password_numbers = [choice(numbers) for _ in range(randint(2, 4))]
-
-            # Combine and shuffle
-            password_list = password_letters + password_symbols + password_numbers
-            shuffle(password_list)
-
-            password = "".join(password_list)
+            # 8-10 letters, 2-4 symbols and 2-4 numbers from a CSPRNG
+            password = self.password_generator.generate_random_counts()
 
             # Update password entry
             self.password_entry.delete(0, tk.END)
@@ -213,11 +250,29 @@ class PasswordManager:
             f"Do you want to save this?",
         )
 
+    def search_password(self) -> None:
+        """Show the stored credentials for the website entry."""
+        website = self.website_entry.get().strip()
+        if not website:
+            messagebox.showwarning("Missing Information", "Please enter a website to search.")
+            return
+        try:
+            entries = self.vault.find(website)
+        except VaultError as e:
+            messagebox.showerror("Error", f"Failed to read vault: {e}")
+            return
+        if not entries:
+            messagebox.showinfo("Not Found", f"No details for {website} exist.")
+            return
+        details = "\n\n".join(
+            f"Email: {entry.email}\nPassword: {entry.password}" for entry in entries
+        )
+        messagebox.showinfo(title=website, message=details)
+
     def _save_to_file(self, website: str, email: str, password: str) -> bool:
-        """Save password data to file with error handling."""
+        """Save password data to the encrypted vault with error handling."""
         try:
-            with open(self.DATA_FILE, "a", encoding="utf-8") as data_file:
-                data_file.write(f"{website} | {email} | {password}\n")
+            self.vault.add(website, email, password)
             return True
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save password: {e}")
@@ -229,6 +284,11 @@ class PasswordManager:
         self.password_entry.delete(0, tk.END)
         self.website_entry.focus()
 
+    def _on_close(self) -> None:
+        """Compact and close the vault before quitting."""
+        self.vault.close()
+        self.window.destroy()
+
     def run(self) -> None:
         """Start the application main loop."""
         self.window.mainloop()
@@ -0,0 +1,111 @@
+"""Cryptographically secure bulk password generator.
+
+Random bytes come from ``os.urandom`` in large blocks. Each character class is
+sampled without modulo bias by rejection: bytes at or above the largest
+multiple of the alphabet size are dropped, the rest are mapped with ``% size``.
+Both steps run in C through a single ``bytes.translate`` call. Class counts are
+guaranteed by construction and the characters are then shuffled.
+
+Single passwords (the GUI path) need only the standard library. numpy is
+optional and only speeds up ``generate_batch``.
+"""
+
+import os
+import secrets
+import string
+from typing import List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # generate_batch falls back to one password at a time
+    np = None
+
+LETTERS = string.ascii_letters
+NUMBERS = string.digits
+SYMBOLS = "!#$%&()*+"
+
+
+class CharacterClass:
+    """An alphabet that can be sampled uniformly from random bytes."""
+
+    def __init__(self, alphabet: str) -> None:
+        """Precompute the byte translation table used for rejection sampling."""
+        if not 0 < len(alphabet) <= 256 or not alphabet.isascii():
+            raise ValueError("alphabet must contain 1-256 ASCII characters")
+        self.alphabet = alphabet
+        size = len(alphabet)
+        self._limit = 256 - 256 % size
+        encoded = alphabet.encode("ascii")
+        self._table = bytes(encoded[b % size] if b < self._limit else 0 for b in range(256))
+        self._rejected = bytes(range(self._limit, 256))
+
+    def sample(self, count: int) -> bytes:
+        """Return count uniformly distributed characters as ASCII bytes."""
+        chunks = []
+        needed = count
+        while needed > 0:
+            # Over-draw by the expected rejection rate plus a little slack.
+            draw = needed * 256 // self._limit + 64
+            chunk = os.urandom(draw).translate(self._table, self._rejected)
+            chunks.append(chunk[:needed])
+            needed -= len(chunks[-1])
+        return b"".join(chunks)
+
+
+class PasswordGenerator:
+    """Generate passwords with exact per-class character counts."""
+
+    def __init__(
+        self, letters: str = LETTERS, symbols: str = SYMBOLS, numbers: str = NUMBERS
+    ) -> None:
+        """Initialize the character classes."""
+        self.classes = (
+            CharacterClass(letters),
+            CharacterClass(symbols),
+            CharacterClass(numbers),
+        )
+
+    def generate_batch(
+        self, count: int, nr_letters: int, nr_symbols: int, nr_numbers: int
+    ) -> List[str]:
+        """Return count passwords, each with exactly the requested class counts."""
+        counts = (nr_letters, nr_symbols, nr_numbers)
+        length = sum(counts)
+        if count <= 0 or length == 0:
+            return [""] * max(count, 0)
+        if np is None:
+            return [self.generate(*counts) for _ in range(count)]
+        columns = [
+            np.frombuffer(char_class.sample(count * n), dtype=np.uint8).reshape(count, n)
+            for char_class, n in zip(self.classes, counts)
+        ]
+        chars = np.concatenate(columns, axis=1)
+        # A uniform random permutation per row: argsort of 64-bit random keys.
+        keys = np.frombuffer(os.urandom(count * length * 8), dtype=np.uint64)
+        order = np.argsort(keys.reshape(count, length), axis=1, kind="stable")
+        shuffled = np.take_along_axis(chars, order, axis=1)
+        blob = shuffled.tobytes().decode("ascii")
+        return [blob[i : i + length] for i in range(0, len(blob), length)]
+
+    def generate(self, nr_letters: int, nr_symbols: int, nr_numbers: int) -> str:
+        """Return a single password with the requested class counts."""
+        chars = bytearray()
+        for char_class, n in zip(self.classes, (nr_letters, nr_symbols, nr_numbers)):
+            chars += char_class.sample(n)
+        # Fisher-Yates shuffle driven by the CSPRNG
+        for i in range(len(chars) - 1, 0, -1):
+            j = secrets.randbelow(i + 1)
+            chars[i], chars[j] = chars[j], chars[i]
+        return chars.decode("ascii")
+
+    def generate_random_counts(
+        self,
+        letters_range: Tuple[int, int] = (8, 10),
+        symbols_range: Tuple[int, int] = (2, 4),
+        numbers_range: Tuple[int, int] = (2, 4),
+    ) -> str:
+        """Return a password whose class counts are drawn from inclusive ranges."""
+        counts = [low + secrets.randbelow(high - low + 1) for low, high in (
+            letters_range, symbols_range, numbers_range
+        )]
+        return self.generate(*counts)
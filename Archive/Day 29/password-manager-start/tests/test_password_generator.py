@@ -0,0 +1,127 @@
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Iterable, List, Sequence
+
+import pytest
+
+from password_generator import LETTERS, NUMBERS, SYMBOLS, CharacterClass, PasswordGenerator
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Standard normal quantile for a one-sided p of 1e-6: a uniform generator
+# fails a single check about once in a million runs
+Z_CRITICAL = 4.753
+
+
+def chi_square_critical(dof: int) -> float:
+    """Upper critical value of chi-square (Wilson-Hilferty approximation)."""
+    h = 2 / (9 * dof)
+    return dof * (1 - h + Z_CRITICAL * math.sqrt(h)) ** 3
+
+
+def assert_uniform(counts: Iterable[int]) -> None:
+    counts = list(counts)
+    expected = sum(counts) / len(counts)
+    statistic = sum((count - expected) ** 2 / expected for count in counts)
+    assert statistic < chi_square_critical(len(counts) - 1)
+
+
+def class_counts(passwords: Sequence[str], alphabet: str) -> Counter:
+    return Counter(char for password in passwords for char in password if char in alphabet)
+
+
+def test_character_class_rejects_bad_alphabets() -> None:
+    with pytest.raises(ValueError):
+        CharacterClass("")
+    with pytest.raises(ValueError):
+        CharacterClass("é")
+
+
+def test_sample_is_uniform_when_size_does_not_divide_256() -> None:
+    # 256 % 3 == 1: a plain modulo would favour "a"
+    sample = CharacterClass("abc").sample(300_000)
+    assert len(sample) == 300_000
+    assert_uniform(Counter(sample).values())
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_exact_class_counts(batch: bool) -> None:
+    generator = PasswordGenerator()
+    passwords = generator.generate_batch(1000, 10, 3, 3) if batch else [generator.generate(10, 3, 3) for _ in range(1000)]
+    for password in passwords:
+        assert len(password) == 16
+        assert sum(char in LETTERS for char in password) == 10
+        assert sum(char in SYMBOLS for char in password) == 3
+        assert sum(char in NUMBERS for char in password) == 3
+
+
+def test_random_counts_stay_in_range() -> None:
+    generator = PasswordGenerator()
+    for _ in range(200):
+        password = generator.generate_random_counts()
+        assert 8 <= sum(char in LETTERS for char in password) <= 10
+        assert 2 <= sum(char in SYMBOLS for char in password) <= 4
+        assert 2 <= sum(char in NUMBERS for char in password) <= 4
+
+
+def test_empty_batches() -> None:
+    generator = PasswordGenerator()
+    assert generator.generate_batch(0, 10, 3, 3) == []
+    assert generator.generate_batch(2, 0, 0, 0) == ["", ""]
+    assert generator.generate(0, 0, 0) == ""
+
+
+@pytest.fixture(scope="module", params=["single", "batch"])
+def passwords(request) -> List[str]:
+    generator = PasswordGenerator()
+    if request.param == "batch":
+        return generator.generate_batch(200_000, 10, 3, 3)
+    return [generator.generate(10, 3, 3) for _ in range(20_000)]
+
+
+@pytest.mark.parametrize("alphabet", [LETTERS, SYMBOLS, NUMBERS])
+def test_characters_and_positions_are_uniform(passwords: List[str], alphabet: str) -> None:
+    counts = class_counts(passwords, alphabet)
+    assert_uniform(counts[char] for char in alphabet)
+    # After the shuffle every class is equally likely at every position
+    assert_uniform(sum(password[i] in alphabet for password in passwords) for i in range(16))
+
+
+def test_single_passwords_do_not_need_numpy() -> None:
+    code = (
+        "import sys; sys.modules['numpy'] = None\n"
+        "import password_generator as p\n"
+        "assert p.np is None\n"
+        "print(p.PasswordGenerator().generate(10, 3, 3), len(p.PasswordGenerator().generate_batch(5, 10, 3, 3)))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_DIR, capture_output=True, text=True, check=True)
+    password, batch = result.stdout.split()
+    assert len(password) == 16 and batch == "5"
+
+
+def random_choice_password(counts: Sequence[int]) -> str:
+    """The generator this module replaced: random.choice per character, then shuffle."""
+    chars = [random.choice(alphabet) for alphabet, n in zip((LETTERS, SYMBOLS, NUMBERS), counts) for _ in range(n)]
+    random.shuffle(chars)
+    return "".join(chars)
+
+
+@pytest.mark.slow
+def test_batch_throughput() -> None:
+    counts = (10, 3, 3)
+    start = time.perf_counter()
+    passwords = PasswordGenerator().generate_batch(1_000_000, *counts)
+    batch_rate = len(passwords) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(100_000):
+        random_choice_password(counts)
+    baseline_rate = 100_000 / (time.perf_counter() - start)
+
+    print(f"\ngenerate_batch: {batch_rate:,.0f}/s, random.choice + shuffle: {baseline_rate:,.0f}/s")
+    assert len(passwords) == 1_000_000
+    assert batch_rate > baseline_rate
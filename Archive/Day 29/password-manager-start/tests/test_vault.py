@@ -0,0 +1,125 @@
+import os
+
+import pytest
+
+from vault import PasswordVault, VaultEntry, VaultError, normalize_website
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    return str(tmp_path / "vault")
+
+
+def test_normalize_website() -> None:
+    assert normalize_website(" https://www.Example.com/ ") == "example.com"
+    assert normalize_website("http://example.com") == "example.com"
+
+
+def test_add_find_and_reopen(path: str) -> None:
+    with PasswordVault(path, "master") as vault:
+        vault.add("https://www.Example.com/", "me@example.com", "pw1")
+        vault.add("example.com", "other@example.com", "pw2")
+        vault.add("example.com", "ME@example.com ", "pw3")  # replaces pw1
+
+    with PasswordVault(path, "master") as vault:
+        assert len(vault) == 2
+        assert sorted(entry.password for entry in vault.find("EXAMPLE.com")) == ["pw2", "pw3"]
+        assert vault.find("unknown.com") == []
+
+
+def test_wrong_master_password(path: str) -> None:
+    PasswordVault(path, "master").close()
+    with pytest.raises(VaultError):
+        PasswordVault(path, "wrong")
+
+
+def test_log_does_not_contain_plaintext(path: str) -> None:
+    with PasswordVault(path, "master") as vault:
+        vault.add("example.com", "me@example.com", "hunter2")
+    with open(path + PasswordVault.LOG_SUFFIX, "rb") as log_file:
+        data = log_file.read()
+    assert b"hunter2" not in data and b"example.com" not in data
+
+
+def test_delete_and_compaction(path: str) -> None:
+    with PasswordVault(path, "master") as vault:
+        vault.add_many(VaultEntry(f"site{i}.com", "me@example.com", str(i)) for i in range(10))
+        vault.add("site0.com", "you@example.com", "x")
+        assert vault.delete("site0.com") == 2
+        assert vault.delete("site1.com", "nobody@example.com") == 0
+        assert vault.delete("site1.com", "me@example.com") == 1
+        assert vault.stale_count > 0
+
+    with open(path + PasswordVault.LOG_SUFFIX, "rb") as log_file:
+        assert len(log_file.readlines()) == 8  # closing compacted the log
+    with PasswordVault(path, "master") as vault:
+        assert len(vault) == 8
+        assert vault.find("site0.com") == []
+        assert vault.find("site9.com") == [VaultEntry("site9.com", "me@example.com", "9")]
+
+
+def test_large_vault_lookup(path: str) -> None:
+    with PasswordVault(path, "master") as vault:
+        vault.add_many(VaultEntry(f"site{i}.com", f"user{i}@example.com", f"pw{i}") for i in range(20_000))
+    with PasswordVault(path, "master") as vault:
+        assert len(vault) == 20_000
+        assert vault.find("https://www.site12345.com") == [
+            VaultEntry("site12345.com", "user12345@example.com", "pw12345")
+        ]
+
+
+def test_torn_last_line_is_truncated(path: str) -> None:
+    with PasswordVault(path, "master") as vault:
+        vault.add("a.com", "me@example.com", "pw")
+    log_path = path + PasswordVault.LOG_SUFFIX
+    size = os.path.getsize(log_path)
+    with open(log_path, "ab") as log_file:
+        log_file.write(b"dGFn dGFn P half-writ")  # crash during _append
+
+    with PasswordVault(path, "master") as vault:
+        assert os.path.getsize(log_path) == size
+        vault.add("b.com", "me@example.com", "pw2")
+    with PasswordVault(path, "master") as vault:
+        assert [entry.password for entry in vault.find("a.com") + vault.find("b.com")] == ["pw", "pw2"]
+
+
+def test_torn_line_with_too_few_fields(path: str) -> None:
+    with PasswordVault(path, "master") as vault:
+        vault.add("a.com", "me@example.com", "pw")
+    with open(path + PasswordVault.LOG_SUFFIX, "ab") as log_file:
+        log_file.write(b"dGFn")
+
+    with PasswordVault(path, "master") as vault:
+        assert len(vault) == 1
+
+
+def test_corrupt_line_before_the_end_raises(path: str) -> None:
+    with PasswordVault(path, "master") as vault:
+        vault.add("a.com", "me@example.com", "pw")
+    log_path = path + PasswordVault.LOG_SUFFIX
+    with open(log_path, "rb") as log_file:
+        good = log_file.read()
+    with open(log_path, "wb") as log_file:
+        log_file.write(b"garbage\n" + good)
+
+    with pytest.raises(VaultError):
+        PasswordVault(path, "master")
+
+
+def test_missing_meta_raises(path: str) -> None:
+    with PasswordVault(path, "master") as vault:
+        vault.add("a.com", "me@example.com", "pw")
+    os.remove(path + PasswordVault.META_SUFFIX)
+
+    with pytest.raises(VaultError):
+        PasswordVault(path, "master")
+    assert not os.path.exists(path + PasswordVault.META_SUFFIX)
+
+
+def test_import_text_file(path: str, tmp_path) -> None:
+    secret = tmp_path / "secret.txt"
+    secret.write_text("a.com | me@example.com | p | w\nnot a record\nb.com | you@example.com | q\n", encoding="utf-8")
+
+    with PasswordVault(path, "master") as vault:
+        assert vault.import_text_file(str(secret)) == 2
+        assert vault.find("a.com") == [VaultEntry("a.com", "me@example.com", "p | w")]
@@ -0,0 +1,281 @@
+"""Encrypted, indexed password vault backed by an append-only log.
+
+Each log line is ``<site_tag> <entry_tag> <op> <payload>`` where the tags are
+HMACs of the normalized website (and website + email) under a key derived once
+per session. The index is rebuilt from the tags alone, so opening a vault never
+decrypts records; only the records returned by a search are decrypted.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+PUT = b"P"
+DELETE = b"D"
+NONCE_SIZE = 12
+CHECK_PLAINTEXT = b"password-vault"
+
+
+class VaultError(Exception):
+    """Raised when the vault cannot be opened or read."""
+
+
+@dataclass(frozen=True)
+class VaultEntry:
+    """A single stored credential."""
+
+    website: str
+    email: str
+    password: str
+
+
+def normalize_website(website: str) -> str:
+    """Return the lookup key for a website ("https://www.X.com/" -> "x.com")."""
+    key = website.strip().casefold()
+    for prefix in ("https://", "http://"):
+        if key.startswith(prefix):
+            key = key[len(prefix):]
+    if key.startswith("www."):
+        key = key[4:]
+    return key.rstrip("/")
+
+
+class PasswordVault:
+    """Append-only encrypted credential store with an in-memory hash index."""
+
+    LOG_SUFFIX = ".log"
+    META_SUFFIX = ".meta"
+    # Compact once stale lines exceed this share of the log (and MIN_STALE).
+    COMPACT_RATIO = 0.5
+    MIN_STALE = 1000
+    SCRYPT_PARAMS = {"n": 2**14, "r": 8, "p": 1}
+
+    def __init__(self, path: str, master_password: str) -> None:
+        """Open (or create) the vault at path and derive the session key."""
+        self.log_path = path + self.LOG_SUFFIX
+        self.meta_path = path + self.META_SUFFIX
+        enc_key, self._mac_key = self._derive_keys(master_password)
+        self._aead = AESGCM(enc_key)
+        self._verify_or_create_meta()
+        # site_tag -> {entry_tag: offset of the latest PUT line}
+        self._index: Dict[bytes, Dict[bytes, int]] = {}
+        self._lines = 0
+        self._live = 0
+        self._load_index()
+        self._log: BinaryIO = open(self.log_path, "ab")
+        self._reader: BinaryIO = open(self.log_path, "rb")
+
+    # Key handling
+
+    def _derive_keys(self, master_password: str) -> Tuple[bytes, bytes]:
+        """Derive the encryption and MAC keys from the master password."""
+        meta = self._read_meta()
+        if meta is None and os.path.exists(self.log_path):
+            # A new salt would silently make every existing record unreadable
+            raise VaultError(f"{self.meta_path} is missing; cannot open {self.log_path}")
+        salt = base64.b64decode(meta["salt"]) if meta else secrets.token_bytes(16)
+        self._salt = salt
+        material = hashlib.scrypt(
+            master_password.encode("utf-8"), salt=salt, dklen=64, **self.SCRYPT_PARAMS
+        )
+        return material[:32], material[32:]
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            with open(self.meta_path, encoding="utf-8") as meta_file:
+                return json.load(meta_file)
+        except FileNotFoundError:
+            return None
+
+    def _verify_or_create_meta(self) -> None:
+        """Check the master password against the stored check value."""
+        meta = self._read_meta()
+        if meta is None:
+            nonce = secrets.token_bytes(NONCE_SIZE)
+            check = nonce + self._aead.encrypt(nonce, CHECK_PLAINTEXT, None)
+            meta = {
+                "salt": base64.b64encode(self._salt).decode("ascii"),
+                "check": base64.b64encode(check).decode("ascii"),
+            }
+            with open(self.meta_path, "w", encoding="utf-8") as meta_file:
+                json.dump(meta, meta_file)
+            return
+        check = base64.b64decode(meta["check"])
+        try:
+            self._aead.decrypt(check[:NONCE_SIZE], check[NONCE_SIZE:], None)
+        except InvalidTag:
+            raise VaultError("Wrong master password") from None
+
+    def _tag(self, *parts: str) -> bytes:
+        message = "\x00".join(parts).encode("utf-8")
+        digest = hmac.new(self._mac_key, message, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest[:18])
+
+    # Index and log
+
+    def _load_index(self) -> None:
+        """Rebuild the index from the log tags without decrypting anything.
+
+        A torn last line (left by a crash during a write) is cut off; a
+        malformed line anywhere else raises VaultError.
+        """
+        if not os.path.exists(self.log_path):
+            return
+        offset = 0
+        with open(self.log_path, "rb") as log_file:
+            for line in log_file:
+                fields = line.split(b" ", 3)
+                if not line.endswith(b"\n") or len(fields) != 4 or fields[2] not in (PUT, DELETE):
+                    if log_file.read(1):
+                        raise VaultError(f"Corrupt record at byte {offset} of {self.log_path}")
+                    break
+                site_tag, entry_tag, op, _ = fields
+                self._apply(site_tag, entry_tag, op, offset)
+                offset += len(line)
+        if offset < os.path.getsize(self.log_path):
+            os.truncate(self.log_path, offset)
+
+    def _apply(self, site_tag: bytes, entry_tag: bytes, op: bytes, offset: int) -> None:
+        self._lines += 1
+        entries = self._index.get(site_tag)
+        if op == PUT:
+            if entries is None:
+                entries = self._index[site_tag] = {}
+            if entry_tag not in entries:
+                self._live += 1
+            entries[entry_tag] = offset
+        elif entries is not None and entry_tag in entries:
+            del entries[entry_tag]
+            self._live -= 1
+            if not entries:
+                del self._index[site_tag]
+
+    def _encrypt(self, entry_tag: bytes, entry: VaultEntry) -> bytes:
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        plaintext = json.dumps([entry.website, entry.email, entry.password]).encode("utf-8")
+        return base64.b64encode(nonce + self._aead.encrypt(nonce, plaintext, entry_tag))
+
+    def _decrypt(self, entry_tag: bytes, payload: bytes) -> VaultEntry:
+        blob = base64.b64decode(payload)
+        try:
+            plaintext = self._aead.decrypt(blob[:NONCE_SIZE], blob[NONCE_SIZE:], entry_tag)
+        except InvalidTag:
+            raise VaultError("Vault record failed authentication") from None
+        return VaultEntry(*json.loads(plaintext))
+
+    def _append(self, lines: Iterable[Tuple[bytes, bytes, bytes, bytes]]) -> None:
+        offset = self._log.tell()
+        chunks = []
+        for site_tag, entry_tag, op, payload in lines:
+            line = b" ".join((site_tag, entry_tag, op, payload)) + b"\n"
+            chunks.append(line)
+            self._apply(site_tag, entry_tag, op, offset)
+            offset += len(line)
+        self._log.write(b"".join(chunks))
+        self._log.flush()
+        if self.stale_count >= max(self.MIN_STALE, self._lines * self.COMPACT_RATIO):
+            self.compact()
+
+    @property
+    def stale_count(self) -> int:
+        """Return the number of log lines compaction would drop."""
+        return self._lines - self._live
+
+    def __len__(self) -> int:
+        return self._live
+
+    # Public API
+
+    def add(self, website: str, email: str, password: str) -> None:
+        """Store a credential, replacing any existing one for website + email."""
+        self.add_many([VaultEntry(website, email, password)])
+
+    def add_many(self, entries: Iterable[VaultEntry]) -> None:
+        """Store many credentials with a single write."""
+        lines = []
+        for entry in entries:
+            site = normalize_website(entry.website)
+            entry_tag = self._tag(site, entry.email.strip().casefold())
+            lines.append((self._tag(site), entry_tag, PUT, self._encrypt(entry_tag, entry)))
+        self._append(lines)
+
+    def delete(self, website: str, email: Optional[str] = None) -> int:
+        """Delete the credentials for website (optionally one email only).
+
+        Returns the number of entries removed.
+        """
+        site = normalize_website(website)
+        site_tag = self._tag(site)
+        entries = self._index.get(site_tag, {})
+        if email is None:
+            targets = list(entries)
+        else:
+            entry_tag = self._tag(site, email.strip().casefold())
+            targets = [entry_tag] if entry_tag in entries else []
+        self._append((site_tag, entry_tag, DELETE, b"-") for entry_tag in targets)
+        return len(targets)
+
+    def find(self, website: str) -> List[VaultEntry]:
+        """Return every credential stored for website."""
+        entries = self._index.get(self._tag(normalize_website(website)))
+        if not entries:
+            return []
+        results = []
+        for entry_tag, offset in entries.items():
+            self._reader.seek(offset)
+            payload = self._reader.readline().rstrip(b"\n").split(b" ", 3)[3]
+            results.append(self._decrypt(entry_tag, payload))
+        return results
+
+    def compact(self) -> None:
+        """Rewrite the log with only live records (no re-encryption needed)."""
+        live = sorted(offset for entries in self._index.values() for offset in entries.values())
+        directory = os.path.dirname(os.path.abspath(self.log_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as out:
+            for offset in live:
+                self._reader.seek(offset)
+                out.write(self._reader.readline())
+            out.flush()
+            os.fsync(out.fileno())
+        self._log.close()
+        self._reader.close()
+        os.replace(tmp_path, self.log_path)
+        self._index.clear()
+        self._lines = self._live = 0
+        self._load_index()
+        self._log = open(self.log_path, "ab")
+        self._reader = open(self.log_path, "rb")
+
+    def import_text_file(self, path: str) -> int:
+        """Import a legacy ``website | email | password`` file; return the count."""
+        with open(path, encoding="utf-8") as text_file:
+            entries = [
+                VaultEntry(*(part.strip() for part in line.split(" | ", 2)))
+                for line in text_file
+                if line.count(" | ") >= 2
+            ]
+        self.add_many(entries)
+        return len(entries)
+
+    def close(self) -> None:
+        """Compact if worthwhile and close the log files."""
+        if self.stale_count:
+            self.compact()
+        self._log.close()
+        self._reader.close()
+
+    def __enter__(self) -> "PasswordVault":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
@@ -0,0 +1,163 @@
+"""カード画像の先読みと LRU キャッシュ
+
+ディスクの読み込み（Pillow があればデコードも）はバックグラウンドスレッドで行い、
+Tk の ``PhotoImage`` 生成だけを ``window.after`` のポーリングでメインスレッドに
+戻します（Tk はスレッドセーフではないため）。カードをめくる時はキャッシュを
+参照するだけなので、ディスク I/O で UI が止まることはありません。
+"""
+
+import io
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional, Set, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow がなければ Tk に PNG/GIF のデコードを任せる
+    Image = None
+
+ImageFactory = Callable[[bytes], Any]
+AfterFunc = Callable[..., str]
+
+
+def read_image_data(path: str) -> bytes:
+    """画像ファイルを読み込み、可能なら PPM（生 RGB）に変換して返す"""
+    with open(path, "rb") as image_file:
+        raw = image_file.read()
+    if Image is None:
+        return raw
+    with Image.open(io.BytesIO(raw)) as image:
+        rgb = image.convert("RGB")
+        header = f"P6 {rgb.width} {rgb.height} 255\n".encode("ascii")
+        return header + rgb.tobytes()
+
+
+class LRUImageCache:
+    """容量固定の LRU キャッシュ"""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> Optional[Any]:
+        """キャッシュ済みの画像を返す（なければ None）"""
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item
+
+    def put(self, key: str, item: Any) -> None:
+        """画像を登録し、容量を超えたら最も古いものを破棄"""
+        self._items[key] = item
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+
+class ImagePreloader:
+    """バックグラウンドで画像を読み込み、メインスレッドで PhotoImage を生成"""
+
+    POLL_MS = 15
+    # 1 回のポーリングで生成する最大枚数（フレーム時間を短く保つ）
+    MAX_IMAGES_PER_POLL = 4
+
+    def __init__(
+        self,
+        factory: ImageFactory,
+        after: Optional[AfterFunc] = None,
+        capacity: int = 64,
+        on_loaded: Optional[Callable[[str, Any], None]] = None,
+        loader: Callable[[str], bytes] = read_image_data,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        """factory は読み込んだバイト列から画像オブジェクトを作る関数"""
+        self.cache = LRUImageCache(capacity)
+        self._factory = factory
+        self._after = after
+        self._on_loaded = on_loaded
+        self._loader = loader
+        self._clock = clock
+        # 直近のポーリング 1 回にかかった秒数（フレーム時間の計測用）
+        self.last_poll_seconds = 0.0
+        self._requests: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._results: "queue.Queue[Tuple[str, Optional[bytes]]]" = queue.Queue()
+        self._pending: Set[str] = set()
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+        if self._after:
+            self._after(self.POLL_MS, self._poll_loop)
+
+    def _work(self) -> None:
+        """ワーカースレッド: ファイルを読み込んで結果キューへ"""
+        while True:
+            path = self._requests.get()
+            if path is None:
+                return
+            try:
+                data: Optional[bytes] = self._loader(path)
+            except (OSError, ValueError) as e:
+                print(f"画像の読み込みエラー: {path}: {e}")
+                data = None
+            self._results.put((path, data))
+            self._requests.task_done()
+
+    def prefetch(self, paths: Iterable[str]) -> None:
+        """キャッシュにも読み込み待ちにもない画像の読み込みを依頼"""
+        for path in paths:
+            if path and path not in self.cache and path not in self._pending:
+                self._pending.add(path)
+                self._requests.put(path)
+
+    def get(self, path: str) -> Optional[Any]:
+        """キャッシュ済みの画像を返す。未読み込みなら依頼して None を返す"""
+        image = self.cache.get(path)
+        if image is None:
+            self.prefetch([path])
+        return image
+
+    def poll(self, limit: Optional[int] = None) -> int:
+        """読み込み済みのデータから画像を生成（メインスレッドで呼ぶ）"""
+        limit = self.MAX_IMAGES_PER_POLL if limit is None else limit
+        start = self._clock()
+        created = 0
+        while created < limit:
+            try:
+                path, data = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.discard(path)
+            if data is None:
+                continue
+            image = self._factory(data)
+            self.cache.put(path, image)
+            created += 1
+            if self._on_loaded:
+                self._on_loaded(path, image)
+        self.last_poll_seconds = self._clock() - start
+        return created
+
+    def _poll_loop(self) -> None:
+        self.poll()
+        if self._after:
+            self._after(self.POLL_MS, self._poll_loop)
+
+    def join(self) -> None:
+        """依頼済みの画像をワーカーがすべて読み込むまで待つ"""
+        self._requests.join()
+
+    def close(self) -> None:
+        """ワーカースレッドを停止"""
+        self._requests.put(None)
@@ -1,8 +1,14 @@
 import tkinter as tk
 import pandas as pd
-import random
+import math
 import os
-from typing import Dict, List, Optional, Any
+import statistics
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Any
+
+from image_cache import ImagePreloader
+from srs_scheduler import QUALITY_RIGHT, QUALITY_WRONG, SpacedRepetitionScheduler
 
 class FlashCardApp:
     """フラッシュカードアプリケーションのメインクラス"""
@@ -13,9 +19,17 @@ class FlashCardApp:
     CARD_HEIGHT = 526
     FLIP_DELAY = 3000  # ミリ秒
 
+    # カード画像（CSV に Image 列がある場合）
+    IMAGE_COLUMN = "Image"
+    CARD_IMAGE_Y = 400
+    PRELOAD_AHEAD = 8  # 先読みする期限順のカード枚数
+    IMAGE_CACHE_SIZE = 64
+
     # ファイルパス
     ORIGINAL_DATA_FILE = "data/french_words.csv"
-    PROGRESS_DATA_FILE = "data/words_to_learn.csv"
+    PROGRESS_DATA_FILE = "data/words_to_learn.csv"  # 旧形式（初回のみ移行）
+    JOURNAL_FILE = "data/progress.journal"
+    SNAPSHOT_FILE = "data/progress.snapshot"
 
     # 画像ファイルパス
     FRONT_IMAGE_PATH = "images/card_front.png"
@@ -26,8 +40,14 @@ class FlashCardApp:
     def __init__(self):
         """アプリケーションの初期化"""
         self.current_card: Dict[str, Any] = {}
-        self.to_learn: List[Dict[str, Any]] = []  # 型を修正
+        self.current_index: Optional[int] = None
+        self.cards: List[Dict[str, Any]] = []
+        self.scheduler: Optional[SpacedRepetitionScheduler] = None
         self.flip_timer: Optional[str] = None
+        self.flip_at = 0.0
+        self.showing_back = True  # 最初のカードで表面を描画させる
+        self.preloader: Optional[ImagePreloader] = None
+        self.frame_times: Deque[float] = deque(maxlen=1000)
 
         # 画像オブジェクトの初期化
         self.front_image: Optional[tk.PhotoImage] = None
@@ -43,6 +63,7 @@ class FlashCardApp:
         self._load_images()
         self._create_widgets()
         self._layout_widgets()
+        self._setup_preloader()
 
         # 最初のカードを表示
         self.next_card()
@@ -50,31 +71,62 @@ class FlashCardApp:
     def _load_data(self) -> None:
         """学習データの読み込み"""
         try:
-            # 進捗ファイルが存在する場合はそれを読み込み
-            if os.path.exists(self.PROGRESS_DATA_FILE):
-                data = pd.read_csv(self.PROGRESS_DATA_FILE)
-                print(f"進捗ファイルを読み込みました: {len(data)} 単語")
-            else:
-                # 進捗ファイルがない場合は元データを読み込み
-                data = pd.read_csv(self.ORIGINAL_DATA_FILE)
-                print(f"元データを読み込みました: {len(data)} 単語")
-
-            # 型キャストを明示的に行う
-            records = data.to_dict(orient="records")
-            self.to_learn = [
-                {str(k): str(v) for k, v in record.items()}
-                for record in records
-            ]
-
-            if not self.to_learn:
+            # カードは常に元データから読み込み、進捗はスケジューラが復元
+            data = pd.read_csv(self.ORIGINAL_DATA_FILE, dtype=str, keep_default_na=False)
+            print(f"元データを読み込みました: {len(data)} 単語")
+            self.cards = data.to_dict(orient="records")
+            self._resolve_image_paths()
+
+            if not self.cards:
                 raise ValueError("学習データが空です")
 
+            is_first_run = not (
+                os.path.exists(self.JOURNAL_FILE) or os.path.exists(self.SNAPSHOT_FILE)
+            )
+            self.scheduler = SpacedRepetitionScheduler(
+                len(self.cards),
+                journal_path=self.JOURNAL_FILE,
+                snapshot_path=self.SNAPSHOT_FILE,
+            )
+            if is_first_run:
+                self._migrate_legacy_progress()
+
         except FileNotFoundError as e:
             self._show_error(f"データファイルが見つかりません: {e}")
-            self.to_learn = []
+            self.cards = []
         except Exception as e:
             self._show_error(f"データの読み込みエラー: {e}")
-            self.to_learn = []
+            self.cards = []
+
+    def _resolve_image_paths(self) -> None:
+        """Image 列の相対パスをデータファイルからの絶対パスに変換"""
+        base_dir = os.path.dirname(os.path.abspath(self.ORIGINAL_DATA_FILE))
+        for card in self.cards:
+            image = card.get(self.IMAGE_COLUMN)
+            if image:
+                card[self.IMAGE_COLUMN] = os.path.join(base_dir, image)
+
+    def _setup_preloader(self) -> None:
+        """カード画像がある場合のみ先読みスレッドを起動"""
+        if not any(card.get(self.IMAGE_COLUMN) for card in self.cards):
+            return
+        self.preloader = ImagePreloader(
+            factory=lambda data: tk.PhotoImage(data=data),
+            after=self.window.after,
+            capacity=self.IMAGE_CACHE_SIZE,
+            on_loaded=self._on_image_loaded,
+        )
+
+    def _migrate_legacy_progress(self) -> None:
+        """旧形式の words_to_learn.csv にない単語を「知っている」として登録"""
+        if self.scheduler is None or not os.path.exists(self.PROGRESS_DATA_FILE):
+            return
+        legacy = pd.read_csv(self.PROGRESS_DATA_FILE, dtype=str, keep_default_na=False)
+        to_learn = set(legacy["French"])
+        known = [i for i, card in enumerate(self.cards) if card["French"] not in to_learn]
+        for index in known:
+            self.scheduler.review(index, QUALITY_RIGHT)
+        print(f"旧進捗ファイルから {len(known)} 単語を移行しました")
 
     def _setup_window(self) -> None:
         """メインウィンドウの設定"""
@@ -90,6 +142,9 @@ class FlashCardApp:
         # ウィンドウを画面中央に配置
         self.window.geometry("900x750+100+50")
 
+        # 終了時にジャーナルを圧縮
+        self.window.protocol("WM_DELETE_WINDOW", self._on_close)
+
     def _load_images(self) -> None:
         """画像ファイルの読み込み"""
         try:
@@ -129,6 +184,11 @@ class FlashCardApp:
                 fill="white", outline="gray", width=2
             )
 
+        # カード画像（1 つのアイテムを使い回す）
+        self.card_picture = self.canvas.create_image(
+            self.CARD_WIDTH // 2, self.CARD_IMAGE_Y, state="hidden"
+        )
+
         # テキスト要素の作成
         self.card_title = self.canvas.create_text(
             self.CARD_WIDTH // 2, 150,
@@ -149,7 +209,7 @@ class FlashCardApp:
             self.wrong_button = tk.Button(
                 image=self.wrong_image,
                 highlightthickness=0,
-                command=self.next_card,
+                command=self.mark_as_unknown,
                 bg=self.BACKGROUND_COLOR,
                 relief="flat"
             )
@@ -157,7 +217,7 @@ class FlashCardApp:
             self.wrong_button = tk.Button(
                 text="❌",
                 highlightthickness=0,
-                command=self.next_card,
+                command=self.mark_as_unknown,
                 bg=self.BACKGROUND_COLOR,
                 relief="flat",
                 font=("Arial", 20)
@@ -198,7 +258,7 @@ class FlashCardApp:
 
     def _update_progress_display(self) -> None:
         """進捗表示の更新"""
-        remaining = len(self.to_learn)
+        remaining = self.scheduler.unlearned if self.scheduler else 0
         self.progress_label.config(text=f"残り単語数: {remaining}")
 
     def _cancel_flip_timer(self) -> None:
@@ -207,35 +267,86 @@ class FlashCardApp:
             self.window.after_cancel(self.flip_timer)
             self.flip_timer = None
 
+    def _schedule_flip(self) -> None:
+        """フリップ時刻を更新（待機中のタイマーがあればそのまま使う）"""
+        self.flip_at = time.monotonic() + self.FLIP_DELAY / 1000
+        if self.flip_timer is None:
+            self.flip_timer = self.window.after(self.FLIP_DELAY, self._on_flip_timer)
+
+    def _on_flip_timer(self) -> None:
+        """フリップ時刻前に発火した場合は残り時間で再設定"""
+        remaining_ms = math.ceil((self.flip_at - time.monotonic()) * 1000)
+        if remaining_ms > 0:
+            self.flip_timer = self.window.after(remaining_ms, self._on_flip_timer)
+            return
+        self.flip_timer = None
+        self.flip_card()
+
     def next_card(self) -> None:
         """次のカードを表示"""
-        if not self.to_learn:
+        start = time.perf_counter()
+
+        # 期限が最も早いカードを選択
+        index = self.scheduler.next_card() if self.scheduler else None
+        if index is None:
+            self._cancel_flip_timer()
+            self.current_index = None
             self._show_completion_message()
             return
 
-        # 既存のタイマーをキャンセル
-        self._cancel_flip_timer()
-
-        # ランダムにカードを選択
-        self.current_card = random.choice(self.to_learn)
+        self.current_index = index
+        self.current_card = self.cards[index]
 
         # フランス語面を表示
         self._show_front_side()
+        self._show_card_image()
 
         # 3秒後に英語面に切り替え
-        self.flip_timer = self.window.after(self.FLIP_DELAY, self.flip_card)
+        self._schedule_flip()
 
         # 進捗表示を更新
         self._update_progress_display()
+        self.frame_times.append(time.perf_counter() - start)
+
+        # 次に出題されるカードの画像を先読み
+        self._prefetch_upcoming()
+
+    def _prefetch_upcoming(self) -> None:
+        """期限順で次の PRELOAD_AHEAD 枚の画像を先読み"""
+        if self.preloader is None or self.scheduler is None:
+            return
+        upcoming = self.scheduler.upcoming(self.PRELOAD_AHEAD + 1)
+        self.preloader.prefetch(
+            self.cards[index].get(self.IMAGE_COLUMN, "") for index in upcoming
+        )
+
+    def _show_card_image(self) -> None:
+        """キャッシュ済みのカード画像を表示（未読み込みなら読み込み後に表示）"""
+        path = self.current_card.get(self.IMAGE_COLUMN)
+        image = self.preloader.get(path) if self.preloader and path else None
+        if image is None:
+            self.canvas.itemconfig(self.card_picture, state="hidden")
+        else:
+            self.canvas.itemconfig(self.card_picture, image=image, state="normal")
+
+    def _on_image_loaded(self, path: str, image: tk.PhotoImage) -> None:
+        """表示中のカードの画像が読み込まれたら表示"""
+        if self.current_card.get(self.IMAGE_COLUMN) == path:
+            self.canvas.itemconfig(self.card_picture, image=image, state="normal")
 
     def _show_front_side(self) -> None:
         """カードの表面（フランス語）を表示"""
-        self.canvas.itemconfig(self.card_title, text="French", fill="black")
         self.canvas.itemconfig(
             self.card_word,
-            text=self.current_card.get("French", ""),
-            fill="black"
+            text=self.current_card.get("French", "")
         )
+        if not self.showing_back:
+            return
+
+        # 裏面から戻る時だけ色と背景を切り替える
+        self.showing_back = False
+        self.canvas.itemconfig(self.card_title, text="French", fill="black")
+        self.canvas.itemconfig(self.card_word, fill="black")
 
         if self.front_image:
             self.canvas.itemconfig(self.card_background, image=self.front_image)
@@ -244,6 +355,8 @@ class FlashCardApp:
 
     def flip_card(self) -> None:
         """カードを裏面（英語）に切り替え"""
+        start = time.perf_counter()
+        self.showing_back = True
         self.canvas.itemconfig(self.card_title, text="English", fill="white")
         self.canvas.itemconfig(
             self.card_word,
@@ -255,53 +368,57 @@ class FlashCardApp:
             self.canvas.itemconfig(self.card_background, image=self.back_image)
         else:
             self.canvas.itemconfig(self.card_background, fill="lightblue")
+        self.frame_times.append(time.perf_counter() - start)
 
     def mark_as_known(self) -> None:
         """単語を「知っている」としてマーク"""
-        if not self.current_card or not self.to_learn:
-            return
+        self._review(QUALITY_RIGHT)
 
-        try:
-            # 現在のカードを学習リストから削除
-            if self.current_card in self.to_learn:
-                self.to_learn.remove(self.current_card)
+    def mark_as_unknown(self) -> None:
+        """単語を「知らない」としてマーク（すぐに再出題）"""
+        self._review(QUALITY_WRONG)
 
-            # 進捗を保存
-            self._save_progress()
+    def _review(self, quality: int) -> None:
+        """回答をスケジューラに記録して次のカードへ"""
+        if self.current_index is None or self.scheduler is None:
+            return
 
-            # 次のカードを表示
+        try:
+            # ジャーナルに 1 行追記するだけなので、デッキサイズに依存しない
+            self.scheduler.review(self.current_index, quality)
             self.next_card()
 
         except Exception as e:
             self._show_error(f"進捗保存エラー: {e}")
 
-    def _save_progress(self) -> None:
-        """学習進捗をファイルに保存"""
+    def _on_close(self) -> None:
+        """ジャーナルを圧縮してから終了"""
         try:
-            if self.to_learn:
-                # データフレームに変換して保存
-                df = pd.DataFrame(self.to_learn)
-
-                # ディレクトリが存在しない場合は作成
-                os.makedirs(os.path.dirname(self.PROGRESS_DATA_FILE), exist_ok=True)
-
-                df.to_csv(self.PROGRESS_DATA_FILE, index=False)
-                print(f"進捗を保存しました: {len(self.to_learn)} 単語")
-            else:
-                # 全て完了した場合は進捗ファイルを削除
-                if os.path.exists(self.PROGRESS_DATA_FILE):
-                    os.remove(self.PROGRESS_DATA_FILE)
-                    print("全ての単語を学習完了！進捗ファイルを削除しました。")
-
+            if self.scheduler:
+                self.scheduler.close()
         except Exception as e:
             print(f"進捗保存エラー: {e}")
+        if self.preloader:
+            self.preloader.close()
+        self._print_frame_times()
+        self.window.destroy()
+
+    def _print_frame_times(self) -> None:
+        """カード表示・フリップ処理にかかった時間を表示"""
+        if len(self.frame_times) < 2:
+            return
+        quantiles = statistics.quantiles(self.frame_times, n=100)
+        print(
+            f"フレーム時間: p50={quantiles[49] * 1000:.2f}ms "
+            f"p99={quantiles[98] * 1000:.2f}ms ({len(self.frame_times)} 回)"
+        )
 
     def _show_completion_message(self) -> None:
         """学習完了メッセージの表示"""
         self.canvas.itemconfig(self.card_title, text="完了！", fill="green")
         self.canvas.itemconfig(
             self.card_word,
-            text="全ての単語を\n学習しました！",
+            text="今日の復習は\n完了しました！",
             fill="green"
         )
         self.progress_label.config(text="🎉 学習完了！お疲れ様でした！")
@@ -317,7 +434,7 @@ class FlashCardApp:
 
     def run(self) -> None:
         """アプリケーションの実行"""
-        if not self.to_learn:
+        if not self.cards:
             self._show_error("学習データがありません。アプリケーションを終了します。")
             return
 
@@ -0,0 +1,187 @@
+"""SM-2 方式の間隔反復スケジューラ
+
+カードごとの状態（期限・間隔・易しさ係数・連続正解数）は ``array.array`` に
+保持し、期限順の最小ヒープから次のカードを取り出します。
+進捗は追記専用のジャーナルに 1 クリック 1 行で書き込み、終了時に
+スナップショットへ圧縮します。1 クリックのコストは O(log n) のヒープ操作と
+1 行の追記だけなので、デッキのサイズにほぼ依存しません。
+"""
+
+import heapq
+import os
+import random
+import tempfile
+import time
+from array import array
+from typing import Callable, List, Optional, Tuple
+
+DAY = 86400.0
+
+# 回答の品質 (SM-2 の 0-5)
+QUALITY_WRONG = 1
+QUALITY_RIGHT = 4
+
+
+class SpacedRepetitionScheduler:
+    """最小ヒープで期限を管理する SM-2 スケジューラ"""
+
+    INITIAL_EASE = 2.5
+    MIN_EASE = 1.3
+    # 不正解のカードを再表示するまでの秒数
+    RELEARN_DELAY = 60.0
+    # 期限前でもこの秒数以内なら先取りして出題する
+    LEARN_AHEAD = 20 * 60.0
+
+    def __init__(
+        self,
+        card_count: int,
+        journal_path: Optional[str] = None,
+        snapshot_path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+        seed: Optional[int] = None,
+    ) -> None:
+        """カード枚数分の状態配列を作成し、保存済みの進捗を復元"""
+        self.card_count = card_count
+        self.journal_path = journal_path
+        self.snapshot_path = snapshot_path
+        self.clock = clock
+
+        # 新規カードはランダムな順序で出題するため、過去の時刻に散らす
+        rng = random.Random(seed)
+        self.due = array("d", (rng.random() for _ in range(card_count)))
+        self.interval = array("f", bytes(4 * card_count))
+        self.ease = array("f", [self.INITIAL_EASE]) * card_count
+        self.reps = array("I", bytes(4 * card_count))
+        # 一度でも回答した（またはスナップショット・ジャーナルに記録がある）カード
+        self.answered = bytearray(card_count)
+        self.unlearned = card_count
+
+        self._restore()
+        self._heap: List[Tuple[float, int]] = [(due, card) for card, due in enumerate(self.due)]
+        heapq.heapify(self._heap)
+        self._journal = open(journal_path, "a", encoding="utf-8") if journal_path else None
+
+    # 永続化
+
+    def _restore(self) -> None:
+        """スナップショット、続いてジャーナルの順に状態を適用"""
+        for path in (self.snapshot_path, self.journal_path):
+            if not path or not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    parts = line.split()
+                    if len(parts) != 5:
+                        continue  # 書き込み途中で終了した行は無視
+                    card = int(parts[0])
+                    if card < self.card_count:
+                        self._set_state(
+                            card, int(parts[1]), float(parts[2]), float(parts[3]), float(parts[4])
+                        )
+
+    def _set_state(self, card: int, reps: int, interval: float, ease: float, due: float) -> None:
+        if (self.reps[card] == 0) != (reps == 0):
+            self.unlearned += 1 if reps == 0 else -1
+        self.reps[card] = reps
+        self.interval[card] = interval
+        self.ease[card] = ease
+        self.due[card] = due
+        self.answered[card] = 1
+
+    @staticmethod
+    def _format(card: int, reps: int, interval: float, ease: float, due: float) -> str:
+        return f"{card} {reps} {interval:.6g} {ease:.4f} {due:.3f}\n"
+
+    def compact(self) -> None:
+        """学習済みカードの状態をスナップショットに書き出し、ジャーナルを空にする"""
+        if not self.snapshot_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            out.writelines(
+                self._format(card, self.reps[card], self.interval[card], self.ease[card], self.due[card])
+                for card in range(self.card_count)
+                if self.answered[card]
+            )
+        os.replace(tmp_path, self.snapshot_path)
+        if self._journal:
+            self._journal.close()
+            self._journal = open(self.journal_path, "w", encoding="utf-8")  # type: ignore[arg-type]
+
+    def close(self) -> None:
+        """ジャーナルを圧縮して閉じる"""
+        self.compact()
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+    # スケジューリング
+
+    def next_card(self) -> Optional[int]:
+        """期限が来ている（または先取り範囲内の）最も早いカードを返す"""
+        heap = self._heap
+        while heap:
+            due, card = heap[0]
+            if due != self.due[card]:
+                heapq.heappop(heap)  # 再スケジュール済みの古いエントリ
+                continue
+            return card if due <= self.clock() + self.LEARN_AHEAD else None
+        return None
+
+    def upcoming(self, count: int) -> List[int]:
+        """期限が早い順に最大 count 枚のカードを返す（状態は変更しない）"""
+        heap = self._heap
+        taken: List[Tuple[float, int]] = []
+        while heap and len(taken) < count:
+            due, card = heapq.heappop(heap)
+            if due == self.due[card]:
+                taken.append((due, card))
+        for entry in taken:
+            heapq.heappush(heap, entry)
+        return [card for _, card in taken]
+
+    def next_due_time(self) -> Optional[float]:
+        """次にカードの期限が来る時刻"""
+        card = self.next_card()
+        if card is not None:
+            return self.due[card]
+        while self._heap and self._heap[0][0] != self.due[self._heap[0][1]]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def review(self, card: int, quality: int) -> float:
+        """回答を記録して次の期限を返す（SM-2）"""
+        now = self.clock()
+        reps = self.reps[card]
+        interval = self.interval[card]
+        ease = self.ease[card]
+
+        if quality < 3:
+            reps = 0
+            interval = 0.0
+            due = now + self.RELEARN_DELAY
+        else:
+            reps += 1
+            if reps == 1:
+                interval = 1.0
+            elif reps == 2:
+                interval = 6.0
+            else:
+                interval = interval * ease
+            due = now + interval * DAY
+        ease = max(self.MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+        self._set_state(card, reps, interval, ease, due)
+        heapq.heappush(self._heap, (self.due[card], card))
+        if len(self._heap) > 2 * self.card_count + 64:
+            self._rebuild_heap()
+        if self._journal:
+            self._journal.write(self._format(card, reps, interval, ease, due))
+            self._journal.flush()
+        return due
+
+    def _rebuild_heap(self) -> None:
+        """古いエントリが溜まったらヒープを作り直す（償却 O(1)）"""
+        self._heap = [(due, card) for card, due in enumerate(self.due)]
+        heapq.heapify(self._heap)
@@ -0,0 +1,170 @@
+import statistics
+import struct
+import time
+import zlib
+from typing import Any, List, Tuple
+
+import pytest
+
+import image_cache
+from image_cache import ImagePreloader, LRUImageCache, read_image_data
+
+
+def write_png(path: str, width: int, height: int, color: Tuple[int, int, int]) -> None:
+    """単色の PNG を書き出す"""
+    row = b"\x00" + bytes(color) * width
+    raw = zlib.compress(row * height)
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    with open(path, "wb") as png:
+        png.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", raw) + chunk(b"IEND", b""))
+
+
+class Clock:
+    """手動で進める時計（time.perf_counter の代わり）"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def wait_for(preloader: ImagePreloader, count: int) -> int:
+    """ワーカーの読み込みを待ってから poll する"""
+    preloader.join()
+    return preloader.poll(limit=count)
+
+
+def test_lru_evicts_least_recently_used() -> None:
+    cache = LRUImageCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_prefetched_images_are_hits(tmp_path) -> None:
+    paths = []
+    for i in range(20):
+        path = str(tmp_path / f"card_{i}.png")
+        write_png(path, 30, 15, (i, i, i))
+        paths.append(path)
+    loaded: List[str] = []
+    preloader = ImagePreloader(lambda data: ("image", data), capacity=32, on_loaded=lambda path, _: loaded.append(path))
+
+    preloader.prefetch(paths[:8])
+    preloader.prefetch(paths[:8])  # 読み込み待ちのものは再依頼しない
+    assert wait_for(preloader, 8) == 8
+    assert loaded == paths[:8]
+
+    # 表示時はキャッシュを引くだけ
+    misses = 0
+    for i, path in enumerate(paths):
+        preloader.prefetch(paths[i + 1 : i + 9])
+        misses += preloader.get(path) is None
+        # 次のクリックまでの待ち時間にポーリングが走る想定
+        preloader.join()
+        preloader.poll(limit=len(paths))
+    preloader.close()
+    assert misses == 0
+
+
+def test_get_miss_requests_the_image(tmp_path) -> None:
+    path = str(tmp_path / "card.png")
+    write_png(path, 4, 4, (1, 2, 3))
+    preloader = ImagePreloader(lambda data: data)
+    assert preloader.get(path) is None
+    assert wait_for(preloader, 1) == 1
+    assert preloader.get(path) == read_image_data(path)
+    preloader.close()
+
+
+def test_poll_limit_keeps_frames_short() -> None:
+    clock = Clock()
+
+    def factory(data: bytes) -> bytes:
+        clock.now += 0.005  # PhotoImage 1 枚の生成に 5 ms かかる想定
+        return data
+
+    preloader = ImagePreloader(factory, loader=lambda path: path.encode(), clock=clock)
+    preloader.prefetch([f"img{i}" for i in range(10)])
+    preloader.join()
+    created = []
+    frames = []
+    while len(preloader.cache) < 10:
+        created.append(preloader.poll())
+        frames.append(preloader.last_poll_seconds)
+    preloader.close()
+    assert created == [4, 4, 2]
+    assert frames == pytest.approx([0.02, 0.02, 0.01])
+
+
+def test_load_errors_are_not_cached(tmp_path) -> None:
+    created: List[Any] = []
+    preloader = ImagePreloader(created.append)
+    missing = str(tmp_path / "missing.png")
+    preloader.prefetch([missing])
+    assert wait_for(preloader, 1) == 0
+    assert missing not in preloader._pending
+    assert missing not in preloader.cache and not created
+    preloader.close()
+
+
+def test_read_image_data(tmp_path) -> None:
+    path = str(tmp_path / "card.png")
+    write_png(path, 3, 2, (10, 20, 30))
+    data = read_image_data(path)
+    if image_cache.Image is None:
+        assert data.startswith(b"\x89PNG")
+    else:
+        assert data == b"P6 3 2 255\n" + bytes((10, 20, 30)) * 6
+
+
+def percentiles(samples: List[float]) -> str:
+    quantiles = statistics.quantiles(samples, n=100)
+    return f"p50={quantiles[49] * 1000:.3f} ms, p99={quantiles[98] * 1000:.3f} ms, max={max(samples) * 1000:.3f} ms"
+
+
+@pytest.mark.slow
+def test_frame_times_with_ten_thousand_image_cards(tmp_path) -> None:
+    paths = []
+    for i in range(10_000):
+        path = str(tmp_path / f"card_{i}.png")
+        write_png(path, 300, 150, (i % 256, (i * 7) % 256, (i * 13) % 256))
+        paths.append(path)
+
+    # 先読みなし: 表示のたびにディスクから読む
+    synchronous = []
+    for path in paths[:1000]:
+        start = time.perf_counter()
+        read_image_data(path)
+        synchronous.append(time.perf_counter() - start)
+
+    preloader = ImagePreloader(lambda data: data, capacity=32)
+    flips = []
+    polls = []
+    misses = 0
+    for i, path in enumerate(paths):
+        preloader.prefetch(paths[i + 1 : i + 9])
+        start = time.perf_counter()
+        misses += preloader.get(path) is None
+        flips.append(time.perf_counter() - start)
+        # 次のクリックまでの待ち時間にポーリングが走る想定
+        preloader.join()
+        while preloader.poll():
+            polls.append(preloader.last_poll_seconds)
+    preloader.close()
+
+    print(f"\n    synchronous: {percentiles(synchronous)}")
+    print(f" preloaded flip: {percentiles(flips)}")
+    print(f"      poll step: {percentiles(polls)}")
+    print(f"   cache misses: {misses} / {len(paths)}")
+    assert misses == 1  # 最初の 1 枚だけ
+    assert statistics.quantiles(flips, n=100)[98] < statistics.median(synchronous)
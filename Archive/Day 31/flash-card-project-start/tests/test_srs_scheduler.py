@@ -0,0 +1,156 @@
+import time
+from typing import Dict, List
+
+import pytest
+
+from srs_scheduler import DAY, QUALITY_RIGHT, QUALITY_WRONG, SpacedRepetitionScheduler
+
+START = 1_000_000.0
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = START
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+
+def test_sm2_intervals(clock: Clock) -> None:
+    scheduler = SpacedRepetitionScheduler(1, clock=clock)
+    assert scheduler.review(0, QUALITY_RIGHT) == START + 1 * DAY
+    assert scheduler.review(0, QUALITY_RIGHT) == START + 6 * DAY
+    ease = scheduler.ease[0]
+    assert scheduler.review(0, QUALITY_RIGHT) == pytest.approx(START + 6 * ease * DAY, rel=1e-6)
+    assert scheduler.unlearned == 0
+
+
+def test_wrong_answer_relearns_soon_and_lowers_ease(clock: Clock) -> None:
+    scheduler = SpacedRepetitionScheduler(1, clock=clock)
+    scheduler.review(0, QUALITY_RIGHT)
+    assert scheduler.review(0, QUALITY_WRONG) == START + scheduler.RELEARN_DELAY
+    assert scheduler.reps[0] == 0
+    assert scheduler.unlearned == 1
+    for _ in range(20):
+        scheduler.review(0, QUALITY_WRONG)
+    assert scheduler.ease[0] == pytest.approx(scheduler.MIN_EASE)
+
+
+def test_next_card_follows_due_order(clock: Clock) -> None:
+    scheduler = SpacedRepetitionScheduler(3, clock=clock, seed=0)
+    seen: List[int] = []
+    for _ in range(3):
+        card = scheduler.next_card()
+        seen.append(card)
+        scheduler.review(card, QUALITY_RIGHT)
+    assert sorted(seen) == [0, 1, 2]
+    # すべて明日以降が期限なので出題なし
+    assert scheduler.next_card() is None
+    assert scheduler.next_due_time() == START + DAY
+
+
+def test_wrong_card_comes_back_within_learn_ahead(clock: Clock) -> None:
+    scheduler = SpacedRepetitionScheduler(2, clock=clock, seed=0)
+    first = scheduler.next_card()
+    scheduler.review(first, QUALITY_WRONG)
+    second = scheduler.next_card()
+    assert second != first
+    scheduler.review(second, QUALITY_RIGHT)
+    # 1 分後の再出題は先取り範囲内
+    assert scheduler.next_card() == first
+
+
+def test_upcoming_does_not_change_state(clock: Clock) -> None:
+    scheduler = SpacedRepetitionScheduler(10, clock=clock, seed=1)
+    upcoming = scheduler.upcoming(4)
+    assert len(upcoming) == 4
+    assert scheduler.upcoming(4) == upcoming
+    assert scheduler.next_card() == upcoming[0]
+
+
+def test_heap_stays_bounded(clock: Clock) -> None:
+    scheduler = SpacedRepetitionScheduler(100, clock=clock, seed=0)
+    for click in range(10_000):
+        card = scheduler.next_card()
+        if card is None:
+            clock.now = scheduler.next_due_time()
+            continue
+        scheduler.review(card, QUALITY_WRONG if click % 4 == 0 else QUALITY_RIGHT)
+        clock.now += 1.0
+        assert len(scheduler._heap) <= 2 * scheduler.card_count + 64
+
+
+def test_progress_survives_restart(clock: Clock, tmp_path) -> None:
+    journal = str(tmp_path / "progress.journal")
+    snapshot = str(tmp_path / "progress.snapshot")
+    scheduler = SpacedRepetitionScheduler(5, journal, snapshot, clock=clock, seed=0)
+    scheduler.review(1, QUALITY_RIGHT)
+    scheduler.review(2, QUALITY_WRONG)
+    state = [(scheduler.reps[c], scheduler.due[c]) for c in range(5)]
+
+    # ジャーナルだけから復元（途中で終了した行は無視）
+    with open(journal, "a", encoding="utf-8") as file:
+        file.write("3 1 1")
+    restored = SpacedRepetitionScheduler(5, journal, snapshot, clock=clock, seed=0)
+    assert [(restored.reps[c], restored.due[c]) for c in (1, 2)] == [
+        (reps, pytest.approx(due, abs=1e-3)) for reps, due in state[1:3]
+    ]
+    assert restored.unlearned == 4
+    restored.close()
+
+    # 圧縮後はスナップショットから復元し、ジャーナルは空
+    assert (tmp_path / "progress.journal").read_text(encoding="utf-8") == ""
+    assert len((tmp_path / "progress.snapshot").read_text(encoding="utf-8").splitlines()) == 2
+    reopened = SpacedRepetitionScheduler(5, journal, snapshot, clock=clock, seed=0)
+    assert reopened.reps[1] == 1 and reopened.due[1] == pytest.approx(START + DAY, abs=1e-3)
+    reopened.close()
+
+
+def test_compact_keeps_every_answered_card(tmp_path) -> None:
+    # 時計が 0 付近でも、回答済みかどうかは期限の値から推測しない
+    clock = Clock()
+    clock.now = 0.0
+    snapshot = tmp_path / "progress.snapshot"
+    scheduler = SpacedRepetitionScheduler(4, str(tmp_path / "progress.journal"), str(snapshot), clock=clock, seed=0)
+    scheduler.RELEARN_DELAY = 0.5
+    scheduler.review(3, QUALITY_WRONG)
+    assert scheduler.due[3] == 0.5
+    scheduler.close()
+    assert [line.split()[0] for line in snapshot.read_text(encoding="utf-8").splitlines()] == ["3"]
+
+    reopened = SpacedRepetitionScheduler(4, str(tmp_path / "progress.journal"), str(snapshot), clock=clock, seed=0)
+    assert list(reopened.answered) == [0, 0, 0, 1]
+    reopened.close()
+    assert len(snapshot.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def click_cost(size: int, tmp_path, clicks: int = 20_000) -> float:
+    """1 クリック（次のカードの取得と回答の記録）あたりの秒数"""
+    clock = Clock()
+    scheduler = SpacedRepetitionScheduler(
+        size, str(tmp_path / f"{size}.journal"), str(tmp_path / f"{size}.snapshot"), clock=clock, seed=0
+    )
+    start = time.perf_counter()
+    for click in range(clicks):
+        card = scheduler.next_card()
+        if card is None:
+            clock.now = scheduler.next_due_time()
+            continue
+        scheduler.review(card, QUALITY_WRONG if click % 4 == 0 else QUALITY_RIGHT)
+        clock.now += 1.0
+    elapsed = time.perf_counter() - start
+    scheduler.close()
+    return elapsed / clicks
+
+
+@pytest.mark.slow
+def test_click_cost_does_not_grow_with_the_deck(tmp_path) -> None:
+    costs: Dict[int, float] = {size: click_cost(size, tmp_path) for size in (1_000, 10_000, 100_000)}
+    for size, cost in costs.items():
+        print(f"\n{size:>8} 枚: {cost * 1e6:6.2f} µs/クリック", end="")
+    assert costs[100_000] < 3 * costs[1_000]
@@ -0,0 +1,235 @@
+from datetime import date
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import argparse
+import logging
+import os
+import random
+import smtplib
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BirthdayKey = Tuple[int, int]
+
+
+class BirthdayScheduler:
+    """(月, 日) ごとに全員をまとめ、1 本の SMTP 接続でその日のメールを送るクラス"""
+
+    SUBJECT = "Happy Birthday!"
+
+    def __init__(
+        self,
+        sender: str,
+        smtp_server: str = "smtp.gmail.com",
+        smtp_port: int = 587,
+        password: Optional[str] = None,
+        use_tls: bool = True,
+        recipient_override: Optional[str] = None,
+        seed: Optional[int] = None,
+        max_retries: int = 2,
+        timeout: float = 30,
+    ):
+        """SMTP 設定を初期化
+
+        Args:
+            sender: 送信元アドレス
+            smtp_server: SMTP サーバー
+            smtp_port: SMTP ポート
+            password: ログインパスワード（None ならログインしない）
+            use_tls: STARTTLS を使うかどうか
+            recipient_override: 指定すると全メールをこのアドレスに送る（テスト用）
+            seed: テンプレート選択の乱数シード
+            max_retries: 接続が切れた時に同じメールを再送する回数
+            timeout: SMTP 接続のタイムアウト（秒）
+        """
+        self.sender = sender
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.password = password
+        self.use_tls = use_tls
+        self.recipient_override = recipient_override
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.reconnects = 0
+        self.names = np.empty(0, dtype=object)
+        self.emails = np.empty(0, dtype=object)
+        self.index: Dict[BirthdayKey, np.ndarray] = {}
+        self.templates: List[str] = []
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_env(cls) -> "BirthdayScheduler":
+        """BirthdayEmailer と同じ環境変数から作成（TEST_MAIL2 があれば宛先を固定）"""
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        sender = os.getenv("TEST_MAIL1", "")
+        password = os.getenv("PASSWORD1", "")
+        if not sender or not password:
+            raise ValueError("必要な環境変数が設定されていません: TEST_MAIL1, PASSWORD1")
+        return cls(sender, password=password, recipient_override=os.getenv("TEST_MAIL2") or None)
+
+    def load_birthdays(self, csv_path: str = "birthdays.csv") -> int:
+        """CSV を 1 回のベクトル演算で (月, 日) → 行番号の配列に索引付けする
+
+        同じ誕生日の人は同じキーのリストにまとめられ、上書きされません。
+
+        Args:
+            csv_path: CSVファイルのパス
+
+        Returns:
+            読み込んだ人数
+        """
+        data = pd.read_csv(
+            csv_path,
+            usecols=["name", "email", "month", "day"],
+            dtype={"name": str, "email": str},
+        )
+        month = pd.to_numeric(data["month"], errors="coerce")
+        day = pd.to_numeric(data["day"], errors="coerce")
+        valid = month.between(1, 12) & day.between(1, 31) & data["email"].notna()
+        if not valid.all():
+            logger.warning(f"{int((~valid).sum())}行のデータが不完全なためスキップしました")
+            data, month, day = data[valid], month[valid], day[valid]
+
+        self.names = data["name"].fillna("").to_numpy(dtype=object)
+        self.emails = data["email"].to_numpy(dtype=object)
+        keys = month.to_numpy(dtype=np.int64) * 100 + day.to_numpy(dtype=np.int64)
+        self.index = {
+            (int(key) // 100, int(key) % 100): positions
+            for key, positions in pd.Series(keys).groupby(keys).indices.items()
+        }
+        logger.info(f"{len(self.names)}件の誕生日データを {len(self.index)} 日分に索引付けしました")
+        return len(self.names)
+
+    def load_templates(self, template_dir: str = "letter_templates") -> int:
+        """letter_templates 内のテンプレートをすべて先読みする
+
+        Returns:
+            読み込んだテンプレート数
+        """
+        paths = sorted(Path(template_dir).glob("letter_*.txt"))
+        self.templates = [path.read_text(encoding="utf-8") for path in paths]
+        if not self.templates:
+            raise FileNotFoundError(f"テンプレートファイルが見つかりません: {template_dir}")
+        return len(self.templates)
+
+    def people_on(self, day: date) -> np.ndarray:
+        """指定日が誕生日の人の行番号（うるう年以外は 2/29 生まれを 2/28 に含める）"""
+        positions = self.index.get((day.month, day.day), np.empty(0, dtype=np.int64))
+        if (day.month, day.day) == (2, 28) and not _is_leap_year(day.year):
+            leap = self.index.get((2, 29))
+            if leap is not None:
+                positions = np.concatenate([positions, leap])
+        return positions
+
+    def build_messages(self, day: date) -> List[EmailMessage]:
+        """指定日のメールをすべて作成する"""
+        messages = []
+        for position in self.people_on(day):
+            message = EmailMessage()
+            message["Subject"] = self.SUBJECT
+            message["From"] = self.sender
+            message["To"] = self.recipient_override or self.emails[position]
+            template = self._random.choice(self.templates)
+            message.set_content(template.replace("[NAME]", self.names[position]))
+            messages.append(message)
+        return messages
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.smtp_server, port=self.smtp_port, timeout=self.timeout)
+        if self.use_tls:
+            connection.starttls()
+        if self.password:
+            connection.login(user=self.sender, password=self.password)
+        return connection
+
+    @staticmethod
+    def _close(connection: Optional[smtplib.SMTP]) -> None:
+        if connection is None:
+            return
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def send_all(self, messages: List[EmailMessage]) -> int:
+        """1 本の SMTP 接続を使い回してすべてのメールを送る
+
+        サーバーが接続を切った場合（切断・421 応答）は接続し直して同じメールを
+        最大 max_retries 回まで再送します。宛先ごとのエラーはログに残して
+        次のメールへ進みます。
+
+        Returns:
+            送信に成功した件数
+        """
+        if not messages:
+            return 0
+        sent = 0
+        connection: Optional[smtplib.SMTP] = None
+        try:
+            for message in messages:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        if connection is None:
+                            connection = self._connect()
+                        connection.send_message(message)
+                        sent += 1
+                        break
+                    except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, ConnectionError) as e:
+                        transient = not isinstance(e, smtplib.SMTPResponseException) or e.smtp_code == 421
+                        if transient:
+                            # 接続が切れた（または切られる）ので次の送信で張り直す
+                            self._close(connection)
+                            connection = None
+                        if not transient or attempt == self.max_retries:
+                            logger.error(f"メール送信に失敗しました ({message['To']}): {e}")
+                            break
+                        self.reconnects += 1
+                        if attempt:
+                            time.sleep(min(2 ** attempt * 0.1, 2))
+                    except smtplib.SMTPRecipientsRefused as e:
+                        logger.error(f"メール送信に失敗しました ({message['To']}): {e}")
+                        break
+        finally:
+            self._close(connection)
+        logger.info(f"{sent}/{len(messages)}件のメールを送信しました")
+        return sent
+
+    def run(self, day: Optional[date] = None) -> int:
+        """指定日（省略時は今日）の誕生日メールをすべて送る"""
+        day = day or date.today()
+        messages = self.build_messages(day)
+        if not messages:
+            logger.info("今日は誕生日の人はいません")
+            return 0
+        return self.send_all(messages)
+
+
+def _is_leap_year(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def main() -> None:
+    """今日の誕生日メールを送る"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="誕生日メールの一括送信")
+    parser.add_argument("--csv", default="birthdays.csv")
+    args = parser.parse_args()
+
+    try:
+        scheduler = BirthdayScheduler.from_env()
+        scheduler.load_birthdays(args.csv)
+        scheduler.load_templates()
+        scheduler.run()
+    except Exception as e:
+        logger.error(f"処理中にエラーが発生しました: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import os
+import socket
+import time
+from datetime import date
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pytest
+from aiosmtpd.controller import Controller
+
+from birthday_scheduler import BirthdayScheduler
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "letter_templates")
+
+
+class RecordingHandler:
+    """受信したメールと接続数を数える aiosmtpd ハンドラ"""
+
+    def __init__(self, refuse: str = "") -> None:
+        self.refuse = refuse
+        # 0 以外なら drop_every 通目ごとに 421 を返して接続を切る
+        self.drop_every = 0
+        self.seen = 0
+        self.connections = 0
+        self.recipients: List[str] = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):  # noqa: N802
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):  # noqa: N802
+        if address == self.refuse:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):  # noqa: N802
+        self.seen += 1
+        if self.drop_every and self.seen % self.drop_every == 0:
+            return "421 Service not available, closing transmission channel"
+        self.recipients.extend(envelope.rcpt_tos)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server(request) -> Iterator[Tuple[RecordingHandler, int]]:
+    with socket.socket() as probe:  # 空いているポートを確保
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = RecordingHandler(getattr(request, "param", ""))
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+
+def write_csv(path: str, rows: List[Tuple[str, str, object, object]]) -> str:
+    pd.DataFrame(rows, columns=["name", "email", "month", "day"]).assign(year=1990).to_csv(path, index=False)
+    return path
+
+
+def scheduler_for(port: int = 25, **kwargs) -> BirthdayScheduler:
+    scheduler = BirthdayScheduler("me@example.com", smtp_server="127.0.0.1", smtp_port=port, use_tls=False, seed=0, **kwargs)
+    scheduler.load_templates(TEMPLATE_DIR)
+    return scheduler
+
+
+def test_same_birthday_keeps_everyone_and_skips_bad_rows(tmp_path) -> None:
+    path = write_csv(str(tmp_path / "people.csv"), [
+        ("A", "a@example.com", 6, 15),
+        ("B", "b@example.com", 6, 15),
+        ("C", "c@example.com", 1, 2),
+        ("Bad", "bad@example.com", 13, 1),
+        ("NoMail", None, 6, 15),
+    ])
+    scheduler = scheduler_for()
+    assert scheduler.load_birthdays(path) == 3
+    assert list(scheduler.names[scheduler.people_on(date(2024, 6, 15))]) == ["A", "B"]
+    assert len(scheduler.people_on(date(2024, 6, 16))) == 0
+
+
+def test_leap_day_birthdays_move_to_feb_28(tmp_path) -> None:
+    path = write_csv(str(tmp_path / "people.csv"), [("Leap", "l@example.com", 2, 29), ("Feb", "f@example.com", 2, 28)])
+    scheduler = scheduler_for()
+    scheduler.load_birthdays(path)
+    assert sorted(scheduler.names[scheduler.people_on(date(2023, 2, 28))]) == ["Feb", "Leap"]
+    assert list(scheduler.names[scheduler.people_on(date(2024, 2, 28))]) == ["Feb"]
+    assert list(scheduler.names[scheduler.people_on(date(2024, 2, 29))]) == ["Leap"]
+
+
+def test_messages_use_templates_and_override(tmp_path) -> None:
+    path = write_csv(str(tmp_path / "people.csv"), [("Ann", "a@example.com", 6, 15)])
+    scheduler = scheduler_for(recipient_override="test@example.com")
+    scheduler.load_birthdays(path)
+    [message] = scheduler.build_messages(date(2024, 6, 15))
+    assert message["To"] == "test@example.com"
+    assert "Ann" in message.get_content() and "[NAME]" not in message.get_content()
+
+
+def test_missing_templates(tmp_path) -> None:
+    with pytest.raises(FileNotFoundError):
+        BirthdayScheduler("me@example.com").load_templates(str(tmp_path))
+
+
+def write_people(path: str, count: int) -> str:
+    rng = np.random.default_rng(0)
+    ids = [str(i) for i in range(count)]
+    return write_csv(path, list(zip(
+        ["Person" + i for i in ids], ["person" + i + "@example.com" for i in ids],
+        rng.integers(1, 13, count), rng.integers(1, 29, count),
+    )))
+
+
+def test_sends_a_whole_day_over_one_connection(tmp_path, smtp_server) -> None:
+    handler, port = smtp_server
+    path = write_people(str(tmp_path / "people.csv"), 20_000)
+    scheduler = scheduler_for(port)
+    scheduler.load_birthdays(path)
+    expected = sorted(scheduler.emails[scheduler.people_on(date(2024, 6, 15))])
+
+    assert scheduler.run(date(2024, 6, 15)) == len(expected) > 30
+    assert sorted(handler.recipients) == expected
+    assert handler.connections == 1
+
+
+@pytest.mark.parametrize("smtp_server", ["b@example.com"], indirect=True)
+def test_refused_recipient_is_skipped(tmp_path, smtp_server) -> None:
+    handler, port = smtp_server
+    path = write_csv(str(tmp_path / "people.csv"), [
+        ("A", "a@example.com", 6, 15), ("B", "b@example.com", 6, 15), ("C", "c@example.com", 6, 15),
+    ])
+    scheduler = scheduler_for(port)
+    scheduler.load_birthdays(path)
+    assert scheduler.run(date(2024, 6, 15)) == 2
+    assert handler.recipients == ["a@example.com", "c@example.com"]
+
+
+def test_dropped_connections_are_reopened_and_the_message_resent(tmp_path, smtp_server) -> None:
+    handler, port = smtp_server
+    handler.drop_every = 10
+    path = write_csv(str(tmp_path / "people.csv"), [(f"P{i}", f"p{i}@example.com", 6, 15) for i in range(45)])
+    scheduler = scheduler_for(port)
+    scheduler.load_birthdays(path)
+
+    assert scheduler.run(date(2024, 6, 15)) == 45
+    assert sorted(handler.recipients) == sorted(f"p{i}@example.com" for i in range(45))
+    # 421 を受けるたびに接続し直している
+    assert scheduler.reconnects == handler.seen - 45 == 4
+    assert handler.connections == 5
+
+
+def test_gives_up_on_a_message_after_max_retries(tmp_path, smtp_server) -> None:
+    handler, port = smtp_server
+    handler.drop_every = 1
+    path = write_csv(str(tmp_path / "people.csv"), [("A", "a@example.com", 6, 15), ("B", "b@example.com", 6, 15)])
+    scheduler = scheduler_for(port, max_retries=1)
+    scheduler.load_birthdays(path)
+    assert scheduler.run(date(2024, 6, 15)) == 0
+    assert handler.seen == 4 and not handler.recipients
+
+
+@pytest.mark.slow
+def test_one_million_people(tmp_path, smtp_server) -> None:
+    handler, port = smtp_server
+    path = write_people(str(tmp_path / "people.csv"), 1_000_000)
+    scheduler = scheduler_for(port)
+
+    start = time.perf_counter()
+    assert scheduler.load_birthdays(path) == 1_000_000
+    loaded = time.perf_counter()
+    sent = scheduler.run(date(2024, 6, 15))
+    finished = time.perf_counter()
+
+    print(f"\n索引付け: {loaded - start:.2f} 秒, {sent} 件の送信: {finished - loaded:.2f} 秒")
+    assert sent == len(scheduler.people_on(date(2024, 6, 15))) == len(handler.recipients)
+    assert handler.connections == 1
@@ -8,12 +8,16 @@
 
 # ```python
 import os
-import time
 import smtplib
+import time
 import requests
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Callable, Optional
 from dotenv import load_dotenv
 
+import iss_pass_schedule
+import solar_position
+
 # -----------------------------
 # 定数
 # -----------------------------
@@ -38,40 +42,46 @@ EMAIL_PASSWORD = os.getenv("PASSWORD1", "")
 # -----------------------------
 # ISS が頭上にあるかどうか判定
 # -----------------------------
+_schedules: dict = {}
+
+
 def is_iss_overhead(lat: float, lng: float) -> bool:
+    # iss-now.json をポーリングせず、TLE から事前計算した通過スケジュールを引く
+    now = datetime.now(timezone.utc)
+    site = iss_pass_schedule.Site(f"{lat},{lng}", lat, lng)
+    schedule = _schedules.get(site)
+    if schedule is None or now >= schedule.valid_until - iss_pass_schedule.HORIZON / 2:
+        try:
+            tle = iss_pass_schedule.load_tle()
+        except (requests.RequestException, iss_pass_schedule.TLEError) as e:
+            print(f"[ERROR] TLE request failed: {e}")
+            return False
+        schedule = _schedules[site] = iss_pass_schedule.compute_schedules(tle, [site], now)[site]
+    return schedule.is_overhead(now)
+
+
+def is_iss_overhead_now(lat: float, lng: float) -> bool:
+    # TLE が使えないとき用: iss-now.json で現在位置を問い合わせる（経度は日付変更線をまたいで判定）
     try:
         response = requests.get(ISS_API_URL, timeout=10)
         response.raise_for_status()
-    except requests.RequestException as e:
+        position = response.json()["iss_position"]
+        iss_lat = float(position["latitude"])
+        iss_lng = float(position["longitude"])
+    except (requests.RequestException, KeyError, ValueError) as e:
         print(f"[ERROR] ISS API request failed: {e}")
         return False
 
-    data = response.json()
-    iss_lat = float(data["iss_position"]["latitude"])
-    iss_lng = float(data["iss_position"]["longitude"])
-
-    return (lat - 5) <= iss_lat <= (lat + 5) and (lng - 5) <= iss_lng <= (lng + 5)
+    lng_diff = (iss_lng - lng + 180) % 360 - 180
+    return abs(iss_lat - lat) <= 5 and abs(lng_diff) <= 5
 
 
 # -----------------------------
 # 現在が夜かどうか判定
 # -----------------------------
 def is_night(lat: float, lng: float) -> bool:
-    params = {"lat": lat, "lng": lng, "formatted": 0}
-
-    try:
-        response = requests.get(SUN_API_URL, params=params, timeout=10)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        print(f"[ERROR] Sunrise-Sunset API request failed: {e}")
-        return False
-
-    data = response.json()
-    sunrise_hour = int(data["results"]["sunrise"].split("T")[1].split(":")[0])
-    sunset_hour = int(data["results"]["sunset"].split("T")[1].split(":")[0])
-
-    current_hour = datetime.utcnow().hour  # API が UTC を返すので合わせる
-    return current_hour >= sunset_hour or current_hour <= sunrise_hour
+    # API を呼ばずに NOAA アルゴリズムで計算し、時だけでなく分・秒まで比較する
+    return solar_position.is_night(datetime.now(timezone.utc), lat, lng)
 
 
 # -----------------------------
@@ -99,16 +109,39 @@ def send_email(subject: str, body: str, to_addr: str) -> None:
 # -----------------------------
 # メイン処理
 # -----------------------------
-def main():
+def notify_overhead() -> None:
+    send_email(
+        subject="Look Up👆",
+        body="The ISS is above you in the sky.",
+        to_addr=EMAIL_ADDRESS,
+    )
+
+
+def poll_iss_now(sleep: Callable[[float], None] = time.sleep, cycles: Optional[int] = None) -> None:
+    # CHECK_INTERVAL ごとに iss-now.json で確認する（TLE が使えないときの動作）
+    count = 0
+    while cycles is None or count < cycles:
+        sleep(CHECK_INTERVAL)
+        if is_iss_overhead_now(TOKYO_LAT, TOKYO_LNG) and is_night(TOKYO_LAT, TOKYO_LNG):
+            notify_overhead()
+        count += 1
+
+
+def main(sleep: Callable[[float], None] = time.sleep, cycles: Optional[int] = None):
     print("[INFO] ISS Tracker started.")
-    while True:
-        time.sleep(CHECK_INTERVAL)
-        if is_iss_overhead(TOKYO_LAT, TOKYO_LNG) and is_night(TOKYO_LAT, TOKYO_LNG):
-            send_email(
-                subject="Look Up👆",
-                body="The ISS is above you in the sky.",
-                to_addr=EMAIL_ADDRESS,
-            )
+    # CHECK_INTERVAL ごとのポーリングではなく、次の夜の通過まで眠る
+    tokyo = iss_pass_schedule.Site("Tokyo", TOKYO_LAT, TOKYO_LNG)
+    try:
+        iss_pass_schedule.run_tracker(
+            [tokyo],
+            notify=lambda site, iss_pass: notify_overhead(),
+            tle_loader=iss_pass_schedule.load_tle,
+            sleep=sleep,
+        )
+    except (requests.RequestException, iss_pass_schedule.TLEError, OSError) as e:
+        # オフラインで TLE のキャッシュもない場合など: 従来のポーリングで続ける
+        print(f"[WARN] TLE が使えないため iss-now.json のポーリングに切り替えます: {e}")
+        poll_iss_now(sleep=sleep, cycles=cycles)
 
 
 if __name__ == "__main__":
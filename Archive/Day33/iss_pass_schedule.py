@@ -0,0 +1,355 @@
+# TLE からの ISS 軌道予測と通過スケジュール
+#
+# * **ポーリング不要**: `iss-now.json` を定期的に呼ぶ代わりに、キャッシュした TLE から
+#   ISS の位置を計算する（通過の見逃しもない）
+# * **SGP4**: `sgp4` パッケージがあればそれを使い、なければ J2 摂動と抗力項
+#   （TLE の ndot）を入れた簡易モデルで計算する
+# * **通過スケジュール**: 監視地点ごとに「頭上（±5 度）にいる時間帯」を事前計算し、
+#   `is_overhead` は二分探索で引くだけにする
+# * **次の通過まで待機**: トラッカーは CHECK_INTERVAL ごとではなく、次の通過まで眠る
+
+import bisect
+import math
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import requests
+
+import solar_position
+
+try:
+    from sgp4.api import Satrec
+except ImportError:  # sgp4 がなければ簡易モデルを使う
+    Satrec = None
+
+TLE_URL = "https://celestrak.org/NORAD/elements/gp.php?CATNR=25544&FORMAT=TLE"
+TLE_CACHE_FILE = os.path.join(os.path.dirname(__file__), "iss.tle")
+TLE_MAX_AGE = timedelta(days=1)
+
+OVERHEAD_RANGE = 5  # ±5 度以内なら頭上とみなす（is_iss_overhead と同じ基準）
+STEP_SECONDS = 20
+HORIZON = timedelta(hours=48)
+
+MU = 398600.4418  # km^3/s^2
+EARTH_RADIUS = 6378.137  # km
+J2 = 1.08262668e-3
+WGS84_E2 = 6.69437999014e-3
+UNIX_EPOCH_JD = 2440587.5
+
+# 動作確認用のサンプル TLE（実運用では TLE_URL から取得したものを使う）
+SAMPLE_TLE = (
+    "1 25544U 98067A   08264.51782528 -.00002182  00000-0 -11606-4 0  2927",
+    "2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.72125391563537",
+)
+
+
+class Site(NamedTuple):
+    """監視地点"""
+
+    name: str
+    lat: float
+    lng: float
+
+
+# -----------------------------
+# TLE の読み込みとキャッシュ
+# -----------------------------
+@dataclass(frozen=True)
+class TwoLineElement:
+    line1: str
+    line2: str
+    epoch: datetime
+    inclination: float  # rad
+    raan: float  # rad
+    eccentricity: float
+    arg_perigee: float  # rad
+    mean_anomaly: float  # rad
+    mean_motion: float  # rev/day
+    ndot: float  # rev/day^2（TLE の値 = 平均運動の 1 階微分 / 2）
+
+    @classmethod
+    def parse(cls, line1: str, line2: str) -> "TwoLineElement":
+        year = int(line1[18:20])
+        year += 2000 if year < 57 else 1900
+        epoch = datetime(year, 1, 1, tzinfo=timezone.utc) + timedelta(days=float(line1[20:32]) - 1)
+        return cls(
+            line1=line1,
+            line2=line2,
+            epoch=epoch,
+            inclination=math.radians(float(line2[8:16])),
+            raan=math.radians(float(line2[17:25])),
+            eccentricity=float("0." + line2[26:33].strip()),
+            arg_perigee=math.radians(float(line2[34:42])),
+            mean_anomaly=math.radians(float(line2[43:51])),
+            mean_motion=float(line2[52:63]),
+            ndot=float(line1[33:43]),
+        )
+
+
+class TLEError(Exception):
+    """有効な TLE が得られないときの例外"""
+
+
+def _tle_checksum_ok(line: str) -> bool:
+    """TLE 行の末尾のチェックサム（数字の和 + "-" の数 の mod 10）を確認"""
+    if len(line) < 69 or not line[68].isdigit():
+        return False
+    total = sum(int(char) if char.isdigit() else char == "-" for char in line[:68])
+    return total % 10 == int(line[68])
+
+
+def parse_tle_text(text: str) -> Optional[Tuple[str, str]]:
+    """テキストから ISS の TLE の 1 行目・2 行目を取り出す（なければ None）
+
+    CelesTrak はデータがないときも 200 で "No GP data found" などを返すため、
+    行の形式とチェックサムまで確認する。
+    """
+    lines = [line.rstrip() for line in text.splitlines() if line.strip()]
+    for line1, line2 in zip(lines, lines[1:]):
+        if (
+            line1.startswith("1 ")
+            and line2.startswith("2 ")
+            and line1[2:7] == line2[2:7]
+            and _tle_checksum_ok(line1)
+            and _tle_checksum_ok(line2)
+        ):
+            return line1, line2
+    return None
+
+
+def load_tle(
+    cache_file: str = TLE_CACHE_FILE, url: str = TLE_URL, max_age: timedelta = TLE_MAX_AGE
+) -> TwoLineElement:
+    """キャッシュした TLE を返す。古ければ取得し直し、取得に失敗したら古いものを使う
+
+    有効な TLE を含まないレスポンスはキャッシュに書き込まない。
+    使える TLE がどこにもなければ TLEError（通信エラーならその例外）を送出する。
+    """
+    fresh = (
+        os.path.exists(cache_file)
+        and time.time() - os.path.getmtime(cache_file) < max_age.total_seconds()
+    )
+    if not fresh:
+        try:
+            response = requests.get(url, timeout=10)
+            response.raise_for_status()
+            lines = parse_tle_text(response.text)
+            if lines is None:
+                raise TLEError(f"TLE が含まれないレスポンスです: {response.text[:80]!r}")
+            directory = os.path.dirname(os.path.abspath(cache_file))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as tle_file:
+                tle_file.write("\n".join(lines) + "\n")
+            os.replace(tmp_path, cache_file)
+            return TwoLineElement.parse(*lines)
+        except (requests.RequestException, TLEError) as e:
+            if not os.path.exists(cache_file):
+                raise
+            print(f"[WARN] TLE の取得に失敗したためキャッシュを使います: {e}")
+
+    with open(cache_file, encoding="utf-8") as tle_file:
+        lines = parse_tle_text(tle_file.read())
+    if lines is None:
+        raise TLEError(f"{cache_file} に有効な TLE がありません")
+    return TwoLineElement.parse(*lines)
+
+
+# -----------------------------
+# 軌道計算
+# -----------------------------
+def _to_julian(unix_seconds: np.ndarray) -> np.ndarray:
+    return unix_seconds / 86400.0 + UNIX_EPOCH_JD
+
+
+def _propagate_j2(tle: TwoLineElement, unix_seconds: np.ndarray) -> np.ndarray:
+    """J2 の永年摂動と ndot による減速を入れたケプラー運動（TEME 近似, km）"""
+    n0 = tle.mean_motion * 2 * math.pi / 86400  # rad/s
+    e = tle.eccentricity
+    i = tle.inclination
+    a = (MU / n0**2) ** (1 / 3)
+    p = a * (1 - e**2)
+    factor = 1.5 * n0 * J2 * (EARTH_RADIUS / p) ** 2
+    raan_dot = -factor * math.cos(i)
+    argp_dot = 0.5 * factor * (5 * math.cos(i) ** 2 - 1)
+    mean_dot = n0 + 0.5 * factor * math.sqrt(1 - e**2) * (3 * math.cos(i) ** 2 - 1)
+
+    dt = unix_seconds - tle.epoch.timestamp()
+    days = dt / 86400
+    mean_anomaly = tle.mean_anomaly + mean_dot * dt + 2 * math.pi * tle.ndot * days**2
+    raan = tle.raan + raan_dot * dt
+    arg_perigee = tle.arg_perigee + argp_dot * dt
+
+    eccentric = mean_anomaly.copy()
+    for _ in range(6):  # ケプラー方程式をニュートン法で解く
+        eccentric -= (eccentric - e * np.sin(eccentric) - mean_anomaly) / (1 - e * np.cos(eccentric))
+    true_anomaly = 2 * np.arctan2(
+        math.sqrt(1 + e) * np.sin(eccentric / 2), math.sqrt(1 - e) * np.cos(eccentric / 2)
+    )
+    radius = a * (1 - e * np.cos(eccentric))
+    u = arg_perigee + true_anomaly
+
+    cos_raan, sin_raan = np.cos(raan), np.sin(raan)
+    cos_u, sin_u = np.cos(u), np.sin(u)
+    return np.stack([
+        radius * (cos_raan * cos_u - sin_raan * sin_u * math.cos(i)),
+        radius * (sin_raan * cos_u + cos_raan * sin_u * math.cos(i)),
+        radius * sin_u * math.sin(i),
+    ], axis=-1)
+
+
+def propagate(tle: TwoLineElement, unix_seconds: np.ndarray, use_sgp4: bool = True) -> np.ndarray:
+    """UNIX 時刻の配列に対する ISS の位置（TEME, km, shape=(n, 3)）"""
+    unix_seconds = np.asarray(unix_seconds, dtype=float)
+    if use_sgp4 and Satrec is not None:
+        satellite = Satrec.twoline2rv(tle.line1, tle.line2)
+        jd = _to_julian(unix_seconds)
+        whole = np.floor(jd)
+        _, positions, _ = satellite.sgp4_array(whole, jd - whole)
+        return positions
+    return _propagate_j2(tle, unix_seconds)
+
+
+def subpoint(positions: np.ndarray, unix_seconds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """TEME 座標から直下点の測地緯度・経度（度）を計算"""
+    jd = _to_julian(np.asarray(unix_seconds, dtype=float))
+    gmst = np.radians((280.46061837 + 360.98564736629 * (jd - 2451545.0)) % 360)
+    x, y, z = positions[:, 0], positions[:, 1], positions[:, 2]
+    lng = np.degrees(np.arctan2(y, x) - gmst)
+    lng = (lng + 180) % 360 - 180
+    lat = np.degrees(np.arctan2(z, np.hypot(x, y) * (1 - WGS84_E2)))
+    return lat, lng
+
+
+# -----------------------------
+# 通過スケジュール
+# -----------------------------
+@dataclass(frozen=True)
+class Pass:
+    start: datetime
+    end: datetime
+    night: bool  # 通過中に夜の時間帯があるか（=見える可能性がある）
+
+
+@dataclass
+class PassSchedule:
+    """1 地点分の「頭上にいる時間帯」のリスト"""
+
+    site: Site
+    passes: List[Pass]
+    valid_until: datetime
+    _starts: List[datetime] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._starts = [p.start for p in self.passes]
+
+    def pass_at(self, when: datetime) -> Optional[Pass]:
+        """when に頭上を通過中ならその Pass"""
+        index = bisect.bisect_right(self._starts, when) - 1
+        if index >= 0 and when < self.passes[index].end:
+            return self.passes[index]
+        return None
+
+    def is_overhead(self, when: datetime) -> bool:
+        return self.pass_at(when) is not None
+
+    def next_visible_pass(self, after: datetime) -> Optional[Pass]:
+        """after 以降（通過中を含む）に夜に見える最初の通過"""
+        index = max(bisect.bisect_right(self._starts, after) - 1, 0)
+        for candidate in self.passes[index:]:
+            if candidate.end > after and candidate.night:
+                return candidate
+        return None
+
+
+def _intervals(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """True が続く区間の [開始, 終了) インデックス"""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def _daylight_mask(site: Site, unix_seconds: np.ndarray) -> np.ndarray:
+    first = datetime.fromtimestamp(unix_seconds[0], timezone.utc).date() - timedelta(days=1)
+    last = datetime.fromtimestamp(unix_seconds[-1], timezone.utc).date() + timedelta(days=1)
+    mask = np.zeros(len(unix_seconds), dtype=bool)
+    day = first
+    while day <= last:
+        sunrise, sunset = solar_position.solar_times(day, site.lat, site.lng)
+        mask |= (unix_seconds >= sunrise.timestamp()) & (unix_seconds < sunset.timestamp())
+        day += timedelta(days=1)
+    return mask
+
+
+def compute_schedules(
+    tle: TwoLineElement,
+    sites: Sequence[Site],
+    start: datetime,
+    horizon: timedelta = HORIZON,
+    step: int = STEP_SECONDS,
+) -> Dict[Site, PassSchedule]:
+    """全地点の通過スケジュールを計算（軌道計算は全地点で 1 回だけ）"""
+    unix_seconds = np.arange(start.timestamp(), (start + horizon).timestamp(), step, dtype=float)
+    iss_lat, iss_lng = subpoint(propagate(tle, unix_seconds), unix_seconds)
+
+    schedules = {}
+    for site in sites:
+        lng_diff = (iss_lng - site.lng + 180) % 360 - 180
+        overhead = (np.abs(iss_lat - site.lat) <= OVERHEAD_RANGE) & (np.abs(lng_diff) <= OVERHEAD_RANGE)
+        night = ~_daylight_mask(site, unix_seconds)
+        passes = [
+            Pass(
+                start=datetime.fromtimestamp(unix_seconds[begin], timezone.utc),
+                end=datetime.fromtimestamp(unix_seconds[end - 1] + step, timezone.utc),
+                night=bool(night[begin:end].any()),
+            )
+            for begin, end in _intervals(overhead)
+        ]
+        schedules[site] = PassSchedule(site, passes, valid_until=start + horizon)
+    return schedules
+
+
+# -----------------------------
+# 次の通過まで眠るトラッカー
+# -----------------------------
+def run_tracker(
+    sites: Sequence[Site],
+    notify: Callable[[Site, Pass], None],
+    tle_loader: Callable[[], TwoLineElement] = load_tle,
+    clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    sleep: Callable[[float], None] = time.sleep,
+    refresh: timedelta = timedelta(hours=12),
+    max_passes: Optional[int] = None,
+) -> int:
+    """夜の通過の開始時刻まで眠り、通知する。refresh ごとに TLE とスケジュールを更新"""
+    notified = 0
+    # 地点ごとに通知済みの通過の終了時刻（以降の通過だけを探す）
+    announced_until: Dict[Site, datetime] = {}
+    while max_passes is None or notified < max_passes:
+        now = clock()
+        schedules = compute_schedules(tle_loader(), sites, now)
+        recompute_at = now + refresh
+        while max_passes is None or notified < max_passes:
+            now = clock()
+            upcoming = [
+                (next_pass.start, site, next_pass)
+                for site, schedule in schedules.items()
+                if (next_pass := schedule.next_visible_pass(max(now, announced_until.get(site, now))))
+                is not None
+            ]
+            if not upcoming:
+                sleep(max((recompute_at - now).total_seconds(), 0))
+                break
+            start, site, next_pass = min(upcoming, key=lambda item: item[0])
+            if start >= recompute_at:
+                sleep(max((recompute_at - now).total_seconds(), 0))
+                break
+            if start > now:
+                sleep((start - now).total_seconds())
+            announced_until[site] = next_pass.end
+            notify(site, next_pass)
+            notified += 1
+    return notified
@@ -0,0 +1,278 @@
+# asyncio 版 ISS トラッカー
+#
+# * **共有クライアント**: すべてのリクエストを 1 つの `httpx.AsyncClient` で送る
+# * **日の出・日の入りのキャッシュ**: (日付, 緯度, 経度) ごとに 1 回だけ取得
+#   （既定では `solar_position.py` でオフライン計算し、API は呼ばない）
+# * **夜だけ ISS を取得**: どの地点も昼なら ISS API を呼ばない
+# * **複数地点の同時監視**: ISS の位置は全地点で共通なので 1 周期 1 リクエスト
+# * **通過予測の時間帯だけポーリング**: TLE があれば `iss_pass_schedule` で夜の通過を
+#   予測し、その前後の時間帯だけ ISS API を呼ぶ（それ以外は次の時間帯まで眠る）。
+#   TLE が得られないときは従来どおり CHECK_INTERVAL ごとに確認する
+# * **スタブサーバーでのテスト**: `tests/test_iss_tracker_async.py` で 1 日分の
+#   リクエスト数を旧実装と比較
+
+import asyncio
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import requests
+
+from is_iss_overhead import (
+    CHECK_INTERVAL,
+    EMAIL_ADDRESS,
+    ISS_API_URL,
+    SUN_API_URL,
+    TOKYO_LAT,
+    TOKYO_LNG,
+    send_email,
+)
+from iss_pass_schedule import Site, TLEError, TwoLineElement, compute_schedules, load_tle
+from solar_position import SolarTimes, solar_times
+
+OVERHEAD_RANGE = 5  # ±5 度以内なら頭上とみなす
+PASS_MARGIN = timedelta(minutes=1)  # 予測のずれに備えて通過の前後に足す時間
+WINDOW_POLL = 20  # 通過の時間帯の中でのポーリング間隔（秒、予測の刻み STEP_SECONDS と同じ）
+SCHEDULE_REFRESH = timedelta(hours=12)  # TLE と通過予測を更新する間隔
+
+
+@dataclass(frozen=True)
+class Observer:
+    """監視地点と通知先"""
+
+    name: str
+    lat: float
+    lng: float
+    email: str = EMAIL_ADDRESS
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def is_near(observer: Observer, iss_lat: float, iss_lng: float) -> bool:
+    """ISS が監視地点の ±OVERHEAD_RANGE 度以内にあるか（経度は日付変更線をまたいで判定）"""
+    lng_diff = (iss_lng - observer.lng + 180) % 360 - 180
+    return abs(iss_lat - observer.lat) <= OVERHEAD_RANGE and abs(lng_diff) <= OVERHEAD_RANGE
+
+
+# -----------------------------
+# 日の出・日の入りのキャッシュ
+# -----------------------------
+class SolarTimesCache:
+    """sunrise-sunset API の結果を (日付, 緯度, 経度) ごとにキャッシュ"""
+
+    def __init__(self, client: httpx.AsyncClient, url: str = SUN_API_URL) -> None:
+        self.client = client
+        self.url = url
+        # 同じキーへの同時リクエストは 1 つのタスクを共有する
+        self._cache: Dict[Tuple[date, float, float], "asyncio.Task[SolarTimes]"] = {}
+
+    async def fetch(self, day: date, lat: float, lng: float) -> SolarTimes:
+        """API から指定日の日の出・日の入り（UTC）を取得"""
+        params = {"lat": lat, "lng": lng, "date": day.isoformat(), "formatted": 0}
+        response = await self.client.get(self.url, params=params, timeout=10)
+        response.raise_for_status()
+        results = response.json()["results"]
+        return (
+            datetime.fromisoformat(results["sunrise"]),
+            datetime.fromisoformat(results["sunset"]),
+        )
+
+    async def get(self, day: date, lat: float, lng: float) -> SolarTimes:
+        key = (day, round(lat, 4), round(lng, 4))
+        task = self._cache.get(key)
+        if task is None:
+            task = self._cache[key] = asyncio.ensure_future(self.fetch(day, lat, lng))
+        try:
+            return await task
+        except Exception:
+            self._cache.pop(key, None)  # 失敗した結果はキャッシュしない
+            raise
+
+    async def is_night(self, now: datetime, lat: float, lng: float) -> bool:
+        """now が夜かどうか
+
+        API の日付は現地の日付なので、UTC の日付と現地の日付がずれる地域では
+        隣の日の昼間（東経なら翌日、西経なら前日）も確認する。
+        """
+        today = now.date()
+        neighbour = today + timedelta(days=1 if lng >= 0 else -1)
+        for day in (today, neighbour):
+            sunrise, sunset = await self.get(day, lat, lng)
+            if sunrise <= now < sunset:
+                return False
+        return True
+
+    def prune(self, before: date) -> None:
+        """古い日付のキャッシュを削除"""
+        for key in [key for key in self._cache if key[0] < before]:
+            del self._cache[key]
+
+
+class LocalSolarTimes(SolarTimesCache):
+    """API の代わりに NOAA アルゴリズムでオフライン計算する SolarTimesCache"""
+
+    def __init__(self) -> None:
+        super().__init__(client=None)  # type: ignore[arg-type]
+
+    async def fetch(self, day: date, lat: float, lng: float) -> SolarTimes:
+        return solar_times(day, lat, lng)
+
+
+# -----------------------------
+# 監視ループ
+# -----------------------------
+Notifier = Callable[[Observer], Awaitable[None]]
+
+
+async def email_notifier(observer: Observer) -> None:
+    """ブロッキングする smtplib はスレッドで実行"""
+    await asyncio.to_thread(
+        send_email,
+        subject="Look Up👆",
+        body=f"The ISS is above you in the sky ({observer.name}).",
+        to_addr=observer.email,
+    )
+
+
+class IssWatcher:
+    """複数地点を同時に監視する ISS トラッカー"""
+
+    def __init__(
+        self,
+        observers: Sequence[Observer],
+        client: httpx.AsyncClient,
+        solar: Optional[SolarTimesCache] = None,
+        notify: Notifier = email_notifier,
+        iss_url: str = ISS_API_URL,
+        check_interval: float = CHECK_INTERVAL,
+        clock: Callable[[], datetime] = utc_now,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        tle_loader: Optional[Callable[[], TwoLineElement]] = None,
+        window_poll: float = WINDOW_POLL,
+    ) -> None:
+        """tle_loader を渡すと、予測した夜の通過の時間帯だけ ISS API を呼ぶ"""
+        self.observers = list(observers)
+        self.client = client
+        self.solar = solar or LocalSolarTimes()
+        self.notify = notify
+        self.iss_url = iss_url
+        self.check_interval = check_interval
+        self.clock = clock
+        self.sleep = sleep
+        self.tle_loader = tle_loader
+        self.window_poll = window_poll
+        # ポーリングする時間帯 [開始, 終了)（None なら check_interval ごとに確認）
+        self.windows: Optional[List[Tuple[datetime, datetime]]] = None
+        self._windows_until: Optional[datetime] = None
+
+    async def fetch_iss_position(self) -> Optional[Tuple[float, float]]:
+        try:
+            response = await self.client.get(self.iss_url, timeout=10)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            print(f"[ERROR] ISS API request failed: {e}")
+            return None
+        position = response.json()["iss_position"]
+        return float(position["latitude"]), float(position["longitude"])
+
+    async def _night_observers(self, now: datetime) -> List[Observer]:
+        async def check(observer: Observer) -> bool:
+            try:
+                return await self.solar.is_night(now, observer.lat, observer.lng)
+            except (httpx.HTTPError, KeyError, ValueError) as e:
+                print(f"[ERROR] Sunrise-Sunset API request failed: {e}")
+                return False
+
+        flags = await asyncio.gather(*(check(observer) for observer in self.observers))
+        return [observer for observer, night in zip(self.observers, flags) if night]
+
+    async def check_once(self) -> List[Observer]:
+        """1 周期分のチェックを行い、通知した地点を返す"""
+        now = self.clock()
+        night = await self._night_observers(now)
+        if not night:
+            return []  # どこも昼なら ISS API は呼ばない
+
+        position = await self.fetch_iss_position()
+        if position is None:
+            return []
+        overhead = [observer for observer in night if is_near(observer, *position)]
+        await asyncio.gather(*(self.notify(observer) for observer in overhead))
+        return overhead
+
+    async def _update_windows(self, now: datetime) -> None:
+        """TLE から全地点の夜の通過を予測し、前後に余裕を足して重なりをまとめる"""
+        self._windows_until = now + SCHEDULE_REFRESH
+        try:
+            tle = await asyncio.to_thread(self.tle_loader)  # type: ignore[arg-type]
+        except (TLEError, requests.RequestException, OSError) as e:
+            print(f"[WARN] TLE を取得できないため {self.check_interval} 秒ごとに確認します: {e}")
+            self.windows = None
+            return
+        sites = [Site(observer.name, observer.lat, observer.lng) for observer in self.observers]
+        schedules = compute_schedules(tle, sites, now, horizon=SCHEDULE_REFRESH)
+        passes = sorted(
+            (p.start - PASS_MARGIN, p.end + PASS_MARGIN)
+            for schedule in schedules.values()
+            for p in schedule.passes
+            if p.night
+        )
+        windows: List[Tuple[datetime, datetime]] = []
+        for start, end in passes:
+            if windows and start <= windows[-1][1]:
+                windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+            else:
+                windows.append((start, end))
+        self.windows = windows
+
+    async def next_wait(self) -> float:
+        """次のチェックまでの秒数
+
+        通過予測の時間帯の中なら window_poll、外なら次の時間帯の開始（または
+        予測の更新時刻）まで。予測がなければ check_interval。
+        """
+        if self.tle_loader is None:
+            return self.check_interval
+        now = self.clock()
+        if self._windows_until is None or now >= self._windows_until:
+            await self._update_windows(now)
+        if self.windows is None or self._windows_until is None:
+            return self.check_interval
+        for start, end in self.windows:
+            if now < start:
+                return (min(start, self._windows_until) - now).total_seconds()
+            if now < end:
+                return self.window_poll
+        return (self._windows_until - now).total_seconds()
+
+    def _in_window(self, now: datetime) -> bool:
+        return self.windows is None or any(start <= now < end for start, end in self.windows)
+
+    async def run(self, cycles: Optional[int] = None, until: Optional[datetime] = None) -> None:
+        """次のチェック時刻まで眠ってはチェックする
+
+        cycles を指定するとその回数、until を指定するとその時刻で終了。
+        """
+        count = 0
+        while cycles is None or count < cycles:
+            await self.sleep(await self.next_wait())
+            now = self.clock()
+            if until is not None and now >= until:
+                return
+            if self._in_window(now):  # 予測の更新時刻に起きた場合は確認しない
+                await self.check_once()
+            self.solar.prune(now.date() - timedelta(days=1))
+            count += 1
+
+
+async def main(observers: Sequence[Observer]) -> None:
+    print("[INFO] ISS Tracker (async) started.")
+    async with httpx.AsyncClient() as client:
+        await IssWatcher(observers, client, tle_loader=load_tle).run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main([Observer("Tokyo", TOKYO_LAT, TOKYO_LNG)]))
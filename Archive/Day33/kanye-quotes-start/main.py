@@ -1,18 +1,23 @@
 import tkinter as tk
-import requests
+
+from quote_buffer import QuoteBuffer
 
 def get_quote():
-    response = requests.get(url="https://api.kanye.rest")
-    response.raise_for_status()
+    # 先読み済みの名言を取り出すだけなので、通信待ちで画面が固まらない
+    canvas.itemconfig(quote_text, text=quotes.next_quote())
+
 
-    data = response.json()
-    quote = data["quote"]
-    canvas.itemconfig(quote_text, text=quote)
+def on_close():
+    quotes.close()
+    window.destroy()
 
 
 window = tk.Tk()
 window.title("Kanye Says...")
 window.config(padx=50, pady=50)
+window.protocol("WM_DELETE_WINDOW", on_close)
+
+quotes = QuoteBuffer(after=window.after)
 
 canvas = tk.Canvas(width=300, height=414)
 background_img = tk.PhotoImage(file="background.png")
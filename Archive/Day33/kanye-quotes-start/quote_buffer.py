@@ -0,0 +1,181 @@
+"""名言の先読みバッファとディスクキャッシュ
+
+``api.kanye.rest`` への問い合わせはバックグラウンドスレッドで行い、
+取得した名言をリングバッファに貯めておきます。ボタンを押した時は
+バッファから取り出すだけなので、ネットワークの往復で Tk のメインループが
+止まることはありません。受け取った結果は ``window.after`` のポーリングで
+メインスレッドに戻します（Tk はスレッドセーフではないため）。
+
+取得済みの名言はディスクにも保存し、起動直後やオフライン時は
+そこからランダムに表示します。
+"""
+
+import json
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+import requests
+
+API_URL = "https://api.kanye.rest"
+CACHE_FILE = os.path.join(os.path.dirname(__file__), "quotes_cache.json")
+PLACEHOLDER = "Kanye is thinking..."
+
+AfterFunc = Callable[..., str]
+
+
+def fetch_quote(session: requests.Session, url: str = API_URL) -> str:
+    """API から名言を 1 件取得"""
+    response = session.get(url, timeout=10)
+    response.raise_for_status()
+    return response.json()["quote"]
+
+
+class QuoteBuffer:
+    """バックグラウンドで補充される名言のリングバッファ"""
+
+    POLL_MS = 50
+    # 取得に失敗した時の待ち時間（秒）。失敗が続くたびに倍にする
+    RETRY_DELAY = 2.0
+    MAX_RETRY_DELAY = 60.0
+    # ディスクキャッシュに残す最大件数
+    CACHE_LIMIT = 500
+
+    def __init__(
+        self,
+        url: str = API_URL,
+        capacity: int = 10,
+        cache_path: Optional[str] = CACHE_FILE,
+        after: Optional[AfterFunc] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        """capacity 件まで先読みし、cache_path に取得済みの名言を保存する"""
+        self.url = url
+        self.capacity = capacity
+        self.cache_path = cache_path
+        self.buffer: Deque[str] = deque(maxlen=capacity)
+        self.cached: List[str] = self._load_cache()
+        self._cached_set = set(self.cached)
+        self._unsaved = 0
+        self._random = random.Random(seed)
+        self._after = after
+        self._in_flight = 0
+        self._requests: "queue.Queue[Optional[bool]]" = queue.Queue()
+        self._results: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+        self._refill()
+        if self._after:
+            self._after(self.POLL_MS, self._poll_loop)
+
+    # ディスクキャッシュ
+
+    def _load_cache(self) -> List[str]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return []
+        try:
+            with open(self.cache_path, encoding="utf-8") as cache_file:
+                return [quote for quote in json.load(cache_file) if isinstance(quote, str)]
+        except (OSError, ValueError) as e:
+            print(f"キャッシュの読み込みエラー: {e}")
+            return []
+
+    def save_cache(self) -> None:
+        """取得済みの名言を一時ファイル経由で書き出す"""
+        if not self.cache_path or not self._unsaved:
+            return
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            json.dump(self.cached[-self.CACHE_LIMIT:], out, ensure_ascii=False, indent=0)
+        os.replace(tmp_path, self.cache_path)
+        self._unsaved = 0
+
+    def _remember(self, quote: str) -> None:
+        if quote in self._cached_set:
+            return
+        self.cached.append(quote)
+        self._cached_set.add(quote)
+        self._unsaved += 1
+        if self._unsaved >= 10:
+            self.save_cache()
+
+    # バックグラウンド取得
+
+    def _work(self) -> None:
+        """ワーカースレッド: 依頼ごとに 1 件取得して結果キューへ"""
+        session = requests.Session()
+        delay = self.RETRY_DELAY
+        while True:
+            if self._requests.get() is None:
+                session.close()
+                return
+            try:
+                quote: Optional[str] = fetch_quote(session, self.url)
+                delay = self.RETRY_DELAY
+            except (requests.RequestException, KeyError, ValueError) as e:
+                print(f"名言の取得エラー: {e}")
+                quote = None
+            self._results.put(quote)
+            if quote is None:
+                time.sleep(delay)  # オフラインの間は API を連打しない
+                delay = min(delay * 2, self.MAX_RETRY_DELAY)
+
+    def _refill(self) -> None:
+        """バッファの空き分だけ取得を依頼"""
+        for _ in range(self.capacity - len(self.buffer) - self._in_flight):
+            self._in_flight += 1
+            self._requests.put(True)
+
+    def poll(self) -> int:
+        """取得済みの名言をバッファに移す（メインスレッドで呼ぶ）"""
+        received = 0
+        while True:
+            try:
+                quote = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._in_flight -= 1
+            if quote is not None:
+                self.buffer.append(quote)
+                self._remember(quote)
+                received += 1
+        self._refill()
+        return received
+
+    def _poll_loop(self) -> None:
+        self.poll()
+        if self._after:
+            self._after(self.POLL_MS, self._poll_loop)
+
+    # 取り出し
+
+    def next_quote(self) -> str:
+        """バッファから 1 件取り出す。空ならディスクキャッシュからランダムに返す"""
+        if self.buffer:
+            quote = self.buffer.popleft()
+            self._refill()
+            return quote
+        self._refill()
+        if self.cached:
+            return self._random.choice(self.cached)
+        return PLACEHOLDER
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """未処理の依頼を捨ててワーカースレッドを止め、キャッシュを保存"""
+        while True:
+            try:
+                self._requests.get_nowait()
+            except queue.Empty:
+                break
+        self._requests.put(None)
+        if timeout:
+            self._worker.join(timeout)
+        self.poll()
+        self.save_cache()
+
@@ -0,0 +1,145 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator, List, Tuple
+
+import pytest
+
+from quote_buffer import PLACEHOLDER, QuoteBuffer
+
+
+class StubServer:
+    """api.kanye.rest のスタブ。gate が閉じている間は応答を止める"""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.fail = False
+        self.gate = threading.Event()
+        self.gate.set()
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                stub.gate.wait()
+                with lock:
+                    stub.requests += 1
+                    number = stub.requests
+                if stub.fail:
+                    self.send_error(503)
+                    return
+                payload = json.dumps({"quote": f"Quote #{number}"}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def stub() -> Iterator[StubServer]:
+    server = StubServer()
+    yield server
+    server.gate.set()
+    server.server.shutdown()
+
+
+def poll_until(quotes: QuoteBuffer, condition: Callable[[], bool], timeout: float = 5.0) -> bool:
+    """メインループの代わりにポーリングしながら待つ"""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        quotes.poll()
+        time.sleep(0.005)
+    return condition()
+
+
+def test_prefetch_fills_the_buffer_up_to_capacity(stub: StubServer, tmp_path) -> None:
+    quotes = QuoteBuffer(stub.url, capacity=5, cache_path=str(tmp_path / "quotes.json"))
+    assert poll_until(quotes, lambda: len(quotes.buffer) == 5)
+    time.sleep(0.1)
+    quotes.poll()
+    # 満杯の間は追加の取得を依頼しない
+    assert stub.requests == 5
+    quotes.close(timeout=1)
+
+
+def test_press_does_not_wait_for_the_network(stub: StubServer, tmp_path) -> None:
+    quotes = QuoteBuffer(stub.url, capacity=3, cache_path=str(tmp_path / "quotes.json"))
+    assert poll_until(quotes, lambda: len(quotes.buffer) == 3)
+
+    # サーバーが応答しない間もバッファから返せる
+    stub.gate.clear()
+    pressed = [quotes.next_quote() for _ in range(3)]
+    # ワーカーは 1 件ずつ順に取得する
+    assert pressed == ["Quote #1", "Quote #2", "Quote #3"]
+    # バッファが空ならディスクキャッシュ（取得済みの名言）から返す
+    assert quotes.next_quote() in pressed
+
+    stub.gate.set()
+    assert poll_until(quotes, lambda: len(quotes.buffer) == 3)
+    assert not set(quotes.buffer) & set(pressed)
+    quotes.close(timeout=1)
+
+
+def test_poll_runs_from_the_tk_after_loop(stub: StubServer, tmp_path) -> None:
+    scheduled: List[Tuple[int, Callable[[], None]]] = []
+    quotes = QuoteBuffer(
+        stub.url, capacity=2, cache_path=str(tmp_path / "quotes.json"),
+        after=lambda ms, callback: scheduled.append((ms, callback)) or "after#1",
+    )
+    assert scheduled and scheduled[0][0] == QuoteBuffer.POLL_MS
+
+    deadline = time.monotonic() + 5
+    while len(quotes.buffer) < 2 and time.monotonic() < deadline:
+        _, callback = scheduled.pop(0)
+        callback()  # 次のポーリングを予約し直す
+        time.sleep(0.005)
+    assert len(quotes.buffer) == 2 and len(scheduled) == 1
+    quotes.close(timeout=1)
+
+
+def test_offline_falls_back_to_the_disk_cache(stub: StubServer, tmp_path) -> None:
+    cache_path = str(tmp_path / "quotes.json")
+    quotes = QuoteBuffer(stub.url, capacity=4, cache_path=cache_path)
+    assert poll_until(quotes, lambda: len(quotes.buffer) == 4)
+    quotes.close(timeout=1)
+    with open(cache_path, encoding="utf-8") as cache_file:
+        saved = json.load(cache_file)
+    assert sorted(saved) == sorted(f"Quote #{i}" for i in range(1, 5))
+
+    stub.fail = True
+    offline = QuoteBuffer(stub.url, capacity=4, cache_path=cache_path, seed=0)
+    time.sleep(0.1)
+    offline.poll()
+    assert not offline.buffer
+    assert {offline.next_quote() for _ in range(20)} <= set(saved)
+    offline.close(timeout=1)
+
+
+def test_failures_back_off(stub: StubServer, tmp_path) -> None:
+    stub.fail = True
+    quotes = QuoteBuffer(stub.url, capacity=1, cache_path=str(tmp_path / "quotes.json"))
+    time.sleep(0.5)
+    quotes.poll()
+    # 失敗後は RETRY_DELAY（2 秒）待つので、連打しない
+    assert stub.requests == 1
+    quotes.close()
+
+
+def test_without_any_quote_shows_the_placeholder(stub: StubServer, tmp_path) -> None:
+    stub.gate.clear()
+    cache_path = tmp_path / "quotes.json"
+    cache_path.write_text("{not json", encoding="utf-8")
+    quotes = QuoteBuffer(stub.url, capacity=1, cache_path=str(cache_path))
+    assert quotes.cached == []
+    assert quotes.next_quote() == PLACEHOLDER
+    stub.gate.set()
+    quotes.close(timeout=1)
@@ -0,0 +1,136 @@
+# NOAA アルゴリズムによる日の出・日の入りのオフライン計算
+#
+# * **API 不要**: `api.sunrise-sunset.org` へのネットワーク往復をなくす
+# * **分単位の精度**: 時（hour）だけでなく秒まで含む時刻で昼夜を判定できる
+# * **ベクトル化**: 地点・日付の配列をまとめて NumPy で計算（1 件あたり数マイクロ秒）
+# * **検証**: `tests/test_solar_position.py` で PyEphem による参照値と比較
+#
+# 計算式は NOAA Solar Calculator（Jean Meeus "Astronomical Algorithms" ベース）に従い、
+# 日の出・日の入りは太陽の中心が地平線下 0.833 度（大気差 + 視半径）にある時刻とする。
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Tuple
+
+import numpy as np
+
+SolarTimes = Tuple[datetime, datetime]
+
+SUNRISE_ZENITH = 90.833
+
+UNIX_EPOCH_JD = 2440587.5
+J2000_JD = 2451545.0
+
+
+def _julian_century(jd: np.ndarray) -> np.ndarray:
+    return (jd - J2000_JD) / 36525.0
+
+
+def _sun_declination_and_eqtime(t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ユリウス世紀 t における太陽の赤緯（ラジアン）と均時差（分）"""
+    l0 = np.radians((280.46646 + t * (36000.76983 + t * 0.0003032)) % 360)
+    m = np.radians(357.52911 + t * (35999.05029 - 0.0001537 * t))
+    e = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+    center = (
+        np.sin(m) * (1.914602 - t * (0.004817 + 0.000014 * t))
+        + np.sin(2 * m) * (0.019993 - 0.000101 * t)
+        + np.sin(3 * m) * 0.000289
+    )
+    omega = np.radians(125.04 - 1934.136 * t)
+    apparent_long = np.radians(np.degrees(l0) + center - 0.00569 - 0.00478 * np.sin(omega))
+    mean_obliquity = 23 + (26 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60) / 60
+    obliquity = np.radians(mean_obliquity + 0.00256 * np.cos(omega))
+
+    declination = np.arcsin(np.sin(obliquity) * np.sin(apparent_long))
+    y = np.tan(obliquity / 2) ** 2
+    eq_time = 4 * np.degrees(
+        y * np.sin(2 * l0)
+        - 2 * e * np.sin(m)
+        + 4 * e * y * np.sin(m) * np.cos(2 * l0)
+        - 0.5 * y * y * np.sin(4 * l0)
+        - 1.25 * e * e * np.sin(2 * m)
+    )
+    return declination, eq_time
+
+
+def _event_minutes(day_jd: np.ndarray, lat: np.ndarray, lng: np.ndarray, sign: int) -> np.ndarray:
+    """日付 0 時 (UTC) からの日の出（sign=-1）または日の入り（sign=+1）までの分数
+
+    まず現地の南中時刻で太陽の位置を求め、その結果の時刻で 1 回再計算する。
+    白夜・極夜の地点は NaN を返す。
+    """
+    lat_rad = np.radians(lat)
+    minutes = 720 - 4 * lng  # 最初の近似: 平均南中時刻
+    for _ in range(2):
+        declination, eq_time = _sun_declination_and_eqtime(_julian_century(day_jd + minutes / 1440))
+        with np.errstate(invalid="ignore"):
+            cos_hour_angle = np.cos(np.radians(SUNRISE_ZENITH)) / (
+                np.cos(lat_rad) * np.cos(declination)
+            ) - np.tan(lat_rad) * np.tan(declination)
+            hour_angle = np.degrees(np.arccos(cos_hour_angle))
+        minutes = 720 - 4 * lng - eq_time + sign * 4 * hour_angle
+    return minutes
+
+
+def polar_state(days: np.ndarray, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """白夜なら +1、極夜なら -1、それ以外は 0"""
+    day_jd, lat, lng = _prepare(days, lats, lngs)
+    declination, _ = _sun_declination_and_eqtime(_julian_century(day_jd + (720 - 4 * lng) / 1440))
+    lat_rad = np.radians(lat)
+    cos_hour_angle = np.cos(np.radians(SUNRISE_ZENITH)) / (
+        np.cos(lat_rad) * np.cos(declination)
+    ) - np.tan(lat_rad) * np.tan(declination)
+    return np.where(cos_hour_angle < -1, 1, np.where(cos_hour_angle > 1, -1, 0))
+
+
+def _prepare(days: np.ndarray, lats: np.ndarray, lngs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    day_numbers = np.asarray(days, dtype="datetime64[D]").astype(np.int64)
+    day_jd, lat, lng = np.broadcast_arrays(
+        day_numbers + UNIX_EPOCH_JD, np.asarray(lats, dtype=float), np.asarray(lngs, dtype=float)
+    )
+    return day_jd, lat, lng
+
+
+def sunrise_sunset(days, lats, lngs) -> Tuple[np.ndarray, np.ndarray]:
+    """日付・緯度・経度の配列（ブロードキャスト可）から日の出・日の入り（UTC）を計算
+
+    days は datetime64[D] に変換できる値（"2024-06-15" や date の配列）で、
+    sunrise-sunset API の date パラメータと同じく現地の日付として扱う。
+    戻り値は datetime64[s] の配列で、白夜・極夜の地点は NaT になる。
+    """
+    day_jd, lat, lng = _prepare(days, lats, lngs)
+    base = (day_jd - UNIX_EPOCH_JD).astype("datetime64[D]").astype("datetime64[s]")
+
+    def to_datetime(minutes: np.ndarray) -> np.ndarray:
+        seconds = np.round(minutes * 60)
+        result = base + np.nan_to_num(seconds).astype("timedelta64[s]")
+        return np.where(np.isnan(seconds), np.datetime64("NaT", "s"), result)
+
+    return to_datetime(_event_minutes(day_jd, lat, lng, -1)), to_datetime(_event_minutes(day_jd, lat, lng, 1))
+
+
+def solar_times(day: date, lat: float, lng: float) -> SolarTimes:
+    """1 地点・1 日分の日の出・日の入り（timezone 付き datetime）
+
+    白夜は日付全体を昼、極夜は昼なし（日の出 = 日の入り）として返す。
+    """
+    sunrise, sunset = sunrise_sunset(np.array([day], dtype="datetime64[D]"), lat, lng)
+    if np.isnat(sunrise[0]) or np.isnat(sunset[0]):
+        start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc) - timedelta(hours=lng / 15)
+        if polar_state(np.array([day], dtype="datetime64[D]"), lat, lng)[0] > 0:
+            return start, start + timedelta(days=1)
+        return start, start
+    return (
+        sunrise[0].astype(datetime).replace(tzinfo=timezone.utc),
+        sunset[0].astype(datetime).replace(tzinfo=timezone.utc),
+    )
+
+
+def is_night(now: datetime, lat: float, lng: float) -> bool:
+    """now（timezone 付き）が夜かどうかをオフラインで判定"""
+    today = now.date()
+    neighbour = today + timedelta(days=1 if lng >= 0 else -1)
+    for day in (today, neighbour):
+        sunrise, sunset = solar_times(day, lat, lng)
+        if sunrise <= now < sunset:
+            return False
+    return True
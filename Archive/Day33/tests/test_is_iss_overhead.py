@@ -0,0 +1,66 @@
+import functools
+import json
+from typing import List
+
+import pytest
+import requests
+
+import is_iss_overhead
+import iss_pass_schedule
+from is_iss_overhead import CHECK_INTERVAL, ISS_API_URL, TOKYO_LAT, TOKYO_LNG
+
+
+class FakeResponse:
+    def __init__(self, body: object, status: int = 200) -> None:
+        self.body = body
+        self.status = status
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise requests.HTTPError(f"{self.status}")
+
+    def json(self) -> object:
+        return json.loads(json.dumps(self.body))
+
+
+@pytest.fixture
+def offline(monkeypatch, tmp_path) -> List[str]:
+    """TLE は取得できずキャッシュもない。iss-now.json だけが東京の真上を返す"""
+    calls: List[str] = []
+
+    def get(url: str, timeout: float, **kwargs: object) -> FakeResponse:
+        calls.append(url)
+        if url != ISS_API_URL:
+            raise requests.ConnectionError("offline")
+        return FakeResponse({"iss_position": {"latitude": str(TOKYO_LAT + 1), "longitude": str(TOKYO_LNG - 2)}})
+
+    monkeypatch.setattr(requests, "get", get)
+    monkeypatch.setattr(
+        iss_pass_schedule, "load_tle",
+        functools.partial(iss_pass_schedule.load_tle, cache_file=str(tmp_path / "iss.tle")),
+    )
+    return calls
+
+
+def test_main_falls_back_to_polling_without_a_tle(monkeypatch, offline: List[str]) -> None:
+    sent: List[str] = []
+    sleeps: List[float] = []
+    monkeypatch.setattr(is_iss_overhead, "is_night", lambda lat, lng: True)
+    monkeypatch.setattr(is_iss_overhead, "send_email", lambda subject, body, to_addr: sent.append(subject))
+
+    is_iss_overhead.main(sleep=sleeps.append, cycles=3)
+
+    assert offline == [iss_pass_schedule.TLE_URL] + [ISS_API_URL] * 3
+    assert sleeps == [CHECK_INTERVAL] * 3
+    assert sent == ["Look Up👆"] * 3
+
+
+def test_iss_now_check_wraps_around_the_date_line(monkeypatch) -> None:
+    monkeypatch.setattr(
+        requests, "get",
+        lambda url, timeout: FakeResponse({"iss_position": {"latitude": "-16.0", "longitude": "-178.0"}}),
+    )
+    assert is_iss_overhead.is_iss_overhead_now(-17.7, 178.0)
+    assert not is_iss_overhead.is_iss_overhead_now(-17.7, 170.0)
+    monkeypatch.setattr(requests, "get", lambda url, timeout: FakeResponse({}, status=503))
+    assert not is_iss_overhead.is_iss_overhead_now(-17.7, 178.0)
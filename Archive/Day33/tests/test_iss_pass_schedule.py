@@ -0,0 +1,173 @@
+import os
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+import requests
+
+import iss_pass_schedule
+from iss_pass_schedule import (
+    SAMPLE_TLE,
+    Pass,
+    Site,
+    TLEError,
+    TwoLineElement,
+    compute_schedules,
+    load_tle,
+    parse_tle_text,
+    propagate,
+    run_tracker,
+    subpoint,
+)
+
+TOKYO = Site("Tokyo", 35.6895, 139.6917)
+SAMPLE = TwoLineElement.parse(*SAMPLE_TLE)
+# エポックだけを 1 日進めた TLE
+OTHER_TLE = (
+    "1 25544U 98067A   08265.50000000 -.00002182  00000-0 -11606-4 0  2925",
+    SAMPLE_TLE[1],
+)
+
+
+class FakeResponse:
+    def __init__(self, text: str, status: int = 200) -> None:
+        self.text = text
+        self.status = status
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise requests.HTTPError(f"{self.status}")
+
+
+@pytest.fixture
+def cache_file(tmp_path) -> str:
+    return str(tmp_path / "iss.tle")
+
+
+def serve(monkeypatch, response) -> List[str]:
+    calls: List[str] = []
+
+    def get(url: str, timeout: float) -> FakeResponse:
+        calls.append(url)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(iss_pass_schedule.requests, "get", get)
+    return calls
+
+
+def write_stale_cache(cache_file: str, lines: Tuple[str, str] = SAMPLE_TLE) -> None:
+    with open(cache_file, "w", encoding="utf-8") as tle_file:
+        tle_file.write("ISS (ZARYA)\n" + "\n".join(lines) + "\n")
+    old = datetime.now().timestamp() - 2 * 86400
+    os.utime(cache_file, (old, old))
+
+
+def test_parse_tle_text() -> None:
+    assert parse_tle_text("ISS (ZARYA)\n" + "\n".join(SAMPLE_TLE)) == SAMPLE_TLE
+    assert parse_tle_text("No GP data found") is None
+    broken = SAMPLE_TLE[1][:68] + "0"  # チェックサム不一致
+    assert parse_tle_text(SAMPLE_TLE[0] + "\n" + broken) is None
+
+
+def test_fetches_and_caches(monkeypatch, cache_file: str) -> None:
+    calls = serve(monkeypatch, FakeResponse("ISS (ZARYA)\r\n" + "\r\n".join(SAMPLE_TLE) + "\r\n"))
+    assert load_tle(cache_file).line1 == SAMPLE_TLE[0]
+    assert load_tle(cache_file).line1 == SAMPLE_TLE[0]  # 1 日以内はキャッシュ
+    assert len(calls) == 1
+
+
+def test_invalid_body_keeps_the_old_cache(monkeypatch, cache_file: str) -> None:
+    write_stale_cache(cache_file)
+    serve(monkeypatch, FakeResponse("No GP data found"))
+    assert load_tle(cache_file).line1 == SAMPLE_TLE[0]
+    with open(cache_file, encoding="utf-8") as tle_file:
+        assert SAMPLE_TLE[1] in tle_file.read()
+
+
+def test_valid_body_replaces_a_stale_cache(monkeypatch, cache_file: str) -> None:
+    write_stale_cache(cache_file)
+    serve(monkeypatch, FakeResponse("\n".join(OTHER_TLE)))
+    assert load_tle(cache_file).line1 == OTHER_TLE[0]
+    with open(cache_file, encoding="utf-8") as tle_file:
+        assert parse_tle_text(tle_file.read()) == OTHER_TLE
+
+
+def test_invalid_body_without_cache_raises(monkeypatch, cache_file: str) -> None:
+    serve(monkeypatch, FakeResponse("No GP data found"))
+    with pytest.raises(TLEError):
+        load_tle(cache_file)
+    assert not os.path.exists(cache_file)
+
+
+def test_network_errors(monkeypatch, cache_file: str) -> None:
+    serve(monkeypatch, requests.ConnectionError("offline"))
+    with pytest.raises(requests.ConnectionError):
+        load_tle(cache_file)
+    write_stale_cache(cache_file)
+    assert load_tle(cache_file).line1 == SAMPLE_TLE[0]
+
+
+def test_corrupt_cache_raises_tle_error(monkeypatch, cache_file: str) -> None:
+    with open(cache_file, "w", encoding="utf-8") as tle_file:
+        tle_file.write("No GP data found\n")
+    with pytest.raises(TLEError):
+        load_tle(cache_file)
+
+
+def test_j2_model_stays_close_to_sgp4() -> None:
+    if iss_pass_schedule.Satrec is None:
+        pytest.skip("sgp4 is not installed")
+    unix_seconds = np.arange(0, 24 * 3600, 60) + SAMPLE.epoch.timestamp()
+    lat_a, lng_a = subpoint(propagate(SAMPLE, unix_seconds, use_sgp4=True), unix_seconds)
+    lat_b, lng_b = subpoint(propagate(SAMPLE, unix_seconds, use_sgp4=False), unix_seconds)
+    lng_error = np.abs((lng_a - lng_b + 180) % 360 - 180)
+    error = np.hypot(lat_a - lat_b, lng_error * np.cos(np.radians(lat_a)))
+    assert error.max() < 1.0
+
+
+def test_schedule_matches_the_ground_track() -> None:
+    schedule = compute_schedules(SAMPLE, [TOKYO], SAMPLE.epoch)[TOKYO]
+    assert schedule.passes
+    assert schedule.valid_until == SAMPLE.epoch + iss_pass_schedule.HORIZON
+
+    for item in schedule.passes:
+        middle = item.start + (item.end - item.start) / 2
+        assert schedule.pass_at(middle) == item
+        seconds = np.array([middle.timestamp()])
+        lat, lng = subpoint(propagate(SAMPLE, seconds), seconds)
+        assert abs(lat[0] - TOKYO.lat) <= 5.5 and abs(lng[0] - TOKYO.lng) <= 5.5
+        assert not schedule.is_overhead(item.end + timedelta(seconds=1))
+
+
+def test_many_sites_share_one_propagation() -> None:
+    sites = [Site(f"site{i}", -50 + i % 100, -180 + (i * 37) % 360) for i in range(100)]
+    schedules = compute_schedules(SAMPLE, sites, SAMPLE.epoch)
+    assert set(schedules) == set(sites)
+    assert sum(len(schedule.passes) for schedule in schedules.values()) > 100
+
+
+def test_tracker_sleeps_until_each_night_pass() -> None:
+    schedule = compute_schedules(SAMPLE, [TOKYO], SAMPLE.epoch)[TOKYO]
+    night_passes = [item for item in schedule.passes if item.night]
+    assert night_passes
+
+    now = [SAMPLE.epoch]
+    sleeps: List[float] = []
+    notified: List[Pass] = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += timedelta(seconds=seconds)
+
+    count = run_tracker(
+        [TOKYO], notify=lambda site, item: notified.append(item),
+        tle_loader=lambda: SAMPLE, clock=lambda: now[0], sleep=sleep,
+        refresh=timedelta(hours=48), max_passes=3,
+    )
+    assert count == 3
+    assert [item.start for item in notified] == [item.start for item in night_passes[:3]]
+    # ポーリングせず、通過の開始まで 1 回ずつ眠る
+    assert len(sleeps) == 3
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import math
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import numpy as np
+import pytest
+
+from is_iss_overhead import CHECK_INTERVAL
+from iss_pass_schedule import SAMPLE_TLE, Site, TLEError, TwoLineElement, compute_schedules, propagate, subpoint
+from iss_tracker_async import PASS_MARGIN, IssWatcher, LocalSolarTimes, Observer, SolarTimesCache, is_near
+from solar_position import SolarTimes
+
+START = datetime(2024, 6, 15, tzinfo=timezone.utc)
+
+
+class FakeClock:
+    """sleep で進む UTC 時計"""
+
+    def __init__(self, start: datetime = START) -> None:
+        self.now = start
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.now += timedelta(seconds=seconds)
+
+
+def stub_solar_times(day: date, lng: float) -> SolarTimes:
+    """現地 6 時〜18 時を昼とする簡易モデル（UTC）"""
+    noon = datetime(day.year, day.month, day.day, 12, tzinfo=timezone.utc) - timedelta(hours=lng / 15)
+    return noon - timedelta(hours=6), noon + timedelta(hours=6)
+
+
+def orbit_position(now: datetime) -> Tuple[float, float]:
+    """約 92 分で 1 周する ISS を模した位置"""
+    minutes = now.timestamp() / 60
+    return 51.6 * math.sin(2 * math.pi * minutes / 92.7), (minutes * 360 / 92.7 - minutes * 0.25) % 360 - 180
+
+
+class StubServer:
+    """ISS と sunrise-sunset を模したローカルサーバー（パスごとのリクエスト数を数える）"""
+
+    def __init__(self, clock: FakeClock, position: Callable[[datetime], Tuple[float, float]] = orbit_position) -> None:
+        self.counts: Counter = Counter()
+        self.fail_sun = False
+        # ISS API が呼ばれた（模擬）時刻
+        self.iss_times: List[datetime] = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                url = urlparse(self.path)
+                stub.counts[url.path] += 1
+                if url.path == "/iss-now.json":
+                    stub.iss_times.append(clock())
+                    lat, lng = position(clock())
+                    body = {"iss_position": {"latitude": str(lat), "longitude": str(lng)}}
+                elif stub.fail_sun:
+                    self.send_error(503)
+                    return
+                else:
+                    query = parse_qs(url.query)
+                    sunrise, sunset = stub_solar_times(date.fromisoformat(query["date"][0]), float(query["lng"][0]))
+                    body = {"results": {"sunrise": sunrise.isoformat(), "sunset": sunset.isoformat()}}
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def stub(clock: FakeClock) -> Iterator[StubServer]:
+    server = StubServer(clock)
+    yield server
+    server.server.shutdown()
+
+
+def test_is_near_wraps_around_the_date_line() -> None:
+    observer = Observer("Fiji", -17.7, 178.0)
+    assert is_near(observer, -16.0, -178.0)
+    assert not is_near(observer, -16.0, 170.0)
+    assert not is_near(observer, -25.0, 178.0)
+
+
+def test_one_day_with_many_observers(clock: FakeClock, stub: StubServer) -> None:
+    observer_count = 50
+    observers = [
+        Observer(f"obs{i}", lat=-60 + (i * 37) % 120, lng=-180 + (i * 53) % 360)
+        for i in range(observer_count)
+    ]
+    notified: List[str] = []
+
+    async def notify(observer: Observer) -> None:
+        notified.append(observer.name)
+
+    async def run() -> None:
+        async with httpx.AsyncClient() as client:
+            watcher = IssWatcher(
+                observers, client,
+                solar=SolarTimesCache(client, url=f"{stub.base}/json"),
+                notify=notify, iss_url=f"{stub.base}/iss-now.json",
+                clock=clock, sleep=clock.sleep,
+            )
+            await watcher.run(cycles)
+
+    cycles = 86400 // CHECK_INTERVAL
+    asyncio.run(run())
+
+    # The old loop made two requests per observer and cycle
+    legacy_requests = 2 * observer_count * cycles
+    # ISS position: one request per cycle at most, shared by every observer
+    assert 0 < stub.counts["/iss-now.json"] <= cycles
+    # Solar times: a few days per observer, not one request per cycle
+    assert stub.counts["/json"] <= 3 * observer_count
+    assert stub.counts["/iss-now.json"] + stub.counts["/json"] < legacy_requests / 20
+    assert notified
+
+
+def test_concurrent_lookups_share_one_request(stub: StubServer) -> None:
+    async def run() -> List[SolarTimes]:
+        async with httpx.AsyncClient() as client:
+            cache = SolarTimesCache(client, url=f"{stub.base}/json")
+            return await asyncio.gather(*(cache.get(date(2024, 6, 15), 35.6895, 139.6917) for _ in range(20)))
+
+    results = asyncio.run(run())
+    assert len(set(results)) == 1
+    assert stub.counts["/json"] == 1
+
+
+def test_failed_lookups_are_not_cached(stub: StubServer) -> None:
+    async def run() -> Tuple[bool, SolarTimes]:
+        async with httpx.AsyncClient() as client:
+            cache = SolarTimesCache(client, url=f"{stub.base}/json")
+            stub.fail_sun = True
+            with pytest.raises(httpx.HTTPStatusError):
+                await cache.get(date(2024, 6, 15), 0.0, 0.0)
+            stub.fail_sun = False
+            return await cache.get(date(2024, 6, 15), 0.0, 0.0)
+
+    assert asyncio.run(run()) == stub_solar_times(date(2024, 6, 15), 0.0)
+    assert stub.counts["/json"] == 2
+
+
+def test_daytime_skips_the_iss_request(stub: StubServer) -> None:
+    noon_in_tokyo = FakeClock(datetime(2024, 6, 15, 3, tzinfo=timezone.utc))
+
+    async def run() -> List[Observer]:
+        async with httpx.AsyncClient() as client:
+            watcher = IssWatcher(
+                [Observer("Tokyo", 35.6895, 139.6917)], client,
+                solar=LocalSolarTimes(), iss_url=f"{stub.base}/iss-now.json", clock=noon_in_tokyo,
+            )
+            return await watcher.check_once()
+
+    assert asyncio.run(run()) == []
+    assert stub.counts["/iss-now.json"] == 0
+
+
+def test_night_uses_the_neighbouring_local_day() -> None:
+    # UTC 22 時は東京の翌朝 7 時: 翌日（現地）の昼間なので夜ではない
+    async def run(now: datetime) -> bool:
+        return await LocalSolarTimes().is_night(now, 35.6895, 139.6917)
+
+    assert not asyncio.run(run(datetime(2024, 6, 15, 22, tzinfo=timezone.utc)))
+    assert asyncio.run(run(datetime(2024, 6, 15, 14, tzinfo=timezone.utc)))
+
+
+SAMPLE = TwoLineElement.parse(*SAMPLE_TLE)
+# サンプル TLE のエポック付近（予測と ISS API の位置を同じ軌道から作る）
+TLE_START = datetime(2008, 9, 21, 12, tzinfo=timezone.utc)
+
+
+def tle_position(now: datetime) -> Tuple[float, float]:
+    seconds = np.array([now.timestamp()])
+    lat, lng = subpoint(propagate(SAMPLE, seconds), seconds)
+    return float(lat[0]), float(lng[0])
+
+
+def watch_one_day(
+    stub: StubServer, clock: FakeClock, observers: List[Observer], tle_loader: Callable[[], TwoLineElement]
+) -> Tuple[IssWatcher, List[str]]:
+    notified: List[str] = []
+
+    async def notify(observer: Observer) -> None:
+        notified.append(observer.name)
+
+    async def run() -> IssWatcher:
+        async with httpx.AsyncClient() as client:
+            watcher = IssWatcher(
+                observers, client, notify=notify, iss_url=f"{stub.base}/iss-now.json",
+                clock=clock, sleep=clock.sleep, tle_loader=tle_loader,
+            )
+            await watcher.run(until=clock() + timedelta(days=1))
+            return watcher
+
+    return asyncio.run(run()), notified
+
+
+def test_polls_only_inside_predicted_passes() -> None:
+    clock = FakeClock(TLE_START)
+    stub = StubServer(clock, position=tle_position)
+    observers = [Observer(f"obs{i}", lat=-50 + i * 10, lng=-170 + i * 35) for i in range(10)]
+    try:
+        watcher, notified = watch_one_day(stub, clock, observers, lambda: SAMPLE)
+    finally:
+        stub.server.shutdown()
+
+    sites = [Site(observer.name, observer.lat, observer.lng) for observer in observers]
+    night_passes = [
+        (site.name, p)
+        for site, schedule in compute_schedules(SAMPLE, sites, TLE_START, horizon=timedelta(days=1)).items()
+        for p in schedule.passes
+        if p.night
+    ]
+    assert night_passes
+    # ISS API は予測した通過の前後でだけ呼ばれる
+    for when in stub.iss_times:
+        assert any(p.start - PASS_MARGIN <= when < p.end + PASS_MARGIN for _, p in night_passes)
+    # CHECK_INTERVAL ごとのポーリング（1 日 240 回）の半分にも満たない
+    assert stub.counts["/iss-now.json"] < 86400 // CHECK_INTERVAL // 2
+    # 予測した夜の通過はどれも通知される
+    assert set(notified) == {name for name, _ in night_passes}
+    assert watcher.windows is not None
+
+
+def test_polls_every_check_interval_without_a_tle(clock: FakeClock, stub: StubServer) -> None:
+    def no_tle() -> TwoLineElement:
+        raise TLEError("offline")
+
+    watcher, _ = watch_one_day(stub, clock, [Observer("Tokyo", 35.6895, 139.6917)], no_tle)
+    assert watcher.windows is None
+    # 夜の間だけ check_interval ごとに確認
+    assert 0 < stub.counts["/iss-now.json"] <= 86400 // CHECK_INTERVAL
+    assert all((b - a).total_seconds() >= CHECK_INTERVAL for a, b in zip(stub.iss_times, stub.iss_times[1:]))
@@ -0,0 +1,60 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from solar_position import is_night, polar_state, solar_times, sunrise_sunset
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pyephem_sun_times.json")
+# 許容誤差（秒）: 参照値との差は最大で約 5 秒
+TOLERANCE_SEC = 10
+
+with open(FIXTURE_PATH, encoding="utf-8") as fixture_file:
+    CASES = json.load(fixture_file)["cases"]
+
+
+def as_datetime64(value: str) -> np.datetime64:
+    return np.datetime64(datetime.fromisoformat(value).replace(tzinfo=None), "s")
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: f"{case['location']}-{case['date']}")
+def test_matches_reference_times(case: dict) -> None:
+    sunrise, sunset = sunrise_sunset(np.array([case["date"]], dtype="datetime64[D]"), case["lat"], case["lng"])
+    for computed, key in ((sunrise[0], "sunrise"), (sunset[0], "sunset")):
+        if case[key] is None:
+            assert np.isnat(computed)
+        else:
+            assert abs(int((computed - as_datetime64(case[key])).astype(np.int64))) <= TOLERANCE_SEC
+
+
+def test_vectorized_matches_single_calls() -> None:
+    days = np.array([case["date"] for case in CASES], dtype="datetime64[D]")
+    lats = np.array([case["lat"] for case in CASES])
+    lngs = np.array([case["lng"] for case in CASES])
+    sunrise, _ = sunrise_sunset(days, lats, lngs)
+    for i in (0, len(CASES) // 2, len(CASES) - 1):
+        single, _ = sunrise_sunset(days[i : i + 1], lats[i], lngs[i])
+        assert single[0] == sunrise[i] or (np.isnat(single[0]) and np.isnat(sunrise[i]))
+
+
+def test_polar_day_and_night() -> None:
+    tromso = (69.6492, 18.9553)
+    summer, winter = date(2024, 6, 21), date(2024, 12, 21)
+    assert polar_state(np.array([summer, winter], dtype="datetime64[D]"), *tromso).tolist() == [1, -1]
+
+    sunrise, sunset = solar_times(summer, *tromso)
+    assert (sunset - sunrise).total_seconds() == 86400
+    sunrise, sunset = solar_times(winter, *tromso)
+    assert sunrise == sunset
+
+
+def test_is_night_compares_minutes() -> None:
+    lat, lng = 35.6895, 139.6917
+    sunrise, sunset = solar_times(date(2024, 6, 21), lat, lng)
+    minute = timedelta(minutes=1)
+    assert is_night(sunrise - minute, lat, lng)
+    assert not is_night(sunrise + minute, lat, lng)
+    assert not is_night(sunset - minute, lat, lng)
+    assert is_night(sunset + minute, lat, lng)
@@ -1,7 +1,16 @@
+import csv
+import json
 import os
-from typing import Optional, Any, Final
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Final, Iterable, Optional
+
+import numpy as np
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
 from twilio.rest import Client
 
 load_dotenv()
@@ -14,6 +23,16 @@ to_twilio: Optional[str] = os.getenv("TO_TWILIO")
 api_key: Optional[str] = os.getenv("API_KEY")
 
 OWN_ENDPOINT: Final[str] = "https://api.openweathermap.org/data/2.5/forecast"
+RAIN_MESSAGE: Final[str] = "It's going to rain today. Remember to bring an ☔️"
+WATCHLIST_FILE: Final[str] = "watchlist.csv"
+FORECAST_CACHE_FILE: Final[str] = "forecast_cache.json"
+
+FORECAST_COUNT: Final[int] = 4  # 3 時間ごとの予報を 4 件（12 時間分）
+RAIN_CODE_LIMIT: Final[int] = 700  # 700 未満は雨・雪・雷雨など
+NO_RAIN_CODE: Final[int] = 800  # 予報が足りない分を埋める「晴れ」のコード
+GRID_DEGREES: Final[float] = 0.1  # 約 11 km 四方の格子にまとめる
+FORECAST_TTL: Final[float] = 30 * 60  # 秒
+MAX_WORKERS: Final[int] = 16
 
 
 def get_weather_data() -> Optional[dict[str, Any]]:
@@ -25,7 +44,7 @@ def get_weather_data() -> Optional[dict[str, Any]]:
         "lat": 35.689487,
         "lon": 139.691711,
         "appid": api_key,
-        "cnt": 4,
+        "cnt": FORECAST_COUNT,
     }
 
     response = requests.get(OWN_ENDPOINT, params=weather_params, timeout=10)
@@ -34,33 +53,247 @@ def get_weather_data() -> Optional[dict[str, Any]]:
     return None
 
 
+def condition_codes(weather_data: dict[str, Any]) -> np.ndarray:
+    """天気データから予報ごとの天気コードを取り出す"""
+    return np.array(
+        [int(hourly_data["weather"][0]["id"]) for hourly_data in weather_data.get("list", [])],
+        dtype=np.int32,
+    )
+
+
 def will_it_rain(weather_data: dict[str, Any]) -> bool:
     """天気データから雨が降るかどうかを判定"""
-    for hourly_data in weather_data.get("list", []):
-        condition_code: int = int(hourly_data["weather"][0]["id"])
-        print(condition_code)  # デバッグ用
-        if condition_code < 700:
-            return True
-    return False
+    return bool((condition_codes(weather_data) < RAIN_CODE_LIMIT).any())
 
 
-def send_sms(body: str) -> None:
-    """TwilioでSMSを送信"""
-    if not account_sid or not auth_token or not from_twilio or not to_twilio:
+def create_client() -> Client:
+    """Twilio クライアントを作成（1 回だけ作って使い回す）"""
+    if not account_sid or not auth_token:
         raise ValueError("Twilio environment variables are not set")
+    return Client(account_sid, auth_token)
+
 
-    client = Client(account_sid, auth_token)
+def send_sms(
+    body: str,
+    client: Optional[Client] = None,
+    to: Optional[str] = None,
+    sender: Optional[str] = None,
+) -> None:
+    """TwilioでSMSを送信（sender を省略すると FROM_TWILIO から送る）"""
+    sender = sender or from_twilio
+    if not sender or not (to or to_twilio):
+        raise ValueError("Twilio environment variables are not set")
+
+    client = client or create_client()
     client.messages.create(
-        from_=from_twilio,
-        to=to_twilio,
+        from_=sender,
+        to=to or to_twilio,
         body=body,
     )
 
 
+# -----------------------------
+# 複数地点の監視
+# -----------------------------
+@dataclass(frozen=True)
+class Subscriber:
+    phone: str
+    lat: float
+    lon: float
+
+
+def load_watchlist(path: str = WATCHLIST_FILE) -> list[Subscriber]:
+    """phone,lat,lon の CSV から購読者を読み込む"""
+    with open(path, newline="", encoding="utf-8") as watchlist_file:
+        return [
+            Subscriber(row["phone"], float(row["lat"]), float(row["lon"]))
+            for row in csv.DictReader(watchlist_file)
+        ]
+
+
+def group_by_cell(
+    subscribers: list[Subscriber], grid: float = GRID_DEGREES
+) -> tuple[np.ndarray, np.ndarray]:
+    """購読者を格子セルにまとめる
+
+    Returns:
+        (セルの中心座標 [n_cells, 2], 購読者ごとのセル番号)
+    """
+    coords = np.array([(s.lat, s.lon) for s in subscribers], dtype=float).reshape(-1, 2)
+    cells, inverse = np.unique(np.floor(coords / grid).astype(np.int64), axis=0, return_inverse=True)
+    return (cells + 0.5) * grid, inverse.reshape(-1)
+
+
+class ForecastCache:
+    """セル中心座標ごとの天気コードを TTL 付きでキャッシュ
+
+    path を指定すると JSON ファイルに保存し、次回の実行でも期限内の予報を使う。
+    期限はファイルに残すので、clock には壁時計（time.time）を使う。
+    """
+
+    def __init__(
+        self,
+        ttl: float = FORECAST_TTL,
+        clock: Callable[[], float] = time.time,
+        path: Optional[str] = None,
+    ) -> None:
+        self.ttl = ttl
+        self.clock = clock
+        self.path = path
+        self._items: dict[tuple[float, float], tuple[float, np.ndarray]] = self._load()
+
+    def _load(self) -> dict[tuple[float, float], tuple[float, np.ndarray]]:
+        """ファイルから期限内のエントリだけを読み込む"""
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as cache_file:
+                rows = json.load(cache_file)
+            now = self.clock()
+            return {
+                (float(lat), float(lon)): (float(expires), np.array(codes, dtype=np.int32))
+                for lat, lon, expires, codes in rows
+                if float(expires) > now
+            }
+        except (OSError, ValueError, TypeError) as e:
+            print(f"[WARN] Ignoring forecast cache {self.path}: {e}")
+            return {}
+
+    def save(self) -> None:
+        """期限内のエントリを一時ファイル経由で書き出す"""
+        if not self.path:
+            return
+        now = self.clock()
+        rows = [
+            [lat, lon, expires, codes.tolist()]
+            for (lat, lon), (expires, codes) in self._items.items()
+            if expires > now
+        ]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            json.dump(rows, out)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: tuple[float, float]) -> Optional[np.ndarray]:
+        item = self._items.get(key)
+        if item is None or item[0] <= self.clock():
+            return None
+        return item[1]
+
+    def put(self, key: tuple[float, float], codes: np.ndarray) -> None:
+        self._items[key] = (self.clock() + self.ttl, codes)
+
+
+def create_session(max_workers: int = MAX_WORKERS) -> requests.Session:
+    """同時リクエスト数ぶんの接続をプールするセッション"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_codes(
+    session: requests.Session, lat: float, lon: float, endpoint: str = OWN_ENDPOINT
+) -> Optional[np.ndarray]:
+    """1 セル分の予報を取得して天気コードを返す（失敗時は None）"""
+    params: dict[str, Any] = {"lat": lat, "lon": lon, "appid": api_key, "cnt": FORECAST_COUNT}
+    try:
+        response = session.get(endpoint, params=params, timeout=10)
+        response.raise_for_status()
+        return condition_codes(response.json())
+    except (requests.RequestException, KeyError, ValueError) as e:
+        print(f"[ERROR] Forecast request failed ({lat:.2f}, {lon:.2f}): {e}")
+        return None
+
+
+def fetch_forecasts(
+    centers: np.ndarray,
+    session: requests.Session,
+    cache: ForecastCache,
+    endpoint: str = OWN_ENDPOINT,
+    max_workers: int = MAX_WORKERS,
+) -> np.ndarray:
+    """全セルの天気コードを [n_cells, FORECAST_COUNT] の配列で返す
+
+    キャッシュにないセルだけを並行して取得し、取得できなかったセルは
+    NO_RAIN_CODE で埋める（誤って通知しない）。
+    """
+    codes = np.full((len(centers), FORECAST_COUNT), NO_RAIN_CODE, dtype=np.int32)
+    keys = [(round(float(lat), 4), round(float(lon), 4)) for lat, lon in centers]
+    missing = []
+    for index, key in enumerate(keys):
+        cached = cache.get(key)
+        if cached is None:
+            missing.append(index)
+        else:
+            codes[index, : len(cached)] = cached[:FORECAST_COUNT]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda index: fetch_codes(session, *keys[index], endpoint), missing)
+        for index, fetched in zip(missing, results):
+            if fetched is None:
+                continue
+            cache.put(keys[index], fetched)
+            codes[index, : len(fetched)] = fetched[:FORECAST_COUNT]
+    return codes
+
+
+def rainy_cells(codes: np.ndarray) -> np.ndarray:
+    """セルごとに雨が降るかどうか（ベクトル化）"""
+    return (codes < RAIN_CODE_LIMIT).any(axis=1)
+
+
+def send_alerts(
+    client: Client, phones: Iterable[str], body: str = RAIN_MESSAGE, sender: Optional[str] = None
+) -> int:
+    """1 つの Twilio クライアントで全員に送信し、成功件数を返す"""
+    sent = 0
+    for phone in phones:
+        try:
+            send_sms(body, client=client, to=phone, sender=sender)
+            sent += 1
+        except Exception as e:
+            print(f"[ERROR] Failed to send SMS to {phone}: {e}")
+    return sent
+
+
+def run_watchlist(
+    subscribers: list[Subscriber],
+    session: requests.Session,
+    client: Client,
+    cache: ForecastCache,
+    endpoint: str = OWN_ENDPOINT,
+    sender: Optional[str] = None,
+) -> dict[str, int]:
+    """全購読者の地点の予報を調べ、雨が降る地点の購読者に通知する"""
+    centers, cell_of = group_by_cell(subscribers)
+    rain = rainy_cells(fetch_forecasts(centers, session, cache, endpoint))
+    phones = [subscriber.phone for subscriber, alert in zip(subscribers, rain[cell_of]) if alert]
+    return {
+        "subscribers": len(subscribers),
+        "cells": len(centers),
+        "rainy_cells": int(rain.sum()),
+        "sent": send_alerts(client, phones, sender=sender),
+    }
+
+
 def main() -> None:
-    weather_data = get_weather_data()
-    if weather_data and will_it_rain(weather_data):
-        send_sms("It's going to rain today. Remember to bring an ☔️")
+    if not os.path.exists(WATCHLIST_FILE):
+        weather_data = get_weather_data()
+        if weather_data and will_it_rain(weather_data):
+            send_sms(RAIN_MESSAGE)
+        return
+
+    if not api_key:
+        raise ValueError("API_KEY is not set in environment variables")
+    # 予報のキャッシュは次回の実行（FORECAST_TTL 以内）でも使う
+    cache = ForecastCache(path=FORECAST_CACHE_FILE)
+    with create_session() as session:
+        summary = run_watchlist(load_watchlist(), session, create_client(), cache)
+    cache.save()
+    print(summary)
 
 
 if __name__ == "__main__":
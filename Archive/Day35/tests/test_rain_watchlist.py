@@ -0,0 +1,183 @@
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, List
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pytest
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+import main_refactored
+from main_refactored import (
+    NO_RAIN_CODE,
+    ForecastCache,
+    Subscriber,
+    create_session,
+    group_by_cell,
+    run_watchlist,
+)
+
+SENDER = "+15005550006"
+
+
+def is_rainy(lat: float, lon: float) -> bool:
+    """緯度・経度から決まる擬似的な天気（約 3 割のセルで雨）"""
+    return math.sin(lat * 12.9898 + lon * 78.233) * 43758.5453 % 1 < 0.3
+
+
+class StubServers:
+    """OpenWeather と Twilio のスタブ。受けたリクエストを記録する"""
+
+    def __init__(self) -> None:
+        self.forecasts: List[tuple] = []
+        self.sms: List[dict] = []
+        self.failing: set = set()
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                query = parse_qs(urlparse(self.path).query)
+                lat, lon = float(query["lat"][0]), float(query["lon"][0])
+                with lock:
+                    stub.forecasts.append((lat, lon))
+                if (lat, lon) in stub.failing:
+                    self._reply(500, {"message": "error"})
+                    return
+                code = 500 if is_rainy(lat, lon) else NO_RAIN_CODE
+                self._reply(200, {"list": [{"weather": [{"id": code}]} for _ in range(int(query["cnt"][0]))]})
+
+            def do_POST(self) -> None:  # noqa: N802
+                form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+                with lock:
+                    stub.sms.append({key: values[0] for key, values in form.items()})
+                    sid = f"SM{len(stub.sms):032d}"
+                self._reply(201, {"sid": sid, "status": "queued"})
+
+            def _reply(self, status: int, body: dict) -> None:
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.endpoint = f"{self.base}/forecast"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def twilio_client(self) -> Client:
+        base = self.base
+
+        class StubTwilioHttpClient(TwilioHttpClient):
+            def request(self, method: str, url: str, *args: Any, **kwargs: Any) -> Any:
+                return super().request(method, url.replace("https://api.twilio.com", base), *args, **kwargs)
+
+        return Client("AC" + "0" * 32, "token", http_client=StubTwilioHttpClient())
+
+
+@pytest.fixture
+def stub() -> Iterator[StubServers]:
+    servers = StubServers()
+    yield servers
+    servers.server.shutdown()
+
+
+def clustered_subscribers(count: int, seed: int = 0) -> List[Subscriber]:
+    """大都市の周辺に集中する購読者"""
+    rng = np.random.default_rng(seed)
+    cities = rng.uniform([-40, -120], [60, 150], size=(20, 2))
+    coords = cities[rng.integers(0, len(cities), count)] + rng.normal(scale=0.15, size=(count, 2))
+    return [Subscriber(f"+1555{i:07d}", lat, lon) for i, (lat, lon) in enumerate(coords)]
+
+
+def expected_phones(subscribers: List[Subscriber]) -> List[str]:
+    centers, cell_of = group_by_cell(subscribers)
+    return [
+        subscriber.phone
+        for subscriber, cell in zip(subscribers, cell_of)
+        if is_rainy(*(round(float(value), 4) for value in centers[cell]))
+    ]
+
+
+def test_nearby_subscribers_share_a_cell() -> None:
+    subscribers = [Subscriber("a", 35.681, 139.761), Subscriber("b", 35.689, 139.769), Subscriber("c", 34.7, 135.5)]
+    centers, cell_of = group_by_cell(subscribers)
+    assert len(centers) == 2
+    assert cell_of[0] == cell_of[1] != cell_of[2]
+
+
+def test_one_request_per_cell_and_alerts_for_rainy_cells(stub: StubServers, tmp_path) -> None:
+    subscribers = clustered_subscribers(2000)
+    cache = ForecastCache(path=str(tmp_path / "forecast.json"))
+    with create_session() as session:
+        summary = run_watchlist(subscribers, session, stub.twilio_client(), cache, stub.endpoint, sender=SENDER)
+
+    phones = expected_phones(subscribers)
+    assert summary["cells"] == len(stub.forecasts) == len(set(stub.forecasts)) < len(subscribers) / 2
+    assert summary["sent"] == len(phones) > 0
+    assert sorted(message["To"] for message in stub.sms) == sorted(phones)
+    assert {message["From"] for message in stub.sms} == {SENDER}
+    # 送信元は引数で渡し、モジュールの設定は書き換えない
+    assert main_refactored.from_twilio != SENDER
+
+
+def test_cache_is_reused_by_the_next_run(stub: StubServers, tmp_path) -> None:
+    path = str(tmp_path / "forecast.json")
+    subscribers = clustered_subscribers(500)
+    client = stub.twilio_client()
+    with create_session() as session:
+        cache = ForecastCache(path=path)
+        first = run_watchlist(subscribers, session, client, cache, stub.endpoint, sender=SENDER)
+        cache.save()
+        requests_after_first = len(stub.forecasts)
+
+        # 別プロセスでの次回の実行を模して、ファイルから読み直す
+        second = run_watchlist(subscribers, session, client, ForecastCache(path=path), stub.endpoint, sender=SENDER)
+    assert requests_after_first == first["cells"]
+    assert len(stub.forecasts) == requests_after_first
+    assert second["sent"] == first["sent"]
+
+
+def test_expired_entries_are_dropped(tmp_path) -> None:
+    now = [1_000_000.0]
+    path = str(tmp_path / "forecast.json")
+    cache = ForecastCache(ttl=60, clock=lambda: now[0], path=path)
+    cache.put((35.65, 139.75), np.array([500, 800], dtype=np.int32))
+    now[0] += 30
+    cache.put((34.65, 135.45), np.array([800, 800], dtype=np.int32))
+    cache.save()
+
+    now[0] += 45  # 1 件目だけ期限切れ
+    reloaded = ForecastCache(ttl=60, clock=lambda: now[0], path=path)
+    assert reloaded.get((35.65, 139.75)) is None
+    assert reloaded.get((34.65, 135.45)).tolist() == [800, 800]
+    now[0] += 60
+    assert reloaded.get((34.65, 135.45)) is None
+
+
+def test_corrupt_cache_file_is_ignored(tmp_path) -> None:
+    path = tmp_path / "forecast.json"
+    path.write_text("{broken", encoding="utf-8")
+    assert ForecastCache(path=str(path)).get((0.05, 0.05)) is None
+
+
+def test_failed_forecasts_do_not_alert_and_are_retried(stub: StubServers, tmp_path) -> None:
+    # 雨のセルの取得を失敗させる
+    subscriber = next(s for s in clustered_subscribers(200) if expected_phones([s]))
+    centers, _ = group_by_cell([subscriber])
+    stub.failing.add(tuple(round(float(value), 4) for value in centers[0]))
+    cache = ForecastCache(path=str(tmp_path / "forecast.json"))
+    client = stub.twilio_client()
+    with create_session() as session:
+        assert run_watchlist([subscriber], session, client, cache, stub.endpoint, sender=SENDER)["sent"] == 0
+        stub.failing.clear()
+        assert run_watchlist([subscriber], session, client, cache, stub.endpoint, sender=SENDER)["sent"] == 1
+    assert len(stub.forecasts) == 2
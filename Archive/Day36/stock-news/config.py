@@ -14,3 +14,13 @@ STOCK_NAME: str = "TSLA"
 COMPANY_NAME: str = "Tesla Inc"
 STOCK_ENDPOINT: str = "https://www.alphavantage.co/query"
 NEWS_ENDPOINT: str = "https://newsapi.org/v2/everything"
+
+# ポートフォリオ（symbol,company の CSV）と株価の保存先
+PORTFOLIO_FILE: str = "portfolio.csv"
+PRICE_STORE_DIR: str = "data/prices"
+# Alpha Vantage の 1 分あたりのリクエスト上限（無料プランは 5）
+STOCK_API_RATE_PER_MINUTE: float = float(os.getenv("STOCK_API_RATE_PER_MINUTE", "5"))
+STOCK_API_MAX_WORKERS: int = 8
+ALERT_THRESHOLD_PERCENT: float = 5
+NEWS_CACHE_FILE: str = "data/news_cache.json"
+NEWS_SEEN_FILE: str = "data/news_seen.txt"
@@ -1,35 +1,82 @@
+import os
+from itertools import islice
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
 from stock_service import fetch_stock_data
-from news_service import fetch_news
+from stock_monitor import StockMonitor, load_portfolio
+from news_service import NewsService
 # from notifier import send_sms  # Twilioを使う場合
 
-from config import STOCK_NAME
+from config import ALERT_THRESHOLD_PERCENT, COMPANY_NAME, PORTFOLIO_FILE, STOCK_NAME
 
 
 def calculate_percentage_difference(stock_data: dict[str, dict[str, str]]) -> tuple[str, int]:
-    data_list = list(stock_data.values())
-    yesterday_close = float(data_list[0]["4. close"])
-    day_before_close = float(data_list[1]["4. close"])
+    # 履歴全体をリストにせず、先頭の 2 日分だけを読む
+    yesterday, day_before = islice(stock_data.values(), 2)
+    yesterday_close = float(yesterday["4. close"])
+    day_before_close = float(day_before["4. close"])
     difference = yesterday_close - day_before_close
     up_down = "🔺" if difference > 0 else "🔻"
     percentage_diff = round((difference / yesterday_close) * 100)
     return up_down, percentage_diff
 
 
+def format_messages(
+    articles: list[dict[str, Any]], symbol: str, up_down: str, percentage_diff: int
+) -> list[str]:
+    return [
+        f"{symbol}: {up_down}{percentage_diff}%\nHeadline: {article['title']}\nBrief: {article['description']}"
+        for article in articles
+    ]
+
+
+def print_messages(messages: Sequence[str]) -> None:
+    for msg in messages:
+        print(msg)
+
+
+def send_alert(
+    news: NewsService,
+    symbol: str,
+    up_down: str,
+    percentage_diff: int,
+    company: str,
+    deliver: Callable[[Sequence[str]], None] = print_messages,  # Twilioで送信する場合は send_sms
+) -> None:
+    # 送信済みの記事は除き、新しい見出しだけを使う
+    articles = news.new_headlines(company)
+    deliver(format_messages(articles, symbol, up_down, percentage_diff))
+    # 送信に失敗する（例外が出る）と記録せず、次回も同じ記事を送る
+    news.mark_sent(articles)
+
+
+def monitor_portfolio() -> None:
+    """portfolio.csv の全銘柄を更新し、前日比が閾値を超えた銘柄だけニュースを取得"""
+    portfolio = load_portfolio()
+    monitor = StockMonitor([symbol for symbol, _ in portfolio])
+    print(monitor.update())
+    moves = np.round(monitor.moves())
+    alerting = np.flatnonzero(np.abs(moves) >= ALERT_THRESHOLD_PERCENT)
+    news = NewsService()
+    news.cache.prefetch(portfolio[index][1] for index in alerting)  # 複数社を 1 リクエストにまとめる
+    for index in alerting:
+        symbol, company = portfolio[index]
+        up_down = "🔺" if moves[index] > 0 else "🔻"
+        send_alert(news, symbol, up_down, int(moves[index]), company)
+
+
 def main() -> None:
+    if os.path.exists(PORTFOLIO_FILE):
+        monitor_portfolio()
+        return
+
     stock_data = fetch_stock_data()
     up_down, percentage_diff = calculate_percentage_difference(stock_data)
 
-    if abs(percentage_diff) >= 5:
-        articles = fetch_news()
-        formatted_messages = [
-            f"{STOCK_NAME}: {up_down}{percentage_diff}%\nHeadline: {article['title']}\nBrief: {article['description']}"
-            for article in articles
-        ]
-        for msg in formatted_messages:
-            print(msg)
-
-        # Twilioで送信する場合
-        # send_sms(formatted_messages)
+    if abs(percentage_diff) >= ALERT_THRESHOLD_PERCENT:
+        send_alert(NewsService(), STOCK_NAME, up_down, percentage_diff, COMPANY_NAME)
 
 
 if __name__ == "__main__":
@@ -1,14 +1,226 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Iterable, Optional
+
 import requests
-from typing import Any
 
-from config import NEWS_API, COMPANY_NAME, NEWS_ENDPOINT
+from config import NEWS_API, COMPANY_NAME, NEWS_CACHE_FILE, NEWS_ENDPOINT, NEWS_SEEN_FILE
+
+Article = dict[str, Any]
+
+# NewsAPI の q / qInTitle は 500 文字まで
+MAX_QUERY_LENGTH = 500
+MAX_COMPANIES_PER_QUERY = 20
+PAGE_SIZE = 100
+NEWS_TTL = timedelta(hours=6)
+NEWS_WINDOW_DAYS = 2
+HEADLINES_PER_ALERT = 3
+
+_SUFFIXES = {"inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "plc",
+             "holdings", "holding", "group", "sa", "ag", "nv", "the"}
 
 
-def fetch_news() -> list[dict[str, Any]]:
+def fetch_news(company: str = COMPANY_NAME) -> list[dict[str, Any]]:
     params = {
-        "qInTitle": COMPANY_NAME,
+        "qInTitle": company,
         "apiKey": NEWS_API,
     }
     response = requests.get(NEWS_ENDPOINT, params=params, timeout=10)
     response.raise_for_status()
     return response.json()["articles"][:3]
+
+
+def search_term(company: str) -> str:
+    """会社名から検索語を作る（"Alphabet Inc Class A" と "Alphabet Inc." は同じ "alphabet"）"""
+    words = re.sub(r"\bclass [a-z]\b", " ", re.sub(r"[^\w\s]", " ", company.lower())).split()
+    while len(words) > 1 and words[-1] in _SUFFIXES:
+        words.pop()
+    while len(words) > 1 and words[0] in _SUFFIXES:
+        words.pop(0)
+    return " ".join(words)
+
+
+def url_hash(url: str) -> str:
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class SeenArticles:
+    """送信済み記事の URL ハッシュ集合（1 行 1 ハッシュで追記保存）"""
+
+    def __init__(self, path: Optional[str] = NEWS_SEEN_FILE) -> None:
+        self.path = path
+        self._hashes: set[str] = set()
+        if path and os.path.exists(path):
+            with open(path, encoding="ascii") as seen_file:
+                self._hashes.update(line.strip() for line in seen_file if line.strip())
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, url: str) -> bool:
+        return url_hash(url) in self._hashes
+
+    def mark(self, urls: Iterable[str]) -> None:
+        new = [digest for digest in map(url_hash, urls) if digest not in self._hashes]
+        if not new:
+            return
+        self._hashes.update(new)
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="ascii") as seen_file:
+                seen_file.writelines(f"{digest}\n" for digest in new)
+
+
+class NewsCache:
+    """(検索語, 期間の開始日) ごとに記事をキャッシュし、複数社を 1 リクエストにまとめて取得"""
+
+    def __init__(
+        self,
+        path: Optional[str] = NEWS_CACHE_FILE,
+        endpoint: str = NEWS_ENDPOINT,
+        session: Optional[requests.Session] = None,
+        ttl: timedelta = NEWS_TTL,
+        window_days: int = NEWS_WINDOW_DAYS,
+        clock: Callable[[], float] = time.time,
+        today: Callable[[], date] = date.today,
+    ) -> None:
+        self.path = path
+        self.endpoint = endpoint
+        self.session = session or requests.Session()
+        self.ttl = ttl
+        self.window_days = window_days
+        self.clock = clock
+        self.today = today
+        self.requests_made = 0
+        self._entries: dict[str, dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as cache_file:
+                    self._entries = json.load(cache_file)
+            except (OSError, ValueError) as e:
+                print(f"[WARN] ニュースキャッシュを読み込めませんでした: {e}")
+
+    def _window_start(self) -> date:
+        return self.today() - timedelta(days=self.window_days)
+
+    def _key(self, term: str) -> str:
+        return f"{term}|{self._window_start().isoformat()}"
+
+    def _fresh(self, term: str) -> bool:
+        entry = self._entries.get(self._key(term))
+        return entry is not None and self.clock() - entry["fetched_at"] < self.ttl.total_seconds()
+
+    def _chunks(self, terms: list[str]) -> Iterable[list[str]]:
+        chunk: list[str] = []
+        for term in terms:
+            candidate = chunk + [term]
+            if chunk and (
+                len(" OR ".join(f'"{t}"' for t in candidate)) > MAX_QUERY_LENGTH
+                or len(candidate) > MAX_COMPANIES_PER_QUERY
+            ):
+                yield chunk
+                candidate = [term]
+            chunk = candidate
+        if chunk:
+            yield chunk
+
+    def _fetch(self, terms: list[str]) -> tuple[list[Article], int]:
+        """(記事, 該当件数 totalResults) を返す。該当件数が記事数より多ければ切り捨てられている"""
+        params = {
+            "qInTitle": " OR ".join(f'"{term}"' for term in terms),
+            "from": self._window_start().isoformat(),
+            "sortBy": "publishedAt",
+            "pageSize": PAGE_SIZE,
+            "apiKey": NEWS_API,
+        }
+        self.requests_made += 1
+        response = self.session.get(self.endpoint, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        articles = data["articles"]
+        return articles, int(data.get("totalResults", len(articles)))
+
+    def prefetch(self, companies: Iterable[str]) -> None:
+        """キャッシュにない会社の記事をまとめて取得（同じ検索語になる関連会社は 1 回だけ）
+
+        まとめた結果が PAGE_SIZE で切り捨てられていると、記事の多い会社に押し出されて
+        見つからなかっただけかもしれないので、その検索語は空としてキャッシュせず単独で取得し直す。
+        """
+        terms = sorted({search_term(company) for company in companies} - {""})
+        missing = [term for term in terms if not self._fresh(term)]
+        pending = list(self._chunks(missing))
+        while pending:
+            chunk = pending.pop(0)
+            try:
+                articles, total = self._fetch(chunk)
+            except (requests.RequestException, KeyError, ValueError) as e:
+                print(f"[ERROR] News request failed: {e}")
+                continue
+            truncated = total > len(articles)
+            fetched_at = self.clock()
+            titles = [
+                " ".join(re.sub(r"[^\w\s]", " ", (article.get("title") or "").lower()).split())
+                for article in articles
+            ]
+            for term in chunk:
+                pattern = re.compile(rf"\b{re.escape(term)}\b")
+                matched = [a for a, title in zip(articles, titles) if pattern.search(title)]
+                if not matched and truncated:
+                    if len(chunk) > 1:
+                        pending.append([term])
+                    continue
+                self._entries[self._key(term)] = {"fetched_at": fetched_at, "articles": matched}
+        if missing:
+            self.save()
+
+    def articles(self, company: str) -> list[Article]:
+        """会社の記事（新しい順）。キャッシュになければ取得する"""
+        term = search_term(company)
+        if not self._fresh(term):
+            self.prefetch([company])
+        entry = self._entries.get(self._key(term))
+        return entry["articles"] if entry else []
+
+    def save(self) -> None:
+        """期間外になったエントリを捨てて一時ファイル経由で書き出す"""
+        suffix = f"|{self._window_start().isoformat()}"
+        self._entries = {key: entry for key, entry in self._entries.items() if key.endswith(suffix)}
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            json.dump(self._entries, out, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class NewsService:
+    """キャッシュから未送信の見出しだけを返す"""
+
+    def __init__(self, cache: Optional[NewsCache] = None, seen: Optional[SeenArticles] = None) -> None:
+        self.cache = cache if cache is not None else NewsCache()
+        self.seen = seen if seen is not None else SeenArticles()  # 空の集合も偽になるので or は使わない
+
+    def new_headlines(self, company: str, limit: int = HEADLINES_PER_ALERT) -> list[Article]:
+        """まだ送っていない記事を最大 limit 件返す（送れたら mark_sent で記録する）"""
+        fresh = []
+        urls: set[str] = set()
+        for article in self.cache.articles(company):
+            url = article.get("url") or ""
+            if url and url not in self.seen and url not in urls:
+                fresh.append(article)
+                urls.add(url)
+                if len(fresh) == limit:
+                    break
+        return fresh
+
+    def mark_sent(self, articles: Iterable[Article]) -> None:
+        """送信できた記事を送信済みとして記録する"""
+        self.seen.mark(article["url"] for article in articles if article.get("url"))
+
@@ -0,0 +1,189 @@
+import csv
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Optional
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    PORTFOLIO_FILE,
+    PRICE_STORE_DIR,
+    STOCK_API_MAX_WORKERS,
+    STOCK_API_RATE_PER_MINUTE,
+    STOCK_ENDPOINT,
+)
+from stock_service import StockApiError, fetch_stock_data
+
+
+def load_portfolio(path: str = PORTFOLIO_FILE) -> list[tuple[str, str]]:
+    """symbol,company の CSV から (銘柄, 会社名) のリストを読み込む"""
+    with open(path, newline="", encoding="utf-8") as portfolio_file:
+        return [(row["symbol"].strip(), row["company"].strip()) for row in csv.DictReader(portfolio_file)]
+
+
+class TokenBucket:
+    """rate 個/秒で補充され、最大 capacity 個まで貯まるトークンバケット（スレッドセーフ）"""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float = STOCK_API_RATE_PER_MINUTE) -> "TokenBucket":
+        return cls(rate=requests_per_minute / 60, capacity=max(1.0, requests_per_minute))
+
+    def acquire(self) -> None:
+        """トークンを 1 つ取得する（足りなければ貯まるまで待つ）"""
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+
+class TimeSeriesStore:
+    """銘柄ごとの終値を date,close の CSV に日付順で追記していく保存先"""
+
+    def __init__(self, directory: str = PRICE_STORE_DIR) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._last_dates: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.directory, f"{symbol}.csv")
+
+    def tail(self, symbol: str, count: int) -> list[tuple[str, float]]:
+        """最新 count 日分の (日付, 終値)（古い順）。ファイルの末尾だけを読む"""
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return []
+        with open(path, "rb") as series_file:
+            size = series_file.seek(0, os.SEEK_END)
+            block = 32 * (count + 1)
+            while True:
+                series_file.seek(max(0, size - block))
+                lines = series_file.read().splitlines()
+                if len(lines) > count or block >= size:
+                    break
+                block *= 2
+        rows = []
+        for line in lines[-count:]:
+            day, _, close = line.decode("ascii").partition(",")
+            if close:
+                rows.append((day, float(close)))
+        return rows
+
+    def last_date(self, symbol: str) -> Optional[str]:
+        if symbol not in self._last_dates:
+            rows = self.tail(symbol, 1)
+            if not rows:
+                return None
+            self._last_dates[symbol] = rows[0][0]
+        return self._last_dates[symbol]
+
+    def append(self, symbol: str, series: dict[str, dict[str, str]]) -> int:
+        """保存済みの最終日より新しい日だけを追記し、追記した行数を返す"""
+        last = self.last_date(symbol) or ""
+        new_days = sorted(day for day in series if day > last)
+        path = self._path(symbol)
+        with open(path, "a", encoding="ascii") as series_file:
+            series_file.writelines(f"{day},{series[day]['4. close']}\n" for day in new_days)
+        os.utime(path)  # 新しい日がなくても「確認済み」の時刻を更新
+        if new_days:
+            with self._lock:
+                self._last_dates[symbol] = new_days[-1]
+        return len(new_days)
+
+    def is_fresh(self, symbol: str, max_age: timedelta) -> bool:
+        """max_age 以内に取得済みか"""
+        path = self._path(symbol)
+        return os.path.exists(path) and time.time() - os.path.getmtime(path) < max_age.total_seconds()
+
+    def latest_closes(self, symbols: list[str], count: int = 2) -> np.ndarray:
+        """[銘柄数, count] の終値の行列（列は新しい順、足りない分は NaN）"""
+        closes = np.full((len(symbols), count), np.nan)
+        for index, symbol in enumerate(symbols):
+            rows = self.tail(symbol, count)
+            if rows:
+                closes[index, : len(rows)] = [close for _, close in reversed(rows)]
+        return closes
+
+
+def percentage_moves(closes: np.ndarray) -> np.ndarray:
+    """全銘柄の前日比（%）を一度に計算（calculate_percentage_difference と同じく最新の終値で割る）"""
+    latest, previous = closes[:, 0], closes[:, 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (latest - previous) / latest * 100
+
+
+class StockMonitor:
+    """ポートフォリオの株価をレート制限付きで並行取得し、差分だけを保存する"""
+
+    def __init__(
+        self,
+        symbols: list[str],
+        store: Optional[TimeSeriesStore] = None,
+        bucket: Optional[TokenBucket] = None,
+        session: Optional[requests.Session] = None,
+        endpoint: str = STOCK_ENDPOINT,
+        max_workers: int = STOCK_API_MAX_WORKERS,
+        refresh: timedelta = timedelta(hours=12),
+    ) -> None:
+        self.symbols = symbols
+        self.store = store or TimeSeriesStore()
+        self.bucket = bucket or TokenBucket.per_minute()
+        self.max_workers = max_workers
+        self.endpoint = endpoint
+        self.refresh = refresh
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_maxsize=max_workers))
+            session.mount("http://", HTTPAdapter(pool_maxsize=max_workers))
+        self.session = session
+
+    def _update_one(self, symbol: str) -> Optional[int]:
+        self.bucket.acquire()
+        try:
+            series = fetch_stock_data(symbol, session=self.session, endpoint=self.endpoint)
+        except (requests.RequestException, StockApiError, ValueError) as e:
+            print(f"[ERROR] {e}")
+            return None
+        return self.store.append(symbol, series)
+
+    def update(self) -> dict[str, int]:
+        """refresh より古い銘柄だけを取得して保存する"""
+        stale = [symbol for symbol in self.symbols if not self.store.is_fresh(symbol, self.refresh)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self._update_one, stale))
+        return {
+            "fetched": sum(result is not None for result in results),
+            "errors": sum(result is None for result in results),
+            "appended_rows": sum(result or 0 for result in results),
+        }
+
+    def moves(self) -> np.ndarray:
+        """全銘柄の前日比（%）"""
+        return percentage_moves(self.store.latest_closes(self.symbols))
+
@@ -1,15 +1,28 @@
 import requests
-from typing import Any
+from typing import Any, Optional
 
 from config import STOCK_API, STOCK_NAME, STOCK_ENDPOINT
 
 
-def fetch_stock_data() -> dict[str, Any]:
+class StockApiError(Exception):
+    """Alpha Vantage がデータの代わりにエラーや制限のメッセージを返した"""
+
+
+def fetch_stock_data(
+    symbol: str = STOCK_NAME,
+    session: Optional[requests.Session] = None,
+    endpoint: str = STOCK_ENDPOINT,
+) -> dict[str, Any]:
     params = {
         "function": "TIME_SERIES_DAILY",
-        "symbol": STOCK_NAME,
+        "symbol": symbol,
         "apikey": STOCK_API,
     }
-    response = requests.get(STOCK_ENDPOINT, params=params, timeout=10)
+    response = (session or requests).get(endpoint, params=params, timeout=10)
     response.raise_for_status()
-    return response.json()["Time Series (Daily)"]
+    data = response.json()
+    if "Time Series (Daily)" not in data:
+        # 制限超過時も 200 で {"Note": ...} や {"Information": ...} が返る
+        message = data.get("Note") or data.get("Information") or data.get("Error Message") or data
+        raise StockApiError(f"{symbol}: {message}")
+    return data["Time Series (Daily)"]
@@ -0,0 +1,176 @@
+import json
+import re
+import threading
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Sequence
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from main_refactored import send_alert
+from news_service import PAGE_SIZE, NewsCache, NewsService, SeenArticles, search_term
+
+TODAY = date(2024, 6, 14)
+
+
+class NewsApiStub:
+    """NewsAPI の /v2/everything を模したサーバー
+
+    titles に登録した見出しのうち、qInTitle のいずれかの語を含むものを新しい順に
+    pageSize 件まで返し、totalResults には該当件数の合計を入れる。
+    """
+
+    def __init__(self) -> None:
+        self.titles: List[tuple] = []  # (公開日時, 見出し, 記事 ID)
+        self.queries: List[List[str]] = []
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                query = parse_qs(urlparse(self.path).query)
+                terms = re.findall(r'"([^"]+)"', query["qInTitle"][0])
+                with lock:
+                    stub.queries.append(terms)
+                matched = sorted(
+                    (item for item in stub.titles if any(term in item[1].lower() for term in terms)),
+                    reverse=True,
+                )
+                articles = [
+                    {"title": title, "description": "...", "url": f"https://news.example.com/{article_id}",
+                     "publishedAt": published.isoformat()}
+                    for published, title, article_id in matched
+                ]
+                payload = json.dumps({
+                    "status": "ok",
+                    "totalResults": len(articles),
+                    "articles": articles[: int(query["pageSize"][0])],
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/v2/everything"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def add(self, title: str, count: int = 1, hours_ago: float = 1) -> None:
+        published = datetime(2024, 6, 14, 12) - timedelta(hours=hours_ago)
+        for n in range(count):
+            self.titles.append(
+                (published - timedelta(minutes=n), f"{title} {n}" if count > 1 else title, len(self.titles))
+            )
+
+
+@pytest.fixture
+def stub() -> Iterator[NewsApiStub]:
+    server = NewsApiStub()
+    yield server
+    server.server.shutdown()
+
+
+def make_cache(stub: NewsApiStub, tmp_path, clock=lambda: 1_000_000.0) -> NewsCache:
+    return NewsCache(str(tmp_path / "news.json"), endpoint=stub.endpoint, clock=clock, today=lambda: TODAY)
+
+
+def test_search_term_merges_share_classes() -> None:
+    assert search_term("Alphabet Inc Class A") == search_term("Alphabet Inc.") == "alphabet"
+    assert search_term("The Coca-Cola Company") == "coca cola"
+
+
+def test_related_companies_share_one_request(stub: NewsApiStub, tmp_path) -> None:
+    companies = [f"Company{i // 2:03d} Inc Class {'AC'[i % 2]}" for i in range(80)]
+    for i in range(40):
+        stub.add(f"Company{i:03d} shares jump")
+    cache = make_cache(stub, tmp_path)
+    cache.prefetch(companies)
+    # 40 の検索語を 20 語ずつ 2 リクエストにまとめる
+    assert cache.requests_made == 2
+    assert [a["title"] for a in cache.articles("Company007 Inc Class C")] == ["Company007 shares jump"]
+
+    # TTL 内は次回の実行でもファイルから返す
+    again = make_cache(stub, tmp_path)
+    again.prefetch(companies)
+    assert again.requests_made == 0 and len(stub.queries) == 2
+
+
+def test_crowded_out_terms_are_queried_alone(stub: NewsApiStub, tmp_path) -> None:
+    stub.add("Tesla recalls cars", count=150, hours_ago=1)
+    stub.add("Ford earnings beat", count=2, hours_ago=30)
+    cache = make_cache(stub, tmp_path)
+    cache.prefetch(["Tesla Inc", "Ford Motor Co", "Quiet Corp"])
+
+    # まとめた結果は Tesla の記事で埋まる（totalResults > 100）ので、Ford と Quiet だけ取り直す
+    assert stub.queries[0] == ["ford motor", "quiet", "tesla"]
+    assert sorted(map(tuple, stub.queries[1:])) == [("ford motor",), ("quiet",)]
+    assert len(cache.articles("Tesla Inc")) == PAGE_SIZE
+    assert cache.articles("Quiet Corp") == []
+    assert cache.requests_made == 3
+
+
+def test_empty_results_are_cached_when_not_truncated(stub: NewsApiStub, tmp_path) -> None:
+    stub.add("Tesla recalls cars", count=3)
+    cache = make_cache(stub, tmp_path)
+    cache.prefetch(["Tesla Inc", "Quiet Corp"])
+    assert cache.articles("Quiet Corp") == []
+    assert cache.requests_made == 1
+
+
+def test_terms_match_whole_words(stub: NewsApiStub, tmp_path) -> None:
+    stub.add("Metal prices rise")
+    stub.add("Meta unveils new headset")
+    stub.add("Blockchain startups raise funds")
+    stub.add("Block party season")
+    cache = make_cache(stub, tmp_path)
+    cache.prefetch(["Meta Inc", "Block Inc"])
+    assert [a["title"] for a in cache.articles("Meta Inc")] == ["Meta unveils new headset"]
+    assert [a["title"] for a in cache.articles("Block Inc")] == ["Block party season"]
+
+
+def test_headlines_are_marked_only_after_delivery(stub: NewsApiStub, tmp_path) -> None:
+    stub.add("Tesla recalls cars", count=5)
+    news = NewsService(make_cache(stub, tmp_path), SeenArticles(str(tmp_path / "seen.txt")))
+
+    def failing(messages: Sequence[str]) -> None:
+        raise ConnectionError("SMS gateway is down")
+
+    with pytest.raises(ConnectionError):
+        send_alert(news, "TSLA", "🔺", 7, "Tesla Inc", deliver=failing)
+    assert len(news.seen) == 0
+
+    delivered: List[str] = []
+    send_alert(news, "TSLA", "🔺", 7, "Tesla Inc", deliver=delivered.extend)
+    assert len(delivered) == 3 and delivered[0].startswith("TSLA: 🔺7%\nHeadline: Tesla recalls cars")
+
+    # 送った記事は、保存先から読み直しても送らない
+    again = NewsService(news.cache, SeenArticles(str(tmp_path / "seen.txt")))
+    assert [a["title"] for a in again.new_headlines("Tesla Inc")] == ["Tesla recalls cars 3", "Tesla recalls cars 4"]
+    assert again.new_headlines("Tesla Inc") == again.new_headlines("Tesla Inc")
+
+
+def test_daily_runs_make_far_fewer_requests_than_alerts(stub: NewsApiStub, tmp_path) -> None:
+    companies = [f"Company{i // 2:03d} Inc Class {'AC'[i % 2]}" for i in range(500)]
+    for i in range(250):
+        stub.add(f"Company{i:03d} news", count=2)
+    cache = make_cache(stub, tmp_path)
+    news = NewsService(cache, SeenArticles(str(tmp_path / "seen.txt")))
+
+    alerts = 0
+    delivered: List[str] = []
+    for _ in range(3):  # 1 日 3 回実行
+        alerting = companies[::5]
+        cache.prefetch(alerting)
+        for company in alerting:
+            send_alert(news, "SYM", "🔺", 5, company, deliver=delivered.extend)
+        alerts += len(alerting)
+
+    # 旧実装は 1 アラート 1 リクエスト
+    assert cache.requests_made <= alerts / 20
+    # 同じ記事は一度しか送らない（Class A / C も重複しない）
+    assert len(delivered) == len(set(delivered)) == 2 * len({search_term(c) for c in companies[::5]})
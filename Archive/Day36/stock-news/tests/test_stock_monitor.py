@@ -0,0 +1,159 @@
+import json
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List
+
+import numpy as np
+import pytest
+
+from stock_monitor import StockMonitor, TimeSeriesStore, TokenBucket, load_portfolio, percentage_moves
+
+
+def stub_close(symbol: str, day: date) -> float:
+    seed = sum(map(ord, symbol))
+    return round(100 + seed % 50 + 25 * np.sin((day.toordinal() + seed) / 3), 4)
+
+
+class AlphaVantageStub:
+    """Alpha Vantage を模したサーバー。直近 100 日分（compact）を新しい順に返す"""
+
+    def __init__(self) -> None:
+        self.today = date(2024, 6, 14)
+        self.requests: List[str] = []
+        self.limited: set = set()
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                symbol = self.path.split("symbol=")[1].split("&")[0]
+                with lock:
+                    stub.requests.append(symbol)
+                if symbol in stub.limited:
+                    # 制限超過時も 200 で Note が返る
+                    body = {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is ..."}
+                else:
+                    days = [stub.today - timedelta(days=offset) for offset in range(100)]
+                    body = {"Time Series (Daily)": {
+                        day.isoformat(): {"4. close": f"{stub_close(symbol, day):.4f}"} for day in days
+                    }}
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/query"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def stub() -> Iterator[AlphaVantageStub]:
+    server = AlphaVantageStub()
+    yield server
+    server.server.shutdown()
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.slept = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept += seconds
+        self.now += seconds
+
+
+def test_token_bucket_allows_a_burst_then_keeps_the_rate() -> None:
+    clock = FakeClock()
+    bucket = TokenBucket(rate=5 / 60, capacity=5, clock=clock, sleep=clock.sleep)
+    for _ in range(5):
+        bucket.acquire()
+    assert clock.slept == 0
+    for _ in range(10):
+        bucket.acquire()
+    # 5 回のバーストの後は 12 秒に 1 回
+    assert clock.slept == pytest.approx(10 * 12)
+
+
+def test_token_bucket_is_shared_between_threads() -> None:
+    clock = FakeClock()
+    lock = threading.Lock()
+
+    def sleep(seconds: float) -> None:
+        with lock:
+            clock.sleep(seconds)
+
+    bucket = TokenBucket(rate=1.0, capacity=2, clock=clock, sleep=sleep)
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 12 回の取得には少なくとも (12 - 2) / rate 秒かかる
+    assert clock.now >= 10 - 1e-9
+
+
+def test_updates_fetch_only_stale_symbols_and_append_new_days(stub: AlphaVantageStub, tmp_path) -> None:
+    symbols = [f"S{index:04d}" for index in range(60)]
+    monitor = StockMonitor(
+        symbols, store=TimeSeriesStore(str(tmp_path)), bucket=TokenBucket(rate=1000, capacity=100),
+        endpoint=stub.endpoint,
+    )
+    assert monitor.update() == {"fetched": 60, "errors": 0, "appended_rows": 6000}
+    assert sorted(stub.requests) == symbols
+
+    # 12 時間以内に取得済みなので API を呼ばない
+    assert monitor.update() == {"fetched": 0, "errors": 0, "appended_rows": 0}
+    assert len(stub.requests) == 60
+
+    # 営業日が 1 日進むと、各銘柄 1 行だけ追記される
+    stub.today += timedelta(days=1)
+    monitor.refresh = timedelta(0)
+    assert monitor.update() == {"fetched": 60, "errors": 0, "appended_rows": 60}
+    rows = monitor.store.tail("S0007", 101)
+    assert len(rows) == 101
+    assert [day for day, _ in rows] == sorted(day for day, _ in rows)
+
+    latest, previous = stub_close("S0007", stub.today), stub_close("S0007", stub.today - timedelta(days=1))
+    assert monitor.moves()[7] == pytest.approx((latest - previous) / latest * 100)
+
+
+def test_rate_limit_notes_are_errors_and_not_stored(stub: AlphaVantageStub, tmp_path) -> None:
+    stub.limited.add("LIMIT")
+    store = TimeSeriesStore(str(tmp_path))
+    monitor = StockMonitor(["OK", "LIMIT"], store=store, bucket=TokenBucket(rate=1000, capacity=10), endpoint=stub.endpoint)
+    assert monitor.update() == {"fetched": 1, "errors": 1, "appended_rows": 100}
+    assert store.tail("LIMIT", 2) == []
+    # 失敗した銘柄は次回また取得する
+    stub.limited.clear()
+    assert monitor.update()["fetched"] == 1
+    assert stub.requests.count("LIMIT") == 2
+
+
+def test_latest_closes_pads_missing_history(tmp_path) -> None:
+    store = TimeSeriesStore(str(tmp_path))
+    store.append("ONE", {"2024-06-14": {"4. close": "110"}})
+    store.append("TWO", {"2024-06-13": {"4. close": "100"}, "2024-06-14": {"4. close": "95"}})
+    closes = store.latest_closes(["ONE", "TWO", "NONE"])
+    assert closes[1].tolist() == [95, 100]
+    assert closes[0, 0] == 110 and np.isnan(closes[0, 1]) and np.isnan(closes[2]).all()
+
+    moves = percentage_moves(closes)
+    assert np.isnan(moves[0]) and np.isnan(moves[2])
+    assert moves[1] == pytest.approx(-5 / 95 * 100)
+
+
+def test_load_portfolio(tmp_path) -> None:
+    path = tmp_path / "portfolio.csv"
+    path.write_text("symbol,company\nTSLA, Tesla Inc\nGOOGL,Alphabet Inc Class A\n", encoding="utf-8")
+    assert load_portfolio(str(path)) == [("TSLA", "Tesla Inc"), ("GOOGL", "Alphabet Inc Class A")]
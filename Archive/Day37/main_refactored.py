@@ -1,9 +1,10 @@
+import csv
 import os
 from datetime import datetime
 from typing import Optional
 
 from dotenv import load_dotenv
-from pixela_client import create_pixel, update_pixel, delete_pixel
+from pixela_client import PixelaClient
 
 load_dotenv()
 
@@ -17,33 +18,43 @@ def main() -> None:
         raise ValueError("環境変数 TOKEN または USERNAME が設定されていません。")
 
     today = datetime.now()
+    client = PixelaClient(TOKEN, USERNAME)
     print("=== Pixela 学習時間管理 ===")
     print("1: 新規追加 (create)")
     print("2: 更新 (update)")
     print("3: 削除 (delete)")
+    print("4: CSV からまとめて同期 (sync)")
 
-    choice = input("操作を選んでください (1/2/3): ").strip()
+    choice = input("操作を選んでください (1/2/3/4): ").strip()
 
     if choice == "1":
         hours = input("今日の学習時間を入力してください (h): ")
-        response = create_pixel(TOKEN, USERNAME, GRAPH_ID, today, hours)
+        response = client.create_pixel(GRAPH_ID, today, hours)
         print("Pixel Creation:", response.text)
 
     elif choice == "2":
         hours = input("修正後の学習時間を入力してください (h): ")
-        response = update_pixel(TOKEN, USERNAME, GRAPH_ID, today, hours)
+        response = client.update_pixel(GRAPH_ID, today, hours)
         print("Pixel Update:", response.text)
 
     elif choice == "3":
         confirm = input("本当に削除しますか？ (y/n): ").lower()
         if confirm == "y":
-            response = delete_pixel(TOKEN, USERNAME, GRAPH_ID, today)
+            response = client.delete_pixel(GRAPH_ID, today)
             print("Pixel Delete:", response.text)
         else:
             print("削除をキャンセルしました。")
 
+    elif choice == "4":
+        path = input("CSV ファイル (date,hours) のパス: ").strip()
+        with open(path, newline="", encoding="utf-8") as history_file:
+            history = {row["date"]: row["hours"] for row in csv.DictReader(history_file)}
+        result = client.sync(GRAPH_ID, history)
+        print("Pixel Sync:", result)
+
     else:
         print("無効な選択です。終了します。")
+    client.close()
 
 
 if __name__ == "__main__":
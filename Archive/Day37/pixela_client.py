@@ -1,9 +1,21 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date as Date, datetime
+from typing import Any, Callable, Mapping, Optional, Union
+
 import requests
 from requests import Response
-from datetime import datetime
+from requests.adapters import HTTPAdapter
 
 PIXELA_URL = "https://pixe.la/v1/users"
 
+DateLike = Union[Date, datetime, str]
+# サポーター以外のリクエストは一定の確率で 503 (isRejected) になるので再試行する
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 
 def create_pixel(token: str, username: str, graph_id: str, date: datetime, quantity: str) -> Response:
     """指定した日付に学習時間を記録する"""
@@ -29,3 +41,185 @@ def delete_pixel(token: str, username: str, graph_id: str, date: datetime) -> Re
     delete_endpoint = f"{PIXELA_URL}/{username}/graphs/{graph_id}/{date.strftime('%Y%m%d')}"
     headers = {"X-USER-TOKEN": token}
     return requests.delete(url=delete_endpoint, headers=headers)
+
+
+def pixel_date(value: DateLike) -> str:
+    """date / datetime / "yyyyMMdd" を Pixela の日付文字列にする"""
+    if isinstance(value, str):
+        return value.replace("-", "")
+    return value.strftime("%Y%m%d")
+
+
+def _same_quantity(a: str, b: str) -> bool:
+    try:
+        return float(a) == float(b)
+    except ValueError:
+        return a == b
+
+
+@dataclass
+class SyncResult:
+    """sync の結果（件数）"""
+
+    unchanged: int = 0
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    failed: int = 0
+    requests: int = 0
+
+
+class PixelaClient:
+    """keep-alive のセッションを使い回し、拒否されたリクエストを再試行する Pixela クライアント"""
+
+    def __init__(
+        self,
+        token: str,
+        username: str,
+        base_url: str = PIXELA_URL,
+        max_workers: int = 4,
+        max_retries: int = 6,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.username = username
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.requests_sent = 0
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.headers["X-USER-TOKEN"] = token
+        adapter = HTTPAdapter(pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __enter__(self) -> "PixelaClient":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _graph_url(self, graph_id: str) -> str:
+        return f"{self.base_url}/{self.username}/graphs/{graph_id}"
+
+    def _send(self, method: str, url: str, **kwargs: Any) -> Response:
+        with self._lock:
+            self.requests_sent += 1
+        return self.session.request(method, url, timeout=10, **kwargs)
+
+    def _request(self, method: str, url: str, **kwargs: Any) -> Response:
+        """指数バックオフ（ジッター付き）で再試行しながらリクエストする
+
+        最後の試行のレスポンス（再試行対象のステータスでも）または例外をそのまま返す。
+        """
+        for attempt in range(self.max_retries):
+            try:
+                response = self._send(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                pass
+            delay = min(self.max_backoff, self.backoff * 2**attempt)
+            self.sleep(delay * random.uniform(0.5, 1.0))
+        return self._send(method, url, **kwargs)
+
+    # 1 件ずつの操作
+
+    def create_pixel(self, graph_id: str, date: DateLike, quantity: str) -> Response:
+        """指定した日付に学習時間を記録する"""
+        return self._request(
+            "POST", self._graph_url(graph_id), json={"date": pixel_date(date), "quantity": str(quantity)}
+        )
+
+    def update_pixel(self, graph_id: str, date: DateLike, quantity: str) -> Response:
+        """指定した日付の学習時間を更新する（なければ作成される）"""
+        return self._request(
+            "PUT", f"{self._graph_url(graph_id)}/{pixel_date(date)}", json={"quantity": str(quantity)}
+        )
+
+    def delete_pixel(self, graph_id: str, date: DateLike) -> Response:
+        """指定した日付の学習時間を削除する"""
+        return self._request("DELETE", f"{self._graph_url(graph_id)}/{pixel_date(date)}")
+
+    def get_pixels(
+        self, graph_id: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None
+    ) -> dict[str, str]:
+        """グラフに記録済みのピクセルを {yyyyMMdd: quantity} で取得"""
+        params = {"withBody": "true"}
+        if start is not None:
+            params["from"] = pixel_date(start)
+        if end is not None:
+            params["to"] = pixel_date(end)
+        response = self._request("GET", f"{self._graph_url(graph_id)}/pixels", params=params)
+        response.raise_for_status()
+        return {pixel["date"]: str(pixel["quantity"]) for pixel in response.json().get("pixels", [])}
+
+    # まとめて同期
+
+    def sync(
+        self,
+        graph_id: str,
+        quantities: Mapping[DateLike, Optional[Union[str, int, float]]],
+        delete_missing: bool = False,
+    ) -> SyncResult:
+        """{日付: 値} に合わせてグラフを更新する
+
+        先にリモートのピクセルを 1 回で取得し、値が違う日だけを送る。
+        値が None の日と、delete_missing=True のときに期間内でリモートにだけある日は削除する。
+        """
+        desired = {pixel_date(day): None if q is None else str(q) for day, q in quantities.items()}
+        if not desired:
+            return SyncResult()
+        before = self.requests_sent
+        remote = self.get_pixels(graph_id, min(desired), max(desired))
+
+        operations: list[tuple[str, str, Optional[str]]] = []
+        result = SyncResult()
+        for day, quantity in sorted(desired.items()):
+            if quantity is None:
+                if day in remote:
+                    operations.append(("delete", day, None))
+            elif day not in remote:
+                operations.append(("create", day, quantity))
+            elif not _same_quantity(remote[day], quantity):
+                operations.append(("update", day, quantity))
+            else:
+                result.unchanged += 1
+        if delete_missing:
+            operations.extend(("delete", day, None) for day in sorted(remote.keys() - desired.keys()))
+
+        def apply(operation: tuple[str, str, Optional[str]]) -> bool:
+            kind, day, quantity = operation
+            try:
+                if kind == "delete":
+                    response = self.delete_pixel(graph_id, day)
+                else:
+                    response = self.update_pixel(graph_id, day, quantity or "0")
+            except requests.RequestException as e:
+                print(f"[ERROR] {kind} {day}: {e}")
+                return False
+            if not response.ok:
+                print(f"[ERROR] {kind} {day}: {response.status_code} {response.text}")
+            return response.ok
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for (kind, _, _), ok in zip(operations, executor.map(apply, operations)):
+                if not ok:
+                    result.failed += 1
+                elif kind == "create":
+                    result.created += 1
+                elif kind == "update":
+                    result.updated += 1
+                else:
+                    result.deleted += 1
+        result.requests = self.requests_sent - before
+        return result
+
@@ -0,0 +1,163 @@
+import json
+import random
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
+from urllib.parse import urlparse
+
+import pytest
+import requests
+
+from pixela_client import PixelaClient, pixel_date
+
+TOKEN = "secret-token"
+
+
+class FakePixela:
+    """一定の確率でリクエストを拒否する Pixela のスタブ（graphs: {graph_id: {yyyyMMdd: quantity}}）"""
+
+    def __init__(self, reject_rate: float = 0.25, seed: int = 0) -> None:
+        self.reject_rate = reject_rate
+        self.reject_writes = False  # True なら GET 以外を必ず拒否する
+        self.graphs: Dict[str, Dict[str, str]] = {}
+        self.requests = 0
+        self.rejected = 0
+        lock = threading.Lock()
+        rng = random.Random(seed)
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def _reply(self, status: int, body: Dict[str, Any]) -> None:
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _handle(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else {}
+                url = urlparse(self.path)
+                # /v1/users/<user>/graphs/<graph>[/<date> | /pixels]
+                parts = url.path.strip("/").split("/")
+                with lock:
+                    fake.requests += 1
+                    rejected = rng.random() < fake.reject_rate or (fake.reject_writes and self.command != "GET")
+                    fake.rejected += rejected
+                if self.headers.get("X-USER-TOKEN") != TOKEN:
+                    return self._reply(401, {"message": "User token is invalid.", "isSuccess": False})
+                if rejected:
+                    return self._reply(503, {"message": "Please retry this request.", "isSuccess": False, "isRejected": True})
+                with lock:
+                    pixels = fake.graphs.setdefault(parts[4], {})
+                    if self.command == "GET" and parts[-1] == "pixels":
+                        query = dict(pair.split("=") for pair in url.query.split("&") if pair)
+                        start, end = query.get("from", "00000000"), query.get("to", "99999999")
+                        found = [{"date": d, "quantity": q} for d, q in sorted(pixels.items()) if start <= d <= end]
+                        return self._reply(200, {"pixels": found})
+                    if self.command == "POST":
+                        pixels[body["date"]] = body["quantity"]
+                    elif self.command == "PUT":
+                        pixels[parts[5]] = body["quantity"]
+                    elif self.command == "DELETE":
+                        if parts[5] not in pixels:
+                            return self._reply(404, {"message": "Specified pixel not found.", "isSuccess": False})
+                        del pixels[parts[5]]
+                self._reply(200, {"message": "Success.", "isSuccess": True})
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle  # noqa: N815
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}/v1/users"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def pixela() -> Iterator[FakePixela]:
+    fake = FakePixela()
+    yield fake
+    fake.server.shutdown()
+
+
+def make_client(pixela: FakePixela, token: str = TOKEN, **kwargs: Any) -> PixelaClient:
+    return PixelaClient(token, "me", base_url=pixela.base, sleep=lambda seconds: None, **kwargs)
+
+
+def test_backfill_survives_rejections_and_sends_only_changes(pixela: FakePixela) -> None:
+    start = date(2024, 1, 1)
+    history = {start + timedelta(days=i): str((i * 7) % 9) for i in range(365)}
+    # リモートには 300 日分だけ、うち 60 日は違う値で登録済み
+    pixela.graphs["graph2"] = {
+        pixel_date(day): str(int(q) + (1 if i < 60 else 0)) for i, (day, q) in enumerate(list(history.items())[:300])
+    }
+
+    with make_client(pixela) as client:
+        result = client.sync("graph2", history)
+        assert (result.created, result.updated, result.deleted, result.failed) == (65, 60, 0, 0)
+        assert result.unchanged == 240
+        assert pixela.rejected > 0
+        assert pixela.graphs["graph2"] == {pixel_date(day): q for day, q in history.items()}
+        # 1 日 1 リクエストの旧実装より少ない（再試行込み）
+        assert result.requests == pixela.requests < len(history)
+
+        # 2 回目は取得だけで終わる
+        pixela.reject_rate = 0
+        again = client.sync("graph2", history)
+    assert again.requests == 1 and again.unchanged == len(history)
+
+
+def test_none_and_delete_missing_remove_pixels(pixela: FakePixela) -> None:
+    pixela.reject_rate = 0
+    pixela.graphs["g"] = {"20240101": "1", "20240102": "2", "20240103": "3", "20240110": "9"}
+    with make_client(pixela) as client:
+        result = client.sync("g", {"20240101": "1.0", "20240102": None, "2024-01-03": 4}, delete_missing=True)
+    assert (result.unchanged, result.updated, result.deleted) == (1, 1, 1)
+    # 期間外の日は delete_missing でも消さない
+    assert pixela.graphs["g"] == {"20240101": "1", "20240103": "4", "20240110": "9"}
+
+
+def test_retries_back_off_exponentially_and_give_up(pixela: FakePixela) -> None:
+    pixela.reject_rate = 1.0
+    sleeps: List[float] = []
+    client = PixelaClient(TOKEN, "me", base_url=pixela.base, max_retries=5, backoff=1, max_backoff=8, sleep=sleeps.append)
+    response = client.update_pixel("g", date(2024, 1, 1), "1")
+    client.close()
+    assert response.status_code == 503
+    assert client.requests_sent == pixela.requests == 6
+    # ジッターは 0.5〜1 倍
+    assert len(sleeps) == 5
+    for delay, limit in zip(sleeps, [1, 2, 4, 8, 8]):
+        assert limit * 0.5 <= delay <= limit
+
+
+def test_client_errors_are_not_retried(pixela: FakePixela) -> None:
+    pixela.reject_rate = 0
+    with make_client(pixela, token="wrong") as client:
+        assert client.update_pixel("g", "20240101", "1").status_code == 401
+        assert client.requests_sent == 1
+        with pytest.raises(requests.HTTPError):
+            client.get_pixels("g")
+
+
+def test_failed_operations_are_counted(pixela: FakePixela) -> None:
+    pixela.reject_rate = 0
+    pixela.reject_writes = True
+    with make_client(pixela, max_retries=1) as client:
+        result = client.sync("g", {"20240101": 1, "20240102": 2})
+    assert (result.created, result.failed) == (0, 2)
+    assert result.requests == 1 + 2 * 2
+
+
+def test_connection_errors_are_retried_then_raised() -> None:
+    sleeps: List[float] = []
+    client = PixelaClient(TOKEN, "me", base_url="http://127.0.0.1:9/v1/users", max_retries=2, sleep=sleeps.append)
+    with pytest.raises(requests.ConnectionError):
+        client.delete_pixel("g", "20240101")
+    assert client.requests_sent == 3 and len(sleeps) == 2
@@ -0,0 +1,84 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from data_manager_refactored import DataManager
+
+
+class SheetyRowsStub:
+    """Local Sheety stand-in that answers the first PUT for every row with 503."""
+
+    def __init__(self, rows: int) -> None:
+        self.sheet: Dict[int, Dict[str, Any]] = {
+            i: {"city": f"City {i}", "iataCode": "", "lowestPrice": 100 + i, "id": i} for i in range(2, rows + 2)
+        }
+        self.puts: List[Dict[str, Any]] = []
+        self.rejected = 0
+        failed_once = set()
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def _reply(self, status: int, payload: Dict[str, Any]) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:  # noqa: N802
+                with lock:
+                    rows = [dict(row) for row in stub.sheet.values()]
+                self._reply(200, {"prices": rows})
+
+            def do_PUT(self) -> None:  # noqa: N802
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                row_id = int(self.path.rsplit("/", 1)[1])
+                with lock:
+                    retry = row_id not in failed_once
+                    failed_once.add(row_id)
+                    stub.rejected += retry
+                    if not retry:
+                        stub.puts.append({"id": row_id, **body["price"]})
+                        stub.sheet[row_id].update(body["price"])
+                self._reply(503 if retry else 200, {"price": stub.sheet[row_id]})
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/prices"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def sheety() -> Iterator[SheetyRowsStub]:
+    stub = SheetyRowsStub(rows=300)
+    yield stub
+    stub.server.shutdown()
+
+
+def test_only_rows_with_new_codes_are_written(sheety: SheetyRowsStub, capsys) -> None:
+    data_manager = DataManager(endpoint=sheety.endpoint)
+    data = data_manager.get_destination_data()
+    for row in data[:3]:
+        row["iataCode"] = row["city"][:3].upper()
+
+    assert [change.row_id for change in data_manager.update_destination_codes(dry_run=True)] == [2, 3, 4]
+    assert "Row 2 (City 2): iataCode: '' -> 'CIT'" in capsys.readouterr().out
+    assert sheety.puts == []
+
+    written = data_manager.update_destination_codes()
+    assert [change.row_id for change in written] == [2, 3, 4]
+    assert sheety.rejected == 3
+    assert sorted(sheety.puts, key=lambda put: put["id"]) == [{"id": i, "iataCode": "CIT"} for i in (2, 3, 4)]
+    assert data_manager.update_destination_codes() == []
+    data_manager.close()
@@ -26,3 +26,17 @@ TEST_MAIL: str = os.getenv("TEST_MAIL", "")
 TEST_MAIL2: str = os.getenv("TEST_MAIL2", "")
 SMTP_SERVER: str = os.getenv("SMTP_SERVER", "")
 SMTP_PORT: int = int(os.getenv("SMTP_PORT", 587))
+
+# Amadeus allows about 10 requests per second on the test environment
+FLIGHT_SEARCH_RATE_PER_SECOND: float = float(os.getenv("FLIGHT_SEARCH_RATE_PER_SECOND", 10))
+FLIGHT_SEARCH_BURST: int = int(os.getenv("FLIGHT_SEARCH_BURST", 1))
+FLIGHT_SEARCH_MAX_CONCURRENCY: int = int(os.getenv("FLIGHT_SEARCH_MAX_CONCURRENCY", 16))
+AMADEUS_TOKEN_CACHE: str = os.getenv("AMADEUS_TOKEN_CACHE", ".amadeus_token.json")
+IATA_CACHE_FILE: str = os.getenv("IATA_CACHE_FILE", ".iata_cache.json")
+# Offers returned per search (Amadeus allows up to 250)
+FLIGHT_SEARCH_MAX_OFFERS: int = int(os.getenv("FLIGHT_SEARCH_MAX_OFFERS", 5))
+PRICE_HISTORY_DB: str = os.getenv("PRICE_HISTORY_DB", "price_history.sqlite3")
+# "bcc": one message per MAIL_BCC_BATCH customers, "personal": one message each
+MAIL_MODE: str = os.getenv("MAIL_MODE", "bcc")
+MAIL_POOL_SIZE: int = int(os.getenv("MAIL_POOL_SIZE", 4))
+MAIL_BCC_BATCH: int = int(os.getenv("MAIL_BCC_BATCH", 100))
@@ -1,60 +1,131 @@
+import copy
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
-from typing import List, Dict, Any
+from typing import List, Dict, Any, NamedTuple, Tuple
+from urllib3.util.retry import Retry
 from config import SHEETY_ENDPOINT, SHEETY_USER, SHEETY_PASSWORD, PRICES_ENDPOINT, USERS_ENDPOINT
 from pprint import pprint
 
+
+class RowChange(NamedTuple):
+    """Fields of one sheet row that differ from what was last read or written."""
+
+    row_id: int
+    city: str
+    changes: Dict[str, Tuple[Any, Any]]  # field: (old, new)
+
 class DataManager:
     """Manages interaction with the Google Sheet via Sheety API."""
 
-    def __init__(self) -> None:
-        """Initializes the DataManager."""
-        self._endpoint = SHEETY_ENDPOINT
-        self.users_endpoint = USERS_ENDPOINT
+    def __init__(
+        self,
+        endpoint: str = SHEETY_ENDPOINT,
+        users_endpoint: str = USERS_ENDPOINT,
+        max_workers: int = 4,
+        retries: int = 3,
+    ) -> None:
+        """Initializes the DataManager.
+
+        All requests go through one keep-alive session; writes are retried
+        with backoff on connection errors, 429 and 5xx responses.
+        """
+        self._endpoint = endpoint
+        self.users_endpoint = users_endpoint
         self.prices_endpoint = PRICES_ENDPOINT
+        self.max_workers = max_workers
         # self.destination_data: List[Dict[str, Any]] = []
         self._auth = HTTPBasicAuth(str(SHEETY_USER), str(SHEETY_PASSWORD))
+        self._session = requests.Session()
+        self._session.auth = self._auth
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET", "PUT"),
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
         self.destination_data = {}
         self.customer_data = {}
+        # Rows as last read from or written to the sheet, by row id
+        self._snapshot: Dict[int, Dict[str, Any]] = {}
+
+    def close(self) -> None:
+        """Closes the pooled connections."""
+        self._session.close()
 
 
     def get_destination_data(self) -> List[Dict[str, Any]]:
         """Retrieves destination data from the Google Sheet."""
         try:
-            response = requests.get(url=self._endpoint, auth=self._auth)
+            response = self._session.get(url=self._endpoint)
             response.raise_for_status()
             data = response.json()
             self.destination_data = data.get("prices", [])
+            self._snapshot = {row["id"]: copy.deepcopy(row) for row in self.destination_data}
             return self.destination_data
         except requests.exceptions.RequestException as e:
             print(f"Error fetching destination data: {e}")
             return []
 
-    def update_destination_codes(self) -> None:
-        """Updates the IATA codes in the Google Sheet for each city."""
+    def changed_rows(self) -> List[RowChange]:
+        """Compare destination_data with the last known sheet contents."""
+        changed = []
+        for row in self.destination_data:
+            before = self._snapshot.get(row["id"], {})
+            changes = {
+                field: (before.get(field), value)
+                for field, value in row.items()
+                if field != "id" and before.get(field) != value
+            }
+            if changes:
+                changed.append(RowChange(row["id"], row.get("city", ""), changes))
+        return changed
+
+    def _put_row(self, change: RowChange) -> bool:
+        new_data = {"price": {field: new for field, (_, new) in change.changes.items()}}
+        try:
+            response = self._session.put(url=f"{self._endpoint}/{change.row_id}", json=new_data)
+            response.raise_for_status()
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"Error updating row for {change.city}: {e}")
+            return False
+
+    def update_destination_codes(self, dry_run: bool = False) -> List[RowChange]:
+        """Writes only the rows that changed since they were read, concurrently.
+
+        With ``dry_run`` the diff is printed and nothing is sent. Returns
+        the changes that were (or would be) written.
+        """
         if not self.destination_data:
             print("No destination data to update.")
-            return
-
-        for city in self.destination_data:
-            if "iataCode" not in city:
-                continue
-
-            new_data = {"price": {"iataCode": city["iataCode"]}}
-            try:
-                response = requests.put(
-                    url=f"{self._endpoint}/{city['id']}",
-                    json=new_data,
-                    auth=self._auth,
-                )
-                response.raise_for_status()
-                # print(f"Successfully updated IATA code for {city['city']}.")
-            except requests.exceptions.RequestException as e:
-                print(f"Error updating IATA code for {city['city']}: {e}")
+            return []
+
+        changed = self.changed_rows()
+        if dry_run:
+            for change in changed:
+                fields = ", ".join(f"{field}: {old!r} -> {new!r}" for field, (old, new) in change.changes.items())
+                print(f"Row {change.row_id} ({change.city}): {fields}")
+            print(f"{len(changed)} of {len(self.destination_data)} rows would be updated.")
+            return changed
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self._put_row, changed))
+        rows = {row["id"]: row for row in self.destination_data}
+        written = []
+        for change, ok in zip(changed, results):
+            if ok:
+                self._snapshot[change.row_id] = copy.deepcopy(rows[change.row_id])
+                written.append(change)
+        return written
 
     def get_customer_emails(self) :
         try:
-            response = requests.get(url=self.users_endpoint, auth=self._auth)
+            response = self._session.get(url=self.users_endpoint)
             response.raise_for_status()
             if response.text:
                 data = response.json()
@@ -71,3 +142,4 @@ class DataManager:
         except requests.exceptions.RequestException as e:
             print(f"Error fetching customer data: {e}")
             return []
+
@@ -1,4 +1,12 @@
-from typing import Any, Dict, List, Optional
+import json
+from typing import Any, Dict, Hashable, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library decoder
+    orjson = None
 
 
 class FlightData:
@@ -42,27 +50,102 @@ def find_cheapest_flight(data: List[Dict[str, Any]]) -> Optional[FlightData]:
             lowest_price = price
             cheapest_flight_data = flight_data
 
-    nr_stops = len(cheapest_flight_data["itineraries"][0]["segments"]) - 1
-    origin = cheapest_flight_data["itineraries"][0]["segments"][0]["departure"][
-        "iataCode"
-    ]
-    destination = cheapest_flight_data["itineraries"][0]["segments"][nr_stops][
-        "arrival"
-    ]["iataCode"]
-    out_date = cheapest_flight_data["itineraries"][0]["segments"][0]["departure"][
-        "at"
-    ].split("T")[0]
-    return_date = cheapest_flight_data["itineraries"][1]["segments"][0]["departure"][
-        "at"
-    ].split("T")[0]
+    return _flight_from_offer(cheapest_flight_data, lowest_price)
 
+
+def _flight_from_offer(offer: Dict[str, Any], price: float) -> FlightData:
+    """Build FlightData from one raw Amadeus offer."""
+    outbound = offer["itineraries"][0]["segments"]
+    nr_stops = len(outbound) - 1
     return FlightData(
-        price=lowest_price,
+        price=price,
         origin_city="",  # To be populated later
-        origin_airport=origin,
+        origin_airport=outbound[0]["departure"]["iataCode"],
         destination_city="",  # To be populated later
-        destination_airport=destination,
-        out_date=out_date,
-        return_date=return_date,
+        destination_airport=outbound[nr_stops]["arrival"]["iataCode"],
+        out_date=outbound[0]["departure"]["at"].split("T")[0],
+        return_date=offer["itineraries"][1]["segments"][0]["departure"]["at"].split("T")[0],
         stops=nr_stops > 0,
     )
+
+
+def decode_json(raw: Union[bytes, str]) -> Any:
+    """Decode a response body with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class OfferColumns(NamedTuple):
+    """Flight offers of many routes flattened into parallel arrays."""
+
+    routes: List[Hashable]
+    route: np.ndarray  # index into routes, one per offer
+    price: np.ndarray
+    stops: np.ndarray
+    origin: np.ndarray
+    destination: np.ndarray
+    out_date: np.ndarray
+    return_date: np.ndarray
+
+
+def flatten_offers(offers_by_route: Mapping[Hashable, List[Dict[str, Any]]]) -> OfferColumns:
+    """Extract price, stops, airports and dates of every offer in one pass."""
+    routes = list(offers_by_route)
+    counts = [len(offers) for offers in offers_by_route.values()]
+    rows = [
+        (
+            offer["price"]["grandTotal"],
+            len(outbound := offer["itineraries"][0]["segments"]) - 1,
+            outbound[0]["departure"]["iataCode"],
+            outbound[-1]["arrival"]["iataCode"],
+            outbound[0]["departure"]["at"][:10],
+            offer["itineraries"][1]["segments"][0]["departure"]["at"][:10],
+        )
+        for offers in offers_by_route.values()
+        for offer in offers
+    ]
+    prices, stops, origins, destinations, out_dates, return_dates = zip(*rows) if rows else ((),) * 6
+    return OfferColumns(
+        routes=routes,
+        route=np.repeat(np.arange(len(routes), dtype=np.intp), counts),
+        price=np.array(prices, dtype=np.float64),
+        stops=np.array(stops, dtype=np.int16),
+        origin=np.array(origins, dtype=object),
+        destination=np.array(destinations, dtype=object),
+        out_date=np.array(out_dates, dtype=object),
+        return_date=np.array(return_dates, dtype=object),
+    )
+
+
+def _grouped_argmin(route: np.ndarray, price: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (routes present, index of their cheapest offer); ties keep the first offer."""
+    order = np.lexsort((price, route))
+    present, first = np.unique(route[order], return_index=True)
+    return present, order[first]
+
+
+def cheapest_in_columns(columns: OfferColumns) -> Dict[Hashable, FlightData]:
+    """Return the cheapest offer of every route in ``columns`` that has offers.
+
+    FlightData is built for the winners alone, straight from the columns.
+    """
+    present, winners = _grouped_argmin(columns.route, columns.price)
+    return {
+        columns.routes[r]: FlightData(
+            price=float(columns.price[i]),
+            origin_city="",  # To be populated later
+            origin_airport=columns.origin[i],
+            destination_city="",  # To be populated later
+            destination_airport=columns.destination[i],
+            out_date=columns.out_date[i],
+            return_date=columns.return_date[i],
+            stops=bool(columns.stops[i]),
+        )
+        for r, i in zip(present.tolist(), winners.tolist())
+    }
+
+
+def cheapest_per_route(offers_by_route: Mapping[Hashable, List[Dict[str, Any]]]) -> Dict[Hashable, FlightData]:
+    """Return the cheapest offer of every route that has offers."""
+    return cheapest_in_columns(flatten_offers(offers_by_route))
@@ -1,4 +1,5 @@
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
@@ -9,44 +10,72 @@ from config import (
     FLIGHT_SEARCH_API_SECRET,
     IATA_ENDPOINT
 )
+from flight_data import decode_json
+from token_manager import AmadeusTokenManager
 
 
 class FlightSearch:
     """Handles flight search operations using the Amadeus API."""
 
-    def __init__(self) -> None:
-        """Initializes the FlightSearch with API credentials and token."""
+    def __init__(
+        self,
+        flight_endpoint: str = FLIGHT_ENDPOINT,
+        token_endpoint: str = TOKEN_ENDPOINT,
+        iata_endpoint: str = IATA_ENDPOINT,
+        pool_size: int = 16,
+        token_manager: Optional[AmadeusTokenManager] = None,
+    ) -> None:
+        """Initializes the FlightSearch with API credentials and token.
+
+        Requests share one keep-alive session, so searches running on
+        several threads reuse up to ``pool_size`` connections.
+        """
         self._api_key: str = FLIGHT_SEARCH_API_KEY
         self._api_secret: str = FLIGHT_SEARCH_API_SECRET
-        self._token: Optional[str] = self._get_new_token()
+        self._flight_endpoint = flight_endpoint
+        self._token_endpoint = token_endpoint
+        self._iata_endpoint = iata_endpoint
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        # The token is cached on disk and refreshed before it expires
+        self._tokens = token_manager or AmadeusTokenManager(
+            token_endpoint, self._api_key, self._api_secret, session=self._session
+        )
 
-    def _get_new_token(self) -> Optional[str]:
-        """Fetches a new API token from the Amadeus token endpoint."""
-        header = {"Content-Type": "application/x-www-form-urlencoded"}
-        body = {
-            "grant_type": "client_credentials",
-            "client_id": self._api_key,
-            "client_secret": self._api_secret,
-        }
+    def close(self) -> None:
+        """Closes the pooled connections."""
+        self._session.close()
+
+    @property
+    def _token(self) -> Optional[str]:
+        """A valid API token, or None if one cannot be obtained."""
         try:
-            response = requests.post(url=TOKEN_ENDPOINT, headers=header, data=body)
-            response.raise_for_status()
-            print("API token obtained successfully.")
-            return response.json().get("access_token")
+            return self._tokens.get_token()
         except requests.exceptions.RequestException as e:
             print(f"Error obtaining API token: {e}")
             return None
 
+    def _get(self, url: str, token: str, params: Dict[str, Any]) -> requests.Response:
+        """GET with the bearer token; on 401 fetch a new token and retry once."""
+        response = self._session.get(url=url, headers={"Authorization": f"Bearer {token}"}, params=params)
+        if response.status_code == 401:
+            self._tokens.invalidate(token)
+            token = self._tokens.refresh(stale=token)
+            response = self._session.get(url=url, headers={"Authorization": f"Bearer {token}"}, params=params)
+        return response
+
     def get_destination_code(self, city_name: str) -> str:
         """Retrieves the IATA code for a given city name."""
-        if not self._token:
+        token = self._token
+        if not token:
             print("Cannot get destination code without an API token.")
             return ""
 
-        headers = {"Authorization": f"Bearer {self._token}"}
         query = {"keyword": city_name, "max": "2", "include": "AIRPORTS"}
         try:
-            response = requests.get(url=IATA_ENDPOINT, headers=headers, params=query)
+            response = self._get(self._iata_endpoint, token, query)
             response.raise_for_status()
             data = response.json().get("data", [])
             return data[0].get("iataCode", "") if data else ""
@@ -64,15 +93,16 @@ class FlightSearch:
         from_time: datetime,
         to_time: datetime,
         is_direct: bool = True,
+        max_offers: int = 5,
     ) -> List[Dict[str, Any]]:
         """
         Searches for flights between two cities within a given date range.
         """
-        if not self._token:
+        token = self._token
+        if not token:
             print("Cannot check flights without an API token.")
             return []
 
-        headers = {"Authorization": f"Bearer {self._token}"}
         query = {
             "originLocationCode": origin_city_code,
             "destinationLocationCode": destination_city_code,
@@ -81,12 +111,12 @@ class FlightSearch:
             "adults": 1,
             "nonStop": "true" if is_direct else "false",
             "currencyCode": "GBP",
-            "max": 5,
+            "max": max_offers,
         }
         try:
-            response = requests.get(url=FLIGHT_ENDPOINT, headers=headers, params=query)
+            response = self._get(self._flight_endpoint, token, query)
             response.raise_for_status()
-            return response.json().get("data", [])
+            return decode_json(response.content).get("data", [])
         except requests.exceptions.RequestException as e:
             print(f"Error checking flights: {e}")
             return []
@@ -0,0 +1,104 @@
+"""
+IATA code lookup that avoids the Amadeus location API where it can.
+
+Cities are first looked up in a bundled dataset (``iata_cities.csv``)
+and then in a persistent cache of earlier API answers, both indexed by
+normalized name ("São Paulo", "sao paulo" and "Sao-Paulo" are the same).
+Only the remaining cities go to the API, concurrently, and their codes
+are added to the cache.
+"""
+import csv
+import json
+import os
+import tempfile
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from config import IATA_CACHE_FILE
+from flight_search import FlightSearch
+
+DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "iata_cities.csv")
+
+
+def normalize_city(name: str) -> str:
+    """Fold accents, case and punctuation: "São Paulo " -> "sao paulo"."""
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in folded).split())
+
+
+def load_dataset(path: str = DATASET_PATH) -> Dict[str, str]:
+    """Read the bundled city,iata,country file into a normalized-name index."""
+    with open(path, newline="", encoding="utf-8") as dataset:
+        return {normalize_city(row["city"]): row["iata"] for row in csv.DictReader(dataset)}
+
+
+class IATAResolver:
+    """Resolve city names to IATA codes from the dataset, the cache, then the API."""
+
+    def __init__(
+        self,
+        flight_search: Optional[FlightSearch] = None,
+        dataset_path: str = DATASET_PATH,
+        cache_path: Optional[str] = IATA_CACHE_FILE,
+        max_workers: int = 4,
+    ) -> None:
+        self.flight_search = flight_search
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self.api_calls = 0
+        self._offline = load_dataset(dataset_path)
+        self._cache: Dict[str, str] = self._load_cache()
+        self._lock = threading.Lock()
+
+    def _load_cache(self) -> Dict[str, str]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, encoding="utf-8") as cache:
+                return json.load(cache)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self) -> None:
+        if not self.cache_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".iata-")
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp:
+            json.dump(self._cache, tmp, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, self.cache_path)
+
+    def lookup(self, city: str) -> Optional[str]:
+        """Return the code from the dataset or the cache, without calling the API."""
+        key = normalize_city(city)
+        return self._offline.get(key) or self._cache.get(key)
+
+    def _fetch(self, key: str, city: str) -> str:
+        assert self.flight_search is not None
+        code = self.flight_search.get_destination_code(city)
+        with self._lock:
+            self.api_calls += 1
+            if code:
+                self._cache[key] = code
+        return code
+
+    def resolve(self, city: str) -> str:
+        """Resolve a single city."""
+        return self.resolve_many([city])[city]
+
+    def resolve_many(self, cities: Iterable[str]) -> Dict[str, str]:
+        """Map each city to its code; unknown cities are fetched once each, concurrently.
+
+        Cities the API cannot resolve map to "".
+        """
+        keys = {city: normalize_city(city) for city in cities}
+        codes = {key: self._offline.get(key) or self._cache.get(key, "") for key in set(keys.values())}
+        missing = {key: city for city, key in keys.items() if not codes[key]}
+        if missing and self.flight_search is not None:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                codes.update(zip(missing, executor.map(self._fetch, missing, missing.values())))
+            self._save_cache()
+        return {city: codes[key] for city, key in keys.items()}
+
@@ -0,0 +1,185 @@
+"""
+Queue all e-mails of a run and deliver them over a few SMTP connections.
+
+Messages are queued first and sent when ``deliver`` is called. Each
+worker thread keeps one logged-in STARTTLS connection open for its whole
+share of the queue and reconnects (retrying the message) when the server
+drops the connection. Other connection failures (unknown host, TLS
+errors) fail the message and the worker moves on to the next one.
+Customers are either put in BCC batches (one message per ``bcc_batch``
+recipients) or sent personalized messages.
+"""
+import queue
+import smtplib
+import socket
+import ssl
+import threading
+import time
+from email.message import EmailMessage
+from typing import List, NamedTuple, Optional
+
+from config import EMAIL_PASSWORD, SMTP_PORT, SMTP_SERVER, TEST_MAIL
+
+# Errors after which the connection is replaced and the message retried
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout)
+
+
+class OutgoingMail(NamedTuple):
+    """One message and its envelope recipients."""
+
+    message: bytes  # serialized once, when queued
+    recipients: List[str]
+
+
+class DeliveryReport(NamedTuple):
+    """Outcome of ``MailDispatcher.deliver``."""
+
+    messages: int
+    recipients: int  # accepted by the server
+    refused: int  # recipients the server rejected in otherwise delivered messages
+    failed: int  # messages not delivered at all
+    reconnects: int
+    seconds: float
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.messages / self.seconds if self.seconds else 0.0
+
+
+class MailDispatcher:
+    """Deliver queued mail over a small pool of persistent SMTP connections."""
+
+    def __init__(
+        self,
+        host: str = SMTP_SERVER,
+        port: int = SMTP_PORT,
+        sender: str = TEST_MAIL,
+        password: Optional[str] = EMAIL_PASSWORD,
+        pool_size: int = 4,
+        use_tls: bool = True,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        mode: str = "bcc",
+        bcc_batch: int = 100,
+        max_retries: int = 3,
+        timeout: float = 30,
+    ) -> None:
+        if mode not in ("bcc", "personal"):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.password = password
+        self.pool_size = pool_size
+        self.use_tls = use_tls
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.mode = mode
+        self.bcc_batch = bcc_batch
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._queue: "queue.Queue[OutgoingMail]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._counts = {"messages": 0, "recipients": 0, "refused": 0, "failed": 0, "reconnects": 0}
+
+    def _build(self, subject: str, body: str, to: str) -> bytes:
+        message = EmailMessage()
+        message["Subject"] = subject
+        message["From"] = self.sender
+        message["To"] = to
+        message.set_content(body)
+        return message.as_bytes()
+
+    def enqueue(self, recipients: List[str], subject: str, body: str) -> int:
+        """Queue one deal for ``recipients`` and return the number of messages queued.
+
+        In "personal" mode ``{email}`` in the body is replaced by the
+        recipient's address.
+        """
+        if self.mode == "personal":
+            for email in recipients:
+                self._queue.put(OutgoingMail(self._build(subject, body.replace("{email}", email), email), [email]))
+            return len(recipients)
+        batches = [recipients[i:i + self.bcc_batch] for i in range(0, len(recipients), self.bcc_batch)]
+        for batch in batches:
+            # Recipients only appear in the envelope, not in the headers
+            self._queue.put(OutgoingMail(self._build(subject, body, self.sender), batch))
+        return len(batches)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            connection.starttls(context=self.ssl_context)
+        if self.password:
+            connection.login(self.sender, self.password)
+        return connection
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                self._counts[name] += delta
+
+    def _worker(self) -> None:
+        connection: Optional[smtplib.SMTP] = None
+        try:
+            while True:
+                try:
+                    mail = self._queue.get_nowait()
+                except queue.Empty:
+                    return
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        if connection is None:
+                            connection = self._connect()
+                        refused = connection.sendmail(self.sender, mail.recipients, mail.message)
+                        self._count(messages=1, recipients=len(mail.recipients) - len(refused), refused=len(refused))
+                        break
+                    except (smtplib.SMTPResponseException, *RECONNECT_ERRORS) as e:
+                        transient = isinstance(e, RECONNECT_ERRORS) or getattr(e, "smtp_code", 0) == 421
+                        if not transient or attempt == self.max_retries:
+                            print(f"Error sending email to {len(mail.recipients)} recipient(s): {e}")
+                            self._count(failed=1)
+                            break
+                        # The server closed (or is closing) the connection: start a new one
+                        self._close(connection)
+                        connection = None
+                        self._count(reconnects=1)
+                        if attempt:
+                            time.sleep(min(2 ** attempt * 0.1, 2))
+                    except smtplib.SMTPException as e:
+                        print(f"Error sending email to {len(mail.recipients)} recipient(s): {e}")
+                        self._count(failed=1)
+                        break
+                    except OSError as e:
+                        # Unknown host, TLS failure, ...: drop the connection and go on
+                        print(f"Error sending email to {len(mail.recipients)} recipient(s): {e}")
+                        self._close(connection)
+                        connection = None
+                        self._count(failed=1)
+                        break
+        finally:
+            self._close(connection)
+
+    @staticmethod
+    def _close(connection: Optional[smtplib.SMTP]) -> None:
+        if connection is None:
+            return
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def deliver(self) -> DeliveryReport:
+        """Send everything queued so far and report what happened."""
+        with self._lock:
+            self._counts = dict.fromkeys(self._counts, 0)
+        start = time.perf_counter()
+        workers = [threading.Thread(target=self._worker) for _ in range(min(self.pool_size, max(1, self.pending)))]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return DeliveryReport(seconds=time.perf_counter() - start, **self._counts)
+
@@ -1,27 +1,35 @@
+import argparse
 from datetime import datetime, timedelta
 from data_manager import DataManager
 from flight_search import FlightSearch
-from flight_data import find_cheapest_flight
+from iata_resolver import IATAResolver
 from notification_manager import NotificationManager
-import time
+from price_history import PriceHistory, route_key
+from search_orchestrator import SearchResult, search_destinations
 
 ORIGIN_CITY_IATA = "LON"
 
 
 def main() -> None:
     """Main function to run the flight deal finder."""
+    parser = argparse.ArgumentParser(description="Flight deal finder")
+    parser.add_argument("--dry-run", action="store_true", help="print sheet changes instead of writing them")
+    args = parser.parse_args()
+
     data_manager = DataManager()
     flight_search = FlightSearch()
     notification_manager = NotificationManager()
 
     sheet_data = data_manager.get_destination_data()
 
-    # Update IATA codes in Google Sheet if they are missing
-    for row in sheet_data:
-        if not row.get("iataCode"):
-            row["iataCode"] = flight_search.get_destination_code(row["city"])
+    # Fill in missing IATA codes: bundled dataset and cache first, API only for the rest
+    missing = [row for row in sheet_data if not row.get("iataCode")]
+    codes = IATAResolver(flight_search).resolve_many(row["city"] for row in missing)
+    for row in missing:
+        row["iataCode"] = codes[row["city"]]
     data_manager.destination_data = sheet_data
-    data_manager.update_destination_codes()
+    # Only rows whose codes changed are written back
+    data_manager.update_destination_codes(dry_run=args.dry_run)
 
     # ==================== Retrieve your customer emails ====================
 
@@ -36,48 +44,52 @@ def main() -> None:
     tomorrow = datetime.now() + timedelta(days=1)
     six_months_from_today = datetime.now() + timedelta(days=180)
 
-    # Search for flights for each destination
-    for destination in sheet_data:
-        iata_code = destination.get("iataCode")
-        if not iata_code:
-            continue
-
-        print(f"Searching for flights to {destination['city']}...")
-        flights = flight_search.check_flights(
-            ORIGIN_CITY_IATA,
-            iata_code,
-            from_time=tomorrow,
-            to_time=six_months_from_today,
-        )
-
-        cheapest_flight = find_cheapest_flight(flights)
-        time.sleep(2)  # To avoid hitting API rate limits
+    # Search every destination concurrently; direct first, indirect when there is none
+    def report(result: SearchResult) -> None:
+        city = result.destination["city"]
+        if result.error is not None:
+            print(f"Search for {city} failed: {result.error}")
+        elif result.flight is None:
+            print(f"No flights found for {city}.")
+        elif not result.direct:
+            print(f"No direct flights to {city}. Cheapest indirect flight price is: {result.flight.price}.")
+        else:
+            print(f"Cheapest direct flight to {city}: GBP {result.flight.price}.")
+
+    results = search_destinations(
+        flight_search,
+        ORIGIN_CITY_IATA,
+        sheet_data,
+        from_time=tomorrow,
+        to_time=six_months_from_today,
+        on_result=report,
+    )
+    flight_search.close()
+
+    # Judge today's fares against earlier days, then add them to the history
+    history = PriceHistory()
+    verdicts = history.judge_and_record(
+        (route_key(ORIGIN_CITY_IATA, result.destination["iataCode"]), result.offers) for result in results
+    )
+    history.close()
+
+    for result in results:
+        cheapest_flight = result.flight
+        destination = result.destination
         if cheapest_flight is None:
-            print(f"No flights found for {destination['city']}.")
             continue
 
-        if cheapest_flight.price is None:
-            print(f"No direct flights to {destination['city']}. Looking for indirect flights...")
-            indirect_flights = flight_search.check_flights(
-                ORIGIN_CITY_IATA,
-                iata_code,
-                from_time=tomorrow,
-                to_time=six_months_from_today,
-                is_direct=False
-                )
-            cheapest_flight = find_cheapest_flight(indirect_flights)
-            if cheapest_flight is None:
-                print(f"No indirect flights found for {destination['city']}.")
-                continue
-            print(f"Cheapest indirect flight price is: {(cheapest_flight.price)}.")
-
-
         # Populate city names from sheet data
         cheapest_flight.origin_city = "London"  # Or fetch dynamically
-        cheapest_flight.destination_city = destination["city"]
 
-        # Send notification if the flight is cheaper than the price in the sheet
-        if cheapest_flight.price < destination.get("lowestPrice", float('inf')):
+        # Alert when the fare is the cheapest in 90 days; with too little
+        # history, when it is cheaper than the price in the sheet
+        is_deal = verdicts[route_key(ORIGIN_CITY_IATA, destination["iataCode"])]
+        if is_deal is None:
+            is_deal = cheapest_flight.price < destination.get("lowestPrice", float('inf'))
+        if not is_deal:
+            continue
+        if result.direct:
             message = f"Low price alert! Only GBP {cheapest_flight.price} to fly direct "\
             f"from {cheapest_flight.origin_airport} to {cheapest_flight.destination_airport}, "\
             f"on {cheapest_flight.out_date} until {cheapest_flight.return_date}."
@@ -89,9 +101,13 @@ def main() -> None:
 
         print(f"Check your email. Lower price flight found to {destination['city']}!")
 
-        notification_manager.send_emails(email_list=customer_email_list, email_body=message)
+        notification_manager.queue_emails(email_list=customer_email_list, email_body=message)
 
         # notification_manager.send_sms(cheapest_flight)
 
+    # All deals go out together over a few persistent SMTP connections
+    if notification_manager.mailer.pending:
+        notification_manager.flush_emails()
+
 if __name__ == "__main__":
     main()
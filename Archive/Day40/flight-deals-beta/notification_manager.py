@@ -1,9 +1,11 @@
-import smtplib
 from typing import List
 
 from config import (
     EMAIL_PASSWORD,
     FROM_TWILIO,
+    MAIL_BCC_BATCH,
+    MAIL_MODE,
+    MAIL_POOL_SIZE,
     SMTP_PORT,
     SMTP_SERVER,
     TEST_MAIL,
@@ -12,11 +14,12 @@ from config import (
     TWILIO_AUTH_TOKEN,
 )
 from flight_data import FlightData
+from mail_dispatcher import DeliveryReport, MailDispatcher
 from twilio.rest import Client
 
 
 class NotificationManager:
-    """Handles sending SMS notifications via Twilio."""
+    """Handles sending SMS notifications via Twilio and deal e-mails to customers."""
 
     def __init__(self) -> None:
         """Initializes the NotificationManager."""
@@ -29,7 +32,11 @@ class NotificationManager:
         self.smtp_port = SMTP_PORT
         self.email = TEST_MAIL
         self.email_password = EMAIL_PASSWORD
-        self.connection = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        # E-mails are queued per deal and delivered together by flush_emails
+        self.mailer = MailDispatcher(
+            self.smtp_server, self.smtp_port, self.email, self.email_password,
+            pool_size=MAIL_POOL_SIZE, mode=MAIL_MODE, bcc_batch=MAIL_BCC_BATCH,
+        )
 
     def send_sms(self, flight: FlightData) -> None:
         """Sends an SMS with the flight deal details."""
@@ -49,25 +56,26 @@ class NotificationManager:
         except Exception as e:
             print(f"Error sending SMS: {e}")
 
-    def send_emails(self, email_list: List[str], email_body: str) -> None:
-        """Sends an email to a list of recipients."""
+    def queue_emails(self, email_list: List[str], email_body: str) -> None:
+        """Queues a deal e-mail for a list of recipients; nothing is sent yet."""
         if not email_list:
             print("No customer emails to send.")
             return
+        self.mailer.enqueue(email_list, "New Low Price Flight!", email_body)
 
-        try:
-            with smtplib.SMTP(SMTP_SERVER, port=SMTP_PORT) as connection:
-                connection.starttls()
-                connection.login(user=TEST_MAIL, password=EMAIL_PASSWORD)
-                for email in email_list:
-                    message = f"Subject:New Low Price Flight!\n\n{email_body}".encode(
-                        "utf-8"
-                    )
-                    connection.sendmail(
-                        from_addr=TEST_MAIL, to_addrs=email, msg=message
-                    )
-            print("Email sent successfully!")
-        except smtplib.SMTPException as e:
-            print(f"Error sending email: {e}")
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
+    def flush_emails(self) -> DeliveryReport:
+        """Sends every queued e-mail over the connection pool."""
+        report = self.mailer.deliver()
+        print(
+            f"Sent {report.messages} email(s) to {report.recipients} recipient(s) "
+            f"({report.refused} refused) "
+            f"in {report.seconds:.1f}s ({report.messages_per_second:.0f}/s), "
+            f"{report.failed} failed, {report.reconnects} reconnect(s)."
+        )
+        return report
+
+    def send_emails(self, email_list: List[str], email_body: str) -> None:
+        """Sends an email to a list of recipients."""
+        self.queue_emails(email_list, email_body)
+        if self.mailer.pending:
+            self.flush_emails()
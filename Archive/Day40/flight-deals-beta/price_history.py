@@ -0,0 +1,148 @@
+"""
+Fare history per route and deal detection against it.
+
+Every observed offer is stored in SQLite (indexed by route + observation
+day and route + departure date). Alongside, a small ``daily_low`` table
+keeps the lowest fare seen per route and day; it is updated on every
+insert, so deal checks read at most one row per day of the window
+instead of scanning all observations. A fare is a deal when it is below
+every daily low of the last 90 days ("cheapest in 90 days").
+
+Only the offers a search returns are stored: ``FLIGHT_SEARCH_MAX_OFFERS``
+(5 by default) per direct or indirect search. Amadeus returns the
+cheapest offers first, so the daily lows and the deal check are exact,
+but observation counts describe those top offers rather than every fare
+on the route.
+"""
+import sqlite3
+from datetime import date
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import PRICE_HISTORY_DB
+from flight_data import OfferColumns
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fares (
+    route TEXT NOT NULL,
+    observed_day INTEGER NOT NULL,
+    out_date TEXT NOT NULL,
+    return_date TEXT NOT NULL,
+    price REAL NOT NULL,
+    stops INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fares_route_day ON fares (route, observed_day);
+CREATE INDEX IF NOT EXISTS fares_route_departure ON fares (route, out_date);
+CREATE TABLE IF NOT EXISTS daily_low (
+    route TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    low REAL NOT NULL,
+    observations INTEGER NOT NULL,
+    PRIMARY KEY (route, day)
+) WITHOUT ROWID;
+"""
+
+# (route, out_date, return_date, price, stops)
+Fare = Tuple[str, str, str, float, int]
+
+
+def route_key(origin: str, destination: str) -> str:
+    """Route identifier used in the store, e.g. "LON-PAR"."""
+    return f"{origin}-{destination}"
+
+
+def offer_fares(columns: OfferColumns, route: Optional[str] = None) -> Iterator[Fare]:
+    """Fares of flattened offers (see ``flight_data.flatten_offers``).
+
+    Each fare is named by its route key in ``columns``, or by ``route``
+    when all of them belong to one route.
+    """
+    names = [route] * len(columns.price) if route is not None else [columns.routes[r] for r in columns.route.tolist()]
+    return zip(names, columns.out_date, columns.return_date, columns.price.tolist(), columns.stops.tolist())
+
+
+class PriceHistory:
+    """SQLite store of observed fares with incrementally maintained daily lows."""
+
+    def __init__(self, path: str = PRICE_HISTORY_DB, window_days: int = 90, min_history_days: int = 7) -> None:
+        self.window_days = window_days
+        self.min_history_days = min_history_days
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+    def record(self, fares: Iterable[Fare], observed: Optional[date] = None) -> int:
+        """Store fares observed on ``observed`` (today by default) and update the daily lows."""
+        day = (observed or date.today()).toordinal()
+        rows = [(route, day, out_date, return_date, float(price), int(stops)) for route, out_date, return_date, price, stops in fares]
+        if not rows:
+            return 0
+        lows: Dict[str, Tuple[float, int]] = {}
+        for route, _, _, _, price, _ in rows:
+            low, count = lows.get(route, (price, 0))
+            lows[route] = (min(low, price), count + 1)
+        with self._db:
+            self._db.executemany("INSERT INTO fares VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.executemany(
+                "INSERT INTO daily_low VALUES (?, ?, ?, ?) ON CONFLICT (route, day) DO UPDATE SET "
+                "low = MIN(low, excluded.low), observations = observations + excluded.observations",
+                [(route, day, low, count) for route, (low, count) in lows.items()],
+            )
+        return len(rows)
+
+    def record_offers(self, columns: OfferColumns, observed: Optional[date] = None) -> int:
+        """Store flattened offers; their route keys name the routes."""
+        return self.record(offer_fares(columns), observed)
+
+    def judge_and_record(
+        self, offers_by_route: Iterable[Tuple[str, OfferColumns]], observed: Optional[date] = None
+    ) -> Dict[str, Optional[bool]]:
+        """Judge each route's cheapest offer with ``is_deal``, then store all offers.
+
+        Every route is judged against earlier days only. A route listed
+        more than once (two sheet rows with the same IATA code) is judged
+        and stored once. Routes without offers get no verdict.
+        """
+        routes: Dict[str, OfferColumns] = {}
+        for route, columns in offers_by_route:
+            routes.setdefault(route, columns)
+        verdicts = {
+            route: self.is_deal(route, float(columns.price.min()), observed)
+            for route, columns in routes.items()
+            if len(columns.price)
+        }
+        self.record(chain.from_iterable(offer_fares(columns, route) for route, columns in routes.items()), observed)
+        return verdicts
+
+    def daily_lows(self, route: str, until: Optional[date] = None) -> np.ndarray:
+        """Daily lows of the ``window_days`` days before ``until`` (today), oldest first."""
+        end = (until or date.today()).toordinal()
+        rows = self._db.execute(
+            "SELECT low FROM daily_low WHERE route = ? AND day >= ? AND day < ? ORDER BY day",
+            (route, end - self.window_days, end),
+        ).fetchall()
+        return np.array([row[0] for row in rows], dtype=np.float64)
+
+    def is_deal(self, route: str, price: float, until: Optional[date] = None) -> Optional[bool]:
+        """True if ``price`` beats every daily low of the window.
+
+        None when there are fewer than ``min_history_days`` days of history,
+        so callers can fall back to a fixed threshold.
+        """
+        lows = self.daily_lows(route, until)
+        if len(lows) < self.min_history_days:
+            return None
+        return bool(price < lows.min())
+
+    def fares_departing(self, route: str, first: date, last: date) -> List[Tuple[str, float, int]]:
+        """All observations for departures between ``first`` and ``last`` (out_date, price, stops)."""
+        return self._db.execute(
+            "SELECT out_date, price, stops FROM fares WHERE route = ? AND out_date BETWEEN ? AND ? ORDER BY out_date",
+            (route, first.isoformat(), last.isoformat()),
+        ).fetchall()
+
@@ -0,0 +1,181 @@
+"""
+Concurrent flight searches under a shared rate limit.
+
+Replaces the sequential loop with a fixed ``time.sleep(2)`` between
+calls: every destination is searched at once, requests are spaced by a
+token bucket, and results are yielded as soon as each search finishes.
+A search that fails (bad response body, unexpected offer format) gives a
+result with ``error`` set instead of stopping the other searches.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from config import (
+    FLIGHT_SEARCH_BURST,
+    FLIGHT_SEARCH_MAX_CONCURRENCY,
+    FLIGHT_SEARCH_MAX_OFFERS,
+    FLIGHT_SEARCH_RATE_PER_SECOND,
+)
+from flight_data import FlightData, OfferColumns, cheapest_in_columns, flatten_offers
+from flight_search import FlightSearch
+
+
+class AsyncTokenBucket:
+    """Token bucket for asyncio tasks: ``rate`` tokens per second, up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float = 1, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it (first come, first served)."""
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class SearchResult(NamedTuple):
+    """Cheapest flight found for one destination row."""
+
+    destination: Dict[str, Any]
+    flight: Optional[FlightData]
+    direct: bool
+    requests: int
+    offers: OfferColumns  # every offer returned; route True is direct, False indirect
+    error: Optional[str] = None  # set when the search failed; flight is None and offers empty
+
+
+class SearchOrchestrator:
+    """Run direct and indirect searches for many destinations concurrently.
+
+    ``FlightSearch`` is blocking, so each call runs on a small thread pool;
+    the token bucket decides when a call may start. By default the indirect
+    search is only made for destinations without direct flights, set
+    ``always_indirect`` to compare both variants for every destination.
+    """
+
+    def __init__(
+        self,
+        flight_search: FlightSearch,
+        origin: str,
+        rate: float = FLIGHT_SEARCH_RATE_PER_SECOND,
+        burst: int = FLIGHT_SEARCH_BURST,
+        max_concurrency: int = FLIGHT_SEARCH_MAX_CONCURRENCY,
+        always_indirect: bool = False,
+        max_offers: int = FLIGHT_SEARCH_MAX_OFFERS,
+    ) -> None:
+        self.flight_search = flight_search
+        self.origin = origin
+        self.always_indirect = always_indirect
+        self.max_offers = max_offers
+        self._bucket = AsyncTokenBucket(rate, burst)
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def close(self) -> None:
+        """Stop the worker threads."""
+        self._executor.shutdown()
+
+    async def _check(self, code: str, from_time: datetime, to_time: datetime, is_direct: bool) -> List[Dict[str, Any]]:
+        # Take the token only when a worker is free, so queued calls cannot
+        # fire together once threads become available
+        async with self._slots:
+            await self._bucket.acquire()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor,
+                self.flight_search.check_flights,
+                self.origin, code, from_time, to_time, is_direct, self.max_offers,
+            )
+
+    async def search(self, destination: Dict[str, Any], from_time: datetime, to_time: datetime) -> SearchResult:
+        """Find the cheapest flight to one destination row.
+
+        Never raises: a failure is reported in the result's ``error``.
+        """
+        code = destination["iataCode"]
+        requests = 0
+
+        async def check(is_direct: bool) -> List[Dict[str, Any]]:
+            nonlocal requests
+            requests += 1
+            return await self._check(code, from_time, to_time, is_direct)
+
+        try:
+            if self.always_indirect:
+                direct_offers, indirect_offers = await asyncio.gather(check(True), check(False))
+            else:
+                direct_offers = await check(True)
+                indirect_offers = await check(False) if not direct_offers else []
+            offers = flatten_offers({True: direct_offers, False: indirect_offers})
+        except Exception as e:
+            print(f"Error searching flights to {code}: {e!r}")
+            return SearchResult(destination, None, False, requests, flatten_offers({}), error=repr(e))
+
+        cheapest = cheapest_in_columns(offers)
+        flight = cheapest.get(True)
+        direct = True
+        indirect = cheapest.get(False)
+        if indirect is not None and (flight is None or indirect.price < flight.price):
+            flight, direct = indirect, False
+        if flight is not None:
+            flight.destination_city = destination["city"]
+        return SearchResult(destination, flight, direct, requests, offers)
+
+    async def iter_results(
+        self, destinations: Iterable[Dict[str, Any]], from_time: datetime, to_time: datetime
+    ) -> AsyncIterator[SearchResult]:
+        """Search every row with an IATA code and yield results in completion order."""
+        tasks = [
+            asyncio.ensure_future(self.search(destination, from_time, to_time))
+            for destination in destinations
+            if destination.get("iataCode")
+        ]
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+
+    async def search_all(
+        self, destinations: Iterable[Dict[str, Any]], from_time: datetime, to_time: datetime
+    ) -> List[SearchResult]:
+        """Collect the results of ``iter_results``."""
+        return [result async for result in self.iter_results(destinations, from_time, to_time)]
+
+
+def search_destinations(
+    flight_search: FlightSearch,
+    origin: str,
+    destinations: Iterable[Dict[str, Any]],
+    from_time: datetime,
+    to_time: datetime,
+    on_result: Optional[Callable[[SearchResult], None]] = None,
+    **options: Any,
+) -> List[SearchResult]:
+    """Blocking entry point: run all searches and call ``on_result`` as each finishes."""
+
+    async def run() -> List[SearchResult]:
+        orchestrator = SearchOrchestrator(flight_search, origin, **options)
+        results = []
+        try:
+            async for result in orchestrator.iter_results(destinations, from_time, to_time):
+                if on_result is not None:
+                    on_result(result)
+                results.append(result)
+        finally:
+            orchestrator.close()
+        return results
+
+    return asyncio.run(run())
+
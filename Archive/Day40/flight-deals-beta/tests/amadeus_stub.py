@@ -0,0 +1,174 @@
+"""
+Local stand-in for the Amadeus API, used by the tests.
+
+Serves the token, location and flight-offer endpoints with a fixed
+latency, rejects expired tokens with 401 and answers 429 when more
+requests arrive per second than the configured limit, like the real
+test environment. Destinations listed in ``broken`` get a fixed raw
+body instead of offers.
+"""
+import json
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class StubStats:
+    """Counters kept by the stub server."""
+
+    token_requests: int = 0
+    flight_requests: int = 0
+    location_requests: int = 0
+    rate_limited: int = 0
+    recent: Deque[float] = field(default_factory=deque)
+
+
+def _seed(*parts: str) -> int:
+    return zlib.crc32("|".join(parts).encode())
+
+
+def fake_offers(origin: str, destination: str, departure: str, non_stop: bool, count: int) -> List[Dict[str, Any]]:
+    """Build deterministic flight offers in the Amadeus response format.
+
+    About a quarter of the destinations have no direct flights.
+    """
+    seed = _seed(origin, destination)
+    if non_stop and seed % 4 == 0:
+        return []
+    start = date.fromisoformat(departure)
+    offers = []
+    for i in range(count):
+        value = _seed(origin, destination, str(non_stop), str(i))
+        out_date = start + timedelta(days=value % 150)
+        back_date = out_date + timedelta(days=7 + value % 14)
+        stops = 0 if non_stop else 1 + value % 2
+        outbound = [
+            {
+                "departure": {"iataCode": origin if leg == 0 else f"X{leg}X", "at": f"{out_date}T08:00:00"},
+                "arrival": {"iataCode": destination if leg == stops else f"X{leg + 1}X", "at": f"{out_date}T12:00:00"},
+            }
+            for leg in range(stops + 1)
+        ]
+        inbound = [{
+            "departure": {"iataCode": destination, "at": f"{back_date}T14:00:00"},
+            "arrival": {"iataCode": origin, "at": f"{back_date}T18:00:00"},
+        }]
+        offers.append({
+            "type": "flight-offer",
+            "id": str(i + 1),
+            "itineraries": [{"segments": outbound}, {"segments": inbound}],
+            "price": {"currency": "GBP", "grandTotal": f"{40 + value % 900}.{value % 100:02d}"},
+        })
+    return offers
+
+
+def start_amadeus_stub(
+    latency: float = 0.8,
+    rate_limit: float = 10.0,
+    token_lifetime: int = 1799,
+    broken: Optional[Dict[str, bytes]] = None,
+) -> Tuple[ThreadingHTTPServer, str, StubStats]:
+    """Start the stub on a free port and return (server, base URL, stats).
+
+    Endpoints: ``/v1/security/oauth2/token``,
+    ``/v1/reference-data/locations/cities`` and ``/v2/shopping/flight-offers``.
+    """
+    stats = StubStats()
+    broken = {} if broken is None else broken
+    lock = threading.Lock()
+    issued: Dict[str, float] = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def _reply(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _over_limit(self) -> bool:
+            now = time.monotonic()
+            with lock:
+                while stats.recent and stats.recent[0] <= now - 1:
+                    stats.recent.popleft()
+                if len(stats.recent) >= rate_limit:
+                    stats.rate_limited += 1
+                    return True
+                stats.recent.append(now)
+            return False
+
+        def do_POST(self) -> None:  # noqa: N802
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with lock:
+                stats.token_requests += 1
+                token = f"token-{len(issued) + 1}"
+                issued[token] = time.time() + token_lifetime
+            time.sleep(latency / 4)
+            self._reply(200, {"access_token": token, "token_type": "Bearer", "expires_in": token_lifetime})
+
+        def do_GET(self) -> None:  # noqa: N802
+            url = urlparse(self.path)
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+            if issued.get(token, 0) <= time.time():
+                self._reply(401, {"errors": [{"title": "Invalid access token"}]})
+                return
+            if self._over_limit():
+                self._reply(429, {"errors": [{"title": "Too many requests"}]})
+                return
+            time.sleep(latency)
+            if url.path.endswith("/flight-offers"):
+                with lock:
+                    stats.flight_requests += 1
+                body = broken.get(query["destinationLocationCode"])
+                if body is not None:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                self._reply(200, {"data": fake_offers(
+                    query["originLocationCode"],
+                    query["destinationLocationCode"],
+                    query["departureDate"],
+                    query.get("nonStop") == "true",
+                    int(query.get("max", 5)),
+                )})
+            else:
+                with lock:
+                    stats.location_requests += 1
+                keyword = query.get("keyword", "")
+                code = "".join(ch for ch in keyword.upper() if ch.isalpha())[:3].ljust(3, "X")
+                self._reply(200, {"data": [{"name": keyword.upper(), "iataCode": code}]})
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", stats
+
+
+class AmadeusEndpoints:
+    """A running stub and the endpoint URLs the clients take."""
+
+    def __init__(self, latency: float = 0.01, rate_limit: float = 10_000, token_lifetime: int = 1799) -> None:
+        # Filled in by tests: destination code -> raw flight-offers body
+        self.broken: Dict[str, bytes] = {}
+        self.server, self.base_url, self.stats = start_amadeus_stub(latency, rate_limit, token_lifetime, self.broken)
+        self.token_endpoint = f"{self.base_url}/v1/security/oauth2/token"
+        self.iata_endpoint = f"{self.base_url}/v1/reference-data/locations/cities"
+        self.flight_endpoint = f"{self.base_url}/v2/shopping/flight-offers"
@@ -0,0 +1,12 @@
+from typing import Iterator
+
+import pytest
+
+from amadeus_stub import AmadeusEndpoints
+
+
+@pytest.fixture
+def amadeus() -> Iterator[AmadeusEndpoints]:
+    endpoints = AmadeusEndpoints()
+    yield endpoints
+    endpoints.server.shutdown()
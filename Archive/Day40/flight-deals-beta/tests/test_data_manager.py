@@ -0,0 +1,130 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Set
+
+import pytest
+
+from data_manager import DataManager, RowChange
+
+
+class SheetyPricesStub:
+    """Local Sheety stand-in for the prices sheet.
+
+    The first PUT for every row is answered with 503; rows in ``broken``
+    always fail.
+    """
+
+    def __init__(self, rows: int) -> None:
+        self.sheet: Dict[int, Dict[str, Any]] = {
+            i: {"city": f"City {i}", "iataCode": f"X{i % 100:02d}", "lowestPrice": 100 + i, "id": i}
+            for i in range(2, rows + 2)
+        }
+        self.puts: List[Dict[str, Any]] = []
+        self.rejected = 0
+        self.broken: Set[int] = set()
+        self.ports: Set[int] = set()
+        failed_once: Set[int] = set()
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def _reply(self, status: int, payload: Dict[str, Any]) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:  # noqa: N802
+                with lock:
+                    rows = [dict(row) for row in stub.sheet.values()]
+                self._reply(200, {"prices": rows})
+
+            def do_PUT(self) -> None:  # noqa: N802
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                row_id = int(self.path.rsplit("/", 1)[1])
+                with lock:
+                    stub.ports.add(self.client_address[1])
+                    if row_id in stub.broken or row_id not in failed_once:
+                        failed_once.add(row_id)
+                        stub.rejected += 1
+                        status = 503
+                    else:
+                        stub.puts.append({"id": row_id, **body["price"]})
+                        stub.sheet[row_id].update(body["price"])
+                        status = 200
+                if status == 503:
+                    self._reply(503, {"errors": [{"detail": "Service unavailable"}]})
+                else:
+                    self._reply(200, {"price": stub.sheet[row_id]})
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/prices"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def sheety() -> Iterator[SheetyPricesStub]:
+    stub = SheetyPricesStub(rows=1000)
+    yield stub
+    stub.server.shutdown()
+
+
+@pytest.fixture
+def data_manager(sheety: SheetyPricesStub) -> Iterator[DataManager]:
+    manager = DataManager(endpoint=sheety.endpoint, retries=2)
+    yield manager
+    manager.close()
+
+
+def edit_every_200th_row(data_manager: DataManager) -> List[int]:
+    data = data_manager.get_destination_data()
+    edited = data[::200]
+    for row in edited:
+        row["iataCode"] = "NEW"
+    return [row["id"] for row in edited]
+
+
+def test_dry_run_prints_the_diff_and_sends_nothing(sheety: SheetyPricesStub, data_manager: DataManager, capsys) -> None:
+    edited = edit_every_200th_row(data_manager)
+    preview = data_manager.update_destination_codes(dry_run=True)
+    assert preview == [RowChange(row_id, f"City {row_id}", {"iataCode": (f"X{row_id % 100:02d}", "NEW")}) for row_id in edited]
+    assert sheety.puts == [] and sheety.rejected == 0
+    assert "Row 2 (City 2): iataCode: 'X02' -> 'NEW'" in capsys.readouterr().out
+
+
+def test_only_changed_fields_of_changed_rows_are_written(sheety: SheetyPricesStub, data_manager: DataManager) -> None:
+    edited = edit_every_200th_row(data_manager)
+    written = data_manager.update_destination_codes()
+    assert [change.row_id for change in written] == edited
+    # Each row was rejected once with 503 and retried
+    assert sheety.rejected == 5
+    assert sorted(sheety.puts, key=lambda put: put["id"]) == [{"id": row_id, "iataCode": "NEW"} for row_id in edited]
+    assert len(sheety.ports) <= data_manager.max_workers
+
+    # Nothing is left to write, and the sheet matches
+    assert data_manager.changed_rows() == []
+    assert data_manager.update_destination_codes() == []
+    assert len(sheety.puts) == 5
+    assert [sheety.sheet[row_id]["iataCode"] for row_id in edited] == ["NEW"] * 5
+
+
+def test_failed_rows_are_written_on_the_next_call(sheety: SheetyPricesStub, data_manager: DataManager) -> None:
+    edited = edit_every_200th_row(data_manager)
+    sheety.broken = {edited[0]}
+    written = data_manager.update_destination_codes()
+    assert [change.row_id for change in written] == edited[1:]
+    assert [change.row_id for change in data_manager.changed_rows()] == [edited[0]]
+
+    sheety.broken = set()
+    assert [change.row_id for change in data_manager.update_destination_codes()] == [edited[0]]
+    assert data_manager.changed_rows() == []
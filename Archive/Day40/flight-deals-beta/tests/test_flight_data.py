@@ -0,0 +1,87 @@
+import json
+from typing import Any, Dict, List
+
+import numpy as np
+
+from amadeus_stub import fake_offers
+from flight_data import (
+    FlightData,
+    cheapest_in_columns,
+    cheapest_per_route,
+    decode_json,
+    find_cheapest_flight,
+    flatten_offers,
+)
+from price_history import offer_fares
+
+
+def offer(price: str, out_date: str = "2030-01-10", stops: int = 0) -> Dict[str, Any]:
+    outbound = [
+        {"departure": {"iataCode": "LON" if leg == 0 else f"S{leg}", "at": f"{out_date}T08:00:00"},
+         "arrival": {"iataCode": "PAR" if leg == stops else f"S{leg + 1}", "at": f"{out_date}T12:00:00"}}
+        for leg in range(stops + 1)
+    ]
+    inbound = [{"departure": {"iataCode": "PAR", "at": "2030-01-17T14:00:00"},
+                "arrival": {"iataCode": "LON", "at": "2030-01-17T18:00:00"}}]
+    return {"itineraries": [{"segments": outbound}, {"segments": inbound}], "price": {"grandTotal": price}}
+
+
+def as_tuple(flight: FlightData) -> tuple:
+    return (flight.price, flight.origin_airport, flight.destination_airport, flight.out_date, flight.return_date, flight.stops)
+
+
+def test_grouped_selection_matches_the_loop() -> None:
+    bodies = {
+        i: json.dumps({"data": fake_offers("LON", f"D{i:02d}", "2030-01-01", i % 2 == 0, 250)}).encode()
+        for i in range(60)
+    }
+    decoded = {i: decode_json(body)["data"] for i, body in bodies.items()}
+    assert decoded == {i: json.loads(body)["data"] for i, body in bodies.items()}
+
+    cheapest = cheapest_per_route(decoded)
+    expected = {i: find_cheapest_flight(data) for i, data in decoded.items()}
+    # Routes without offers (no direct flights) are left out
+    assert set(cheapest) == {i for i, flight in expected.items() if flight is not None}
+    assert len(cheapest) < len(decoded)
+    for i, flight in cheapest.items():
+        assert as_tuple(flight) == as_tuple(expected[i])
+
+
+def test_columns_hold_every_offer_in_order() -> None:
+    columns = flatten_offers({"direct": [offer("120.50"), offer("99.00", "2030-02-01")], "none": [], "indirect": [offer("80", stops=2)]})
+    assert columns.routes == ["direct", "none", "indirect"]
+    assert columns.route.tolist() == [0, 0, 2]
+    assert columns.price.tolist() == [120.5, 99.0, 80.0]
+    assert columns.stops.tolist() == [0, 0, 2]
+    assert columns.destination.tolist() == ["PAR"] * 3
+    assert columns.out_date.tolist() == ["2030-01-10", "2030-02-01", "2030-01-10"]
+    assert columns.return_date.tolist() == ["2030-01-17"] * 3
+
+
+def test_winners_and_history_rows_come_from_the_same_columns() -> None:
+    columns = flatten_offers({True: [offer("120.50"), offer("99.00", "2030-02-01")], False: [offer("80", stops=2)]})
+    cheapest = cheapest_in_columns(columns)
+    assert as_tuple(cheapest[True]) == (99.0, "LON", "PAR", "2030-02-01", "2030-01-17", False)
+    assert as_tuple(cheapest[False]) == (80.0, "LON", "PAR", "2030-01-10", "2030-01-17", True)
+
+    assert list(offer_fares(columns)) == [
+        (True, "2030-01-10", "2030-01-17", 120.5, 0),
+        (True, "2030-02-01", "2030-01-17", 99.0, 0),
+        (False, "2030-01-10", "2030-01-17", 80.0, 2),
+    ]
+    assert {fare[0] for fare in offer_fares(columns, "LON-PAR")} == {"LON-PAR"}
+
+
+def test_ties_keep_the_first_offer() -> None:
+    offers: List[Dict[str, Any]] = [offer("50", "2030-03-01"), offer("50", "2030-01-01"), offer("70")]
+    assert cheapest_per_route({"r": offers})["r"].out_date == "2030-03-01"
+    assert find_cheapest_flight(offers).out_date == "2030-03-01"
+
+
+def test_no_offers_at_all() -> None:
+    assert cheapest_per_route({}) == {}
+    assert cheapest_per_route({"r": []}) == {}
+    columns = flatten_offers({"r": []})
+    assert columns.price.dtype == np.float64 and len(columns.price) == 0
+    assert list(offer_fares(columns, "LON-PAR")) == []
+    assert find_cheapest_flight([]) is None
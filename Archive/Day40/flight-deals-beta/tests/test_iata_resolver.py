@@ -0,0 +1,61 @@
+import json
+from typing import Iterator
+
+import pytest
+
+from amadeus_stub import AmadeusEndpoints
+from flight_search import FlightSearch
+from iata_resolver import IATAResolver, load_dataset, normalize_city
+from token_manager import AmadeusTokenManager
+
+
+@pytest.fixture
+def flight_search(amadeus: AmadeusEndpoints) -> Iterator[FlightSearch]:
+    search = FlightSearch(
+        token_endpoint=amadeus.token_endpoint,
+        iata_endpoint=amadeus.iata_endpoint,
+        token_manager=AmadeusTokenManager(amadeus.token_endpoint, "id", "secret", cache_path=None),
+    )
+    yield search
+    search.close()
+
+
+def test_names_are_normalized() -> None:
+    assert normalize_city("São Paulo ") == normalize_city("SAO-PAULO") == "sao paulo"
+    assert load_dataset()["new york city"] == "NYC"
+
+
+def test_only_unknown_cities_reach_the_api(amadeus: AmadeusEndpoints, flight_search: FlightSearch, tmp_path) -> None:
+    known = list(load_dataset())
+    # Spelling variants of known cities, plus a few only the API knows, each entered twice
+    names = [known[i % len(known)].title() if i % 3 else known[i % len(known)].upper() + " " for i in range(5000)]
+    names += [f"Smalltown {i}" for i in range(40)] + [f"smalltown {i}!" for i in range(40)]
+    cache_path = str(tmp_path / "iata_cache.json")
+
+    resolver = IATAResolver(flight_search, cache_path=cache_path)
+    codes = resolver.resolve_many(names)
+    assert resolver.api_calls == amadeus.stats.location_requests == 40
+    assert codes["Sao Paulo"] == "SAO" and codes["Smalltown 7"] == codes["smalltown 7!"] == "SMA"
+    assert all(codes.values())
+    with open(cache_path, encoding="utf-8") as cache:
+        assert len(json.load(cache)) == 40
+
+    # The next run is answered from the dataset and the cache
+    again = IATAResolver(flight_search, cache_path=cache_path)
+    assert again.resolve_many(names) == codes
+    assert again.api_calls == 0 and amadeus.stats.location_requests == 40
+
+
+def test_offline_lookup_never_calls_the_api(tmp_path) -> None:
+    resolver = IATAResolver(None, cache_path=str(tmp_path / "iata_cache.json"))
+    assert resolver.lookup("paris") == "PAR"
+    assert resolver.resolve_many(["Paris", "Nowhere"]) == {"Paris": "PAR", "Nowhere": ""}
+    assert resolver.api_calls == 0
+
+
+def test_unresolved_cities_are_not_cached(amadeus: AmadeusEndpoints, flight_search: FlightSearch, tmp_path) -> None:
+    amadeus.server.shutdown()
+    amadeus.server.server_close()
+    resolver = IATAResolver(flight_search, cache_path=str(tmp_path / "iata_cache.json"))
+    assert resolver.resolve("Smalltown") == ""
+    assert resolver.lookup("Smalltown") is None
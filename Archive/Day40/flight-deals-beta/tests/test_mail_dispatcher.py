@@ -0,0 +1,148 @@
+import logging
+import socket
+import ssl
+import subprocess
+from typing import Iterator, List
+
+import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from mail_dispatcher import MailDispatcher
+
+# aiosmtpd logs a deprecation warning for every AUTH
+logging.getLogger("mail.log").setLevel(logging.ERROR)
+
+EMAILS = [f"customer{i}@example.com" for i in range(10_000)]
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class CountingSMTPHandler:
+    """Counts delivered messages and recipients.
+
+    Every ``drop_every``-th message is answered with 421, and recipients
+    containing "bounce" are refused.
+    """
+
+    def __init__(self) -> None:
+        self.drop_every = 0
+        self.seen = 0
+        self.messages = 0
+        self.recipients = 0
+        self.bodies: List[bytes] = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):  # noqa: N802
+        if "bounce" in address:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):  # noqa: N802
+        self.seen += 1
+        if self.drop_every and self.seen % self.drop_every == 0:
+            return "421 Service not available, closing transmission channel"
+        self.messages += 1
+        self.recipients += len(envelope.rcpt_tos)
+        if len(self.bodies) < 10:
+            self.bodies.append(envelope.content)
+        return "250 OK"
+
+
+@pytest.fixture(scope="module")
+def tls_context(tmp_path_factory) -> ssl.SSLContext:
+    directory = tmp_path_factory.mktemp("cert")
+    cert, key = str(directory / "cert.pem"), str(directory / "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+@pytest.fixture
+def smtp(tls_context: ssl.SSLContext) -> Iterator[Controller]:
+    controller = Controller(
+        CountingSMTPHandler(), hostname="127.0.0.1", port=free_port(),
+        tls_context=tls_context, require_starttls=True,
+        authenticator=lambda server, session, envelope, mechanism, auth_data: AuthResult(
+            success=auth_data.password == b"secret"
+        ),
+        auth_require_tls=True,
+    )
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+def make_dispatcher(smtp: Controller, **options) -> MailDispatcher:
+    client_context = ssl.create_default_context()
+    client_context.check_hostname = False
+    client_context.verify_mode = ssl.CERT_NONE
+    options = {"password": "secret", "ssl_context": client_context, "max_retries": 2, "timeout": 5, **options}
+    return MailDispatcher(smtp.hostname, smtp.port, "me@example.com", **options)
+
+
+def test_bcc_batches_reach_every_recipient_despite_dropped_connections(smtp: Controller) -> None:
+    smtp.handler.drop_every = 10
+    dispatcher = make_dispatcher(smtp, mode="bcc", bcc_batch=100)
+    assert dispatcher.enqueue(EMAILS, "New Low Price Flight!", "Deal") == 100
+    report = dispatcher.deliver()
+
+    assert (report.messages, report.recipients, report.refused, report.failed) == (100, 10_000, 0, 0)
+    assert smtp.handler.recipients == 10_000
+    assert report.reconnects == smtp.handler.seen - smtp.handler.messages > 0
+    assert dispatcher.pending == 0
+    # Recipients are only in the envelope
+    assert b"customer" not in smtp.handler.bodies[0]
+
+
+def test_personal_messages_are_sent_one_per_recipient(smtp: Controller) -> None:
+    dispatcher = make_dispatcher(smtp, mode="personal")
+    assert dispatcher.enqueue(EMAILS[:1000], "New Low Price Flight!", "Hello {email}") == 1000
+    report = dispatcher.deliver()
+    assert (report.messages, report.recipients, report.failed) == (1000, 1000, 0)
+    assert smtp.handler.messages == 1000
+    assert b"Hello customer" in smtp.handler.bodies[0]
+
+
+def test_refused_recipients_are_not_counted_as_delivered(smtp: Controller) -> None:
+    dispatcher = make_dispatcher(smtp, mode="bcc", bcc_batch=50)
+    emails = [f"bounce{i}@example.com" if i % 10 == 0 else email for i, email in enumerate(EMAILS[:200])]
+    dispatcher.enqueue(emails, "New Low Price Flight!", "Deal")
+    report = dispatcher.deliver()
+    assert (report.messages, report.recipients, report.refused, report.failed) == (4, 180, 20, 0)
+    assert smtp.handler.recipients == 180
+
+
+def test_unresolvable_host_fails_every_message_without_stopping(capsys) -> None:
+    dispatcher = MailDispatcher("nonexistent.invalid", 587, "me@example.com", "secret", mode="personal", timeout=5)
+    dispatcher.enqueue(EMAILS[:20], "New Low Price Flight!", "Deal")
+    report = dispatcher.deliver()
+    assert (report.messages, report.failed) == (0, 20)
+    assert dispatcher.pending == 0
+    assert capsys.readouterr().out.count("Error sending email") == 20
+
+
+def test_unreachable_port_is_retried_then_failed() -> None:
+    dispatcher = MailDispatcher("127.0.0.1", free_port(), "me@example.com", "secret", mode="personal", max_retries=1, timeout=5)
+    dispatcher.enqueue(EMAILS[:4], "New Low Price Flight!", "Deal")
+    report = dispatcher.deliver()
+    assert (report.messages, report.failed, report.reconnects) == (0, 4, 4)
+    assert dispatcher.pending == 0
+
+
+def test_tls_failures_are_counted(smtp: Controller) -> None:
+    # The server's self-signed certificate is not trusted by a default context
+    dispatcher = make_dispatcher(smtp, mode="personal", ssl_context=ssl.create_default_context())
+    dispatcher.enqueue(EMAILS[:10], "New Low Price Flight!", "Deal")
+    report = dispatcher.deliver()
+    assert (report.messages, report.failed) == (0, 10)
+    assert dispatcher.pending == 0 and smtp.handler.messages == 0
@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+from typing import Iterator, List
+
+import pytest
+
+from flight_data import flatten_offers
+from price_history import Fare, PriceHistory, route_key
+
+TODAY = date(2030, 6, 1)
+ROUTE = route_key("LON", "PAR")
+
+
+@pytest.fixture
+def history(tmp_path) -> Iterator[PriceHistory]:
+    store = PriceHistory(str(tmp_path / "history.sqlite3"))
+    yield store
+    store.close()
+
+
+def fares(route: str, prices: List[float], out_date: str = "2030-07-01") -> List[Fare]:
+    return [(route, out_date, "2030-07-08", price, 0) for price in prices]
+
+
+def fill_days(history: PriceHistory, lows: List[float], route: str = ROUTE) -> None:
+    """One day per low, ending yesterday; each day also sees two dearer fares."""
+    for offset, low in enumerate(lows):
+        observed = TODAY - timedelta(days=len(lows) - offset)
+        history.record(fares(route, [low + 50, low, low + 20]), observed=observed)
+
+
+def offer(price: float) -> dict:
+    leg = {"departure": {"iataCode": "LON", "at": "2030-07-01T08:00:00"}, "arrival": {"iataCode": "PAR", "at": "2030-07-01T10:00:00"}}
+    back = {"departure": {"iataCode": "PAR", "at": "2030-07-08T14:00:00"}, "arrival": {"iataCode": "LON", "at": "2030-07-08T16:00:00"}}
+    return {"itineraries": [{"segments": [leg]}, {"segments": [back]}], "price": {"grandTotal": str(price)}}
+
+
+def test_daily_lows_are_kept_per_day(history: PriceHistory) -> None:
+    history.record(fares(ROUTE, [300, 250]), observed=TODAY - timedelta(days=1))
+    history.record(fares(ROUTE, [280, 400]), observed=TODAY - timedelta(days=1))
+    history.record(fares(route_key("LON", "NYC"), [100]), observed=TODAY - timedelta(days=1))
+    assert history.daily_lows(ROUTE, until=TODAY).tolist() == [250.0]
+    assert history._db.execute("SELECT observations FROM daily_low WHERE route = ?", (ROUTE,)).fetchone() == (4,)
+
+
+def test_deal_means_cheapest_of_the_window(history: PriceHistory) -> None:
+    new_route = route_key("LON", "NEW")
+    fill_days(history, [200.0] * 6, route=new_route)
+    # Too little history: the caller falls back to the sheet price
+    assert history.is_deal(new_route, 10, until=TODAY) is None
+
+    fill_days(history, [float(p) for p in range(300, 200, -1)])
+    lows = history.daily_lows(ROUTE, until=TODAY)
+    # 100 days recorded, only the last 90 are in the window
+    assert len(lows) == 90 and lows.min() == 201
+    assert history.is_deal(ROUTE, 200.5, until=TODAY) is True
+    assert history.is_deal(ROUTE, 201, until=TODAY) is False
+
+    # The lows match a scan of every observation in the window
+    start = (TODAY - timedelta(days=90)).toordinal()
+    scanned = history._db.execute(
+        "SELECT MIN(price) FROM fares WHERE route = ? AND observed_day >= ? AND observed_day < ?",
+        (ROUTE, start, TODAY.toordinal()),
+    ).fetchone()[0]
+    assert scanned == lows.min()
+
+
+def test_duplicate_routes_are_judged_and_stored_once(history: PriceHistory) -> None:
+    fill_days(history, [200.0] * 10)
+    nyc = route_key("LON", "NYC")
+    # Two sheet rows share PAR; the second one's columns are the same search
+    paris = flatten_offers({True: [offer(150), offer(300)], False: []})
+    verdicts = history.judge_and_record(
+        [(ROUTE, paris), (nyc, flatten_offers({True: [offer(90)]})), (ROUTE, paris),
+         (route_key("LON", "NOF"), flatten_offers({True: [], False: []}))],
+        observed=TODAY,
+    )
+    # Today's fares are judged against earlier days, not against themselves
+    assert verdicts == {ROUTE: True, nyc: None}
+    assert history._db.execute("SELECT COUNT(*) FROM fares WHERE observed_day = ?", (TODAY.toordinal(),)).fetchone() == (3,)
+    assert history.daily_lows(ROUTE, until=TODAY + timedelta(days=1)).tolist()[-1] == 150.0
+
+
+def test_fares_by_departure_date(history: PriceHistory) -> None:
+    for offset in range(30):
+        out_date = (TODAY + timedelta(days=offset)).isoformat()
+        history.record(fares(ROUTE, [100.0 + offset], out_date=out_date), observed=TODAY)
+    found = history.fares_departing(ROUTE, TODAY + timedelta(days=10), TODAY + timedelta(days=12))
+    assert found == [("2030-06-11", 110.0, 0), ("2030-06-12", 111.0, 0), ("2030-06-13", 112.0, 0)]
@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+import pytest
+
+import search_orchestrator
+from amadeus_stub import AmadeusEndpoints, fake_offers
+from flight_data import cheapest_per_route
+from flight_search import FlightSearch
+from search_orchestrator import AsyncTokenBucket, SearchResult, search_destinations
+from token_manager import AmadeusTokenManager
+
+FROM_TIME = datetime(2030, 1, 1)
+TO_TIME = FROM_TIME + timedelta(days=180)
+
+
+@pytest.fixture
+def limited_amadeus() -> Iterator[AmadeusEndpoints]:
+    # Like the test environment: requests take a while and at most 20 per second are allowed
+    endpoints = AmadeusEndpoints(latency=0.1, rate_limit=20)
+    yield endpoints
+    endpoints.server.shutdown()
+
+
+def make_flight_search(amadeus: AmadeusEndpoints) -> FlightSearch:
+    return FlightSearch(
+        flight_endpoint=amadeus.flight_endpoint,
+        token_endpoint=amadeus.token_endpoint,
+        iata_endpoint=amadeus.iata_endpoint,
+        token_manager=AmadeusTokenManager(amadeus.token_endpoint, "id", "secret", cache_path=None),
+    )
+
+
+def rows(count: int) -> List[dict]:
+    return [{"id": i + 2, "city": f"City {i}", "iataCode": f"C{i // 26 % 26 + 65:c}{i % 26 + 65:c}"} for i in range(count)]
+
+
+def cheapest(code: str, direct: bool):
+    offers = fake_offers("LON", code, FROM_TIME.strftime("%Y-%m-%d"), direct, 5)
+    return cheapest_per_route({0: offers}).get(0)
+
+
+def test_bucket_spaces_requests_by_the_rate(monkeypatch) -> None:
+    now = [0.0]
+    taken: List[float] = []
+
+    async def fake_sleep(seconds: float) -> None:
+        now[0] += seconds
+
+    monkeypatch.setattr(search_orchestrator.asyncio, "sleep", fake_sleep)
+
+    async def run() -> None:
+        bucket = AsyncTokenBucket(rate=10, capacity=2, clock=lambda: now[0])
+
+        async def take() -> None:
+            await bucket.acquire()
+            taken.append(now[0])
+
+        await asyncio.gather(*(take() for _ in range(6)))
+
+    asyncio.run(run())
+    # The burst goes out at once, then one token every 0.1 s
+    assert taken == pytest.approx([0, 0, 0.1, 0.2, 0.3, 0.4])
+
+
+def test_all_destinations_searched_within_the_rate_limit(limited_amadeus: AmadeusEndpoints) -> None:
+    flight_search = make_flight_search(limited_amadeus)
+    destinations = rows(40) + [{"id": 99, "city": "Nowhere", "iataCode": ""}]
+    reported: List[SearchResult] = []
+    results = search_destinations(
+        flight_search, "LON", destinations, FROM_TIME, TO_TIME, on_result=reported.append, rate=16, max_concurrency=8
+    )
+    flight_search.close()
+
+    assert reported == results
+    assert sorted(result.destination["id"] for result in results) == [i + 2 for i in range(40)]
+    assert limited_amadeus.stats.rate_limited == 0
+    # Indirect flights are searched only where there is no direct one
+    for result in results:
+        code = result.destination["iataCode"]
+        direct = cheapest(code, True)
+        expected = direct or cheapest(code, False)
+        assert result.direct == (direct is not None)
+        assert result.requests == (1 if direct else 2)
+        assert (result.flight.price, result.flight.out_date) == (expected.price, expected.out_date)
+        assert result.flight.destination_city == result.destination["city"]
+        assert len(result.offers.price) == 5
+    assert sum(result.requests for result in results) == limited_amadeus.stats.flight_requests
+    assert 40 < limited_amadeus.stats.flight_requests < 80
+
+
+def test_always_indirect_compares_both_searches(amadeus: AmadeusEndpoints) -> None:
+    flight_search = make_flight_search(amadeus)
+    results = search_destinations(flight_search, "LON", rows(20), FROM_TIME, TO_TIME, rate=1000, always_indirect=True)
+    flight_search.close()
+
+    assert amadeus.stats.flight_requests == 40
+    for result in results:
+        code = result.destination["iataCode"]
+        candidates = [flight for flight in (cheapest(code, True), cheapest(code, False)) if flight is not None]
+        assert result.requests == 2
+        assert result.flight.price == min(flight.price for flight in candidates)
+        assert result.offers.routes == [True, False]
+
+
+def test_a_broken_route_does_not_stop_the_others(amadeus: AmadeusEndpoints, capsys) -> None:
+    destinations = rows(10)
+    # One body is not JSON, another has an offer without a price
+    amadeus.broken["CAC"] = b"<html>Bad Gateway</html>"
+    amadeus.broken["CAF"] = b'{"data": [{"itineraries": []}]}'
+    flight_search = make_flight_search(amadeus)
+    reported: List[SearchResult] = []
+    results = search_destinations(flight_search, "LON", destinations, FROM_TIME, TO_TIME, on_result=reported.append, rate=1000)
+    flight_search.close()
+
+    assert reported == results and len(results) == 10
+    failed = {result.destination["iataCode"]: result for result in results if result.error is not None}
+    assert set(failed) == {"CAC", "CAF"}
+    for result in failed.values():
+        assert result.flight is None and len(result.offers.price) == 0 and result.requests == 1
+    for result in results:
+        if result.error is None:
+            assert result.flight is not None
+    assert sum(result.requests for result in results) == amadeus.stats.flight_requests
+    assert capsys.readouterr().out.count("Error searching flights") == 2
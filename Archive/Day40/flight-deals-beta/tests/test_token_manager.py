@@ -0,0 +1,99 @@
+import asyncio
+import json
+import os
+import stat
+import threading
+from typing import List
+
+from amadeus_stub import AmadeusEndpoints
+from flight_search import FlightSearch
+from token_manager import AmadeusTokenManager
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_manager(amadeus: AmadeusEndpoints, cache_path, clock=None, client_id: str = "id") -> AmadeusTokenManager:
+    return AmadeusTokenManager(
+        amadeus.token_endpoint, client_id, "secret", str(cache_path),
+        refresh_margin=300, expiry_skew=10, clock=clock or FakeClock(),
+    )
+
+
+def test_concurrent_callers_share_one_refresh(amadeus: AmadeusEndpoints, tmp_path) -> None:
+    manager = make_manager(amadeus, tmp_path / "token.json")
+    tokens: List[str] = []
+    lock = threading.Lock()
+
+    def worker() -> None:
+        token = manager.get_token()
+        with lock:
+            tokens.append(token)
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    async def tasks() -> List[str]:
+        return await asyncio.gather(*(manager.get_token_async() for _ in range(32)))
+
+    tokens += asyncio.run(tasks())
+    assert set(tokens) == {"token-1"}
+    assert amadeus.stats.token_requests == manager.refreshes == 1
+
+
+def test_token_is_refreshed_in_the_background_before_expiry(amadeus: AmadeusEndpoints, tmp_path) -> None:
+    clock = FakeClock()
+    manager = make_manager(amadeus, tmp_path / "token.json", clock)
+    assert manager.get_token() == "token-1"
+
+    # Inside the refresh margin the current token is still handed out
+    clock.now += 1799 - 200
+    assert manager.get_token() == "token-1"
+    manager._background.join()
+    assert manager.get_token() == "token-2"
+    assert amadeus.stats.token_requests == 2
+
+    # Within the skew of expiry callers wait for a new token
+    clock.now += 1799 - 5
+    assert manager.get_token() == "token-3"
+    assert amadeus.stats.token_requests == 3
+
+
+def test_cached_token_survives_a_restart(amadeus: AmadeusEndpoints, tmp_path) -> None:
+    cache_path = tmp_path / "token.json"
+    clock = FakeClock()
+    make_manager(amadeus, cache_path, clock).get_token()
+    assert stat.S_IMODE(os.stat(cache_path).st_mode) == 0o600
+
+    restarted = make_manager(amadeus, cache_path, clock)
+    assert restarted.get_token() == "token-1"
+    assert amadeus.stats.token_requests == 1
+
+    # A token issued to other credentials is not reused
+    assert make_manager(amadeus, cache_path, clock, client_id="other").get_token() == "token-2"
+    with open(cache_path, encoding="utf-8") as cache:
+        assert json.load(cache)["client_id"] == "other"
+
+
+def test_rejected_token_is_replaced_and_the_request_retried(amadeus: AmadeusEndpoints, tmp_path) -> None:
+    # A token the API no longer accepts, although it has not expired locally
+    cache_path = tmp_path / "token.json"
+    with open(cache_path, "w", encoding="utf-8") as cache:
+        json.dump({"client_id": "id", "access_token": "revoked", "expires_at": 2_000_000.0}, cache)
+    manager = make_manager(amadeus, cache_path)
+    flight_search = FlightSearch(
+        token_endpoint=amadeus.token_endpoint, iata_endpoint=amadeus.iata_endpoint, token_manager=manager
+    )
+    assert flight_search.get_destination_code("paris") == "PAR"
+    assert flight_search.get_destination_code("tokyo") == "TOK"
+    flight_search.close()
+    assert amadeus.stats.token_requests == 1
+    assert amadeus.stats.location_requests == 2
@@ -0,0 +1,151 @@
+"""
+Cached, auto-refreshing Amadeus OAuth token.
+
+The token and its expiry are kept in a small JSON file so a new process
+can reuse a token that is still valid. Shortly before expiry the token is
+refreshed in the background while callers keep using the current one;
+only an expired (or missing) token makes callers wait. All callers,
+threads and asyncio tasks alike, share a single refresh request.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+import requests
+
+from config import AMADEUS_TOKEN_CACHE
+
+
+class AmadeusTokenManager:
+    """Hand out a valid access token, refreshing it ahead of expiry.
+
+    ``refresh_margin`` seconds before expiry a background refresh starts;
+    within ``expiry_skew`` seconds of expiry the token is treated as
+    expired and callers block on the refresh.
+    """
+
+    def __init__(
+        self,
+        token_endpoint: str,
+        client_id: str,
+        client_secret: str,
+        cache_path: Optional[str] = AMADEUS_TOKEN_CACHE,
+        refresh_margin: float = 300.0,
+        expiry_skew: float = 10.0,
+        session: Optional[requests.Session] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.token_endpoint = token_endpoint
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.cache_path = cache_path
+        self.refresh_margin = refresh_margin
+        self.expiry_skew = expiry_skew
+        self.session = session or requests.Session()
+        self.clock = clock
+        self.refreshes = 0
+        self._refresh_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._background: Optional[threading.Thread] = None
+        self._token, self._expires_at = self._load()
+
+    def _load(self) -> Tuple[Optional[str], float]:
+        """Read the cached token; ignore it if it belongs to other credentials."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None, 0.0
+        try:
+            with open(self.cache_path, encoding="utf-8") as cache:
+                data = json.load(cache)
+        except (OSError, ValueError):
+            return None, 0.0
+        if data.get("client_id") != self.client_id:
+            return None, 0.0
+        return data.get("access_token"), float(data.get("expires_at", 0))
+
+    def _save(self) -> None:
+        """Write the token atomically, readable only by the current user."""
+        if not self.cache_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".token-")
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp:
+            json.dump({"client_id": self.client_id, "access_token": self._token, "expires_at": self._expires_at}, tmp)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.cache_path)
+
+    def _remaining(self) -> float:
+        return self._expires_at - self.clock()
+
+    def get_token(self) -> str:
+        """Return a valid token, refreshing it first if it has expired."""
+        token = self._token
+        remaining = self._remaining()
+        if token and remaining > self.refresh_margin:
+            return token
+        if token and remaining > self.expiry_skew:
+            self._refresh_in_background(token)
+            return token
+        return self.refresh(stale=token)
+
+    async def get_token_async(self) -> str:
+        """Like ``get_token``, but waits for a refresh without blocking the event loop."""
+        token = self._token
+        remaining = self._remaining()
+        if token and remaining > self.refresh_margin:
+            return token
+        if token and remaining > self.expiry_skew:
+            self._refresh_in_background(token)
+            return token
+        return await asyncio.to_thread(self.refresh, token)
+
+    def refresh(self, stale: Optional[str] = None) -> str:
+        """Replace ``stale`` with a new token; concurrent callers share one request."""
+        with self._refresh_lock:
+            # Someone else (maybe another process) refreshed while we waited
+            if self._token and self._token != stale and self._remaining() > self.expiry_skew:
+                return self._token
+            token, expires_at = self._load()
+            if token and token != stale and expires_at - self.clock() > self.refresh_margin:
+                self._token, self._expires_at = token, expires_at
+                return token
+
+            response = self.session.post(
+                url=self.token_endpoint,
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                data={
+                    "grant_type": "client_credentials",
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                },
+            )
+            response.raise_for_status()
+            data = response.json()
+            self._token = data["access_token"]
+            self._expires_at = self.clock() + float(data.get("expires_in", 1799))
+            self.refreshes += 1
+            self._save()
+            return self._token
+
+    def _refresh_in_background(self, stale: str) -> None:
+        with self._state_lock:
+            if self._background is not None and self._background.is_alive():
+                return
+            self._background = threading.Thread(target=self._background_refresh, args=(stale,), daemon=True)
+            self._background.start()
+
+    def _background_refresh(self, stale: str) -> None:
+        try:
+            self.refresh(stale)
+        except requests.exceptions.RequestException as e:
+            print(f"Background token refresh failed: {e}")
+
+    def invalidate(self, token: str) -> None:
+        """Mark ``token`` as expired, e.g. after the API answered 401."""
+        with self._state_lock:
+            if self._token == token:
+                self._expires_at = 0.0
+
@@ -2,23 +2,74 @@
 API client for exercise tracker application.
 """
 import json
+import logging
+from typing import TYPE_CHECKING, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from config import APICredentials, UserProfile, SheetConfig
 from models import ExerciseAPIResponse, WorkoutEntry
 
+if TYPE_CHECKING:
+    from exercise_cache import ExerciseQueryCache
+    from met_estimator import METEstimator
+
+logger = logging.getLogger(__name__)
+
 
 class NutritionixAPIClient:
     """Client for Nutritionix Exercise API."""
 
     BASE_URL = "https://trackapi.nutritionix.com/v2"
 
-    def __init__(self, credentials: APICredentials) -> None:
-        """Initialize API client with credentials."""
+    def __init__(
+        self,
+        credentials: APICredentials,
+        cache: Optional["ExerciseQueryCache"] = None,
+        estimator: Optional["METEstimator"] = None,
+    ) -> None:
+        """Initialize API client with credentials, an optional query cache and an offline estimator."""
         self.credentials = credentials
+        self.cache = cache
+        self.estimator = estimator
 
     def get_exercises(self, query: str, user_profile: UserProfile) -> ExerciseAPIResponse:
+        """Get exercise data from the cache or the API.
+
+        The offline estimate is only a fallback: it is used when the API call
+        fails or finds no exercises, and is never cached.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(query, user_profile)
+            if cached is not None:
+                return cached
+
+        try:
+            result = self.fetch_exercises(query, user_profile)
+        except (requests.RequestException, ValueError) as e:
+            estimate = self._estimate(query, user_profile)
+            if estimate is None:
+                raise
+            logger.warning("Nutritionix request failed (%s); using the offline estimate", e)
+            return estimate
+        if not result.exercises:
+            estimate = self._estimate(query, user_profile)
+            if estimate is not None:
+                logger.info("Nutritionix found no exercises; using the offline estimate")
+                return estimate
+            return result
+
+        if self.cache is not None:
+            self.cache.put(query, user_profile, result)
+        return result
+
+    def _estimate(self, query: str, user_profile: UserProfile) -> Optional[ExerciseAPIResponse]:
+        if self.estimator is None:
+            return None
+        return self.estimator.estimate(query, user_profile)
+
+    def fetch_exercises(self, query: str, user_profile: UserProfile) -> ExerciseAPIResponse:
         """Get exercise data from Nutritionix API."""
         endpoint = f"{self.BASE_URL}/natural/exercise"
 
@@ -42,50 +93,53 @@ class NutritionixAPIClient:
 
 
 class SheetAPIClient:
-    """Client for Sheet API."""
+    """Client for Sheet API.
+
+    Headers, credentials and connections are set up once and shared by all
+    requests through a pooled, thread-safe session.
+    """
 
-    def __init__(self, config: SheetConfig) -> None:
+    def __init__(self, config: SheetConfig, pool_size: int = 10, timeout: float = 30) -> None:
         """Initialize sheet API client with configuration."""
         self.config = config
+        self.timeout = timeout
+        basic_token = (config.basic_token or "").strip()
 
-    def add_workout(self, workout: WorkoutEntry) -> requests.Response:
-        """Add workout entry to sheet."""
-        basic_token = (self.config.basic_token or "").strip()
-
-        headers = {
+        self.session = requests.Session()
+        self.session.headers.update({
             "Authorization": f"Basic {basic_token}",
             "Content-Type": "application/json",
-        }
+        })
+        self.session.auth = (config.username or "", config.basic_token or "")
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
-        response = requests.post(
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.session.close()
+
+    def add_workout(self, workout: WorkoutEntry) -> requests.Response:
+        """Add workout entry to sheet."""
+        return self.session.post(
             self.config.endpoint,
             json=workout.to_sheet_payload(),
-            auth=(
-                self.config.username or "",
-                self.config.basic_token or "",
-            ),
-            headers=headers,
+            timeout=self.timeout,
         )
 
-        return response
-
     def log_request_details(
         self,
         workout: WorkoutEntry,
         response: requests.Response
     ) -> None:
-        """Log request details for debugging."""
-        basic_token = (self.config.basic_token or "").strip()
-
-        headers = {
-            "Authorization": f"Basic {basic_token}",
-            "Content-Type": "application/json",
-        }
-
-        print("Response:", response.text)
-        print("Endpoint:", self.config.endpoint)
-        print("Headers:", headers)
-        print("Payload:", json.dumps(workout.to_sheet_payload(), indent=2))
-        print("Status:", response.status_code)
-        print("Response headers:", dict(response.headers))
-        print("repr token:", repr(basic_token))
+        """Log request details at DEBUG level (enable with --debug)."""
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        masked = {**self.session.headers, "Authorization": "Basic ***"}
+
+        logger.debug("Response: %s", response.text)
+        logger.debug("Endpoint: %s", self.config.endpoint)
+        logger.debug("Headers: %s", masked)
+        logger.debug("Payload: %s", json.dumps(workout.to_sheet_payload(), indent=2))
+        logger.debug("Status: %s", response.status_code)
+        logger.debug("Response headers: %s", dict(response.headers))
@@ -0,0 +1,133 @@
+"""
+Two-tier cache for Nutritionix exercise queries.
+
+The first tier is an in-process LRU, the second a SQLite table that
+survives restarts. Entries are keyed by the normalized query together
+with the profile fields Nutritionix uses to compute calories, and they
+expire after a TTL.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import astuple
+from typing import Callable, Dict, Optional, Tuple
+
+from config import UserProfile
+from models import ExerciseAPIResponse
+
+DEFAULT_CACHE_PATH = "exercise_cache.sqlite3"
+DEFAULT_TTL = 30 * 24 * 3600.0  # 30 days
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace ("Ran 5K!" -> "ran 5k")."""
+    return " ".join(re.sub(r"[^\w\s.]", " ", query.lower()).split()).strip(" .")
+
+
+def cache_key(query: str, user_profile: UserProfile) -> str:
+    """Build the cache key from the query and every profile field that affects calories."""
+    gender, weight_kg, height_cm, age = astuple(user_profile)
+    return f"{normalize_query(query)}|{gender or ''}|{float(weight_kg):g}|{float(height_cm):g}|{int(age)}"
+
+
+class ExerciseQueryCache:
+    """In-process LRU in front of a SQLite store, both with TTL-based eviction."""
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_CACHE_PATH,
+        capacity: int = 1024,
+        ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Open (or create) the SQLite store and drop expired rows."""
+        self.capacity = capacity
+        self.ttl = ttl
+        self.clock = clock
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[float, ExerciseAPIResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS exercise_cache "
+            "(key TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS exercise_cache_expiry ON exercise_cache (expires_at)")
+        self.evict_expired()
+
+    def get(self, query: str, user_profile: UserProfile) -> Optional[ExerciseAPIResponse]:
+        """Return a cached response, or None on a miss."""
+        key = cache_key(query, user_profile)
+        now = self.clock()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                if item[0] > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return item[1]
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT payload, expires_at FROM exercise_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response = ExerciseAPIResponse.from_dict(json.loads(row[0]))
+            self._remember(key, row[1], response)
+            self.disk_hits += 1
+            return response
+
+    def put(self, query: str, user_profile: UserProfile, response: ExerciseAPIResponse) -> None:
+        """Store a response in both tiers."""
+        key = cache_key(query, user_profile)
+        expires_at = self.clock() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, response)
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO exercise_cache (key, payload, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(response.to_dict()), expires_at),
+                )
+
+    def _remember(self, key: str, expires_at: float, response: ExerciseAPIResponse) -> None:
+        self._memory[key] = (expires_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def evict_expired(self) -> int:
+        """Delete expired rows from both tiers and return how many disk rows were removed."""
+        now = self.clock()
+        with self._lock:
+            for key in [key for key, (expires_at, _) in self._memory.items() if expires_at <= now]:
+                del self._memory[key]
+            with self._db:
+                return self._db.execute("DELETE FROM exercise_cache WHERE expires_at <= ?", (now,)).rowcount
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups answered by either tier."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit counters and hit rate."""
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        self._db.close()
+
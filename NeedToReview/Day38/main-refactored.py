@@ -2,13 +2,19 @@
 """
 Main application for exercise tracker.
 """
+import argparse
+import logging
 import sys
+import time
 from datetime import datetime
 from typing import NoReturn
 
 from api_client import NutritionixAPIClient, SheetAPIClient
 from config import load_config
+from exercise_cache import ExerciseQueryCache
+from met_estimator import METEstimator
 from models import WorkoutEntry
+from sheet_writer import BatchedSheetWriter, import_history
 
 
 def get_user_input() -> str:
@@ -36,15 +42,47 @@ def handle_error(message: str) -> NoReturn:
     sys.exit(1)
 
 
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Exercise tracker")
+    parser.add_argument("--debug", action="store_true", help="log full request details")
+    parser.add_argument("--import", dest="history", metavar="CSV", help="import a workout history file")
+    parser.add_argument("--api-only", action="store_true", help="no offline estimate when Nutritionix fails")
+    return parser.parse_args()
+
+
 def main() -> None:
     """Main application function."""
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(levelname)s: %(message)s",
+    )
     try:
         # Load configuration
         config = load_config()
 
         # Initialize API clients
-        nutritionix_client = NutritionixAPIClient(config.api_credentials)
+        # Answers from Nutritionix are kept in the local cache; if the API
+        # fails or finds nothing, common phrases ("ran 5k") are estimated
+        # offline from MET values
+        exercise_cache = ExerciseQueryCache()
+        nutritionix_client = NutritionixAPIClient(
+            config.api_credentials,
+            cache=exercise_cache,
+            estimator=None if args.api_only else METEstimator(),
+        )
         sheet_client = SheetAPIClient(config.sheet_config)
+        # Rows left in the write-ahead file by an earlier crash are replayed here
+        writer = BatchedSheetWriter(sheet_client)
+
+        if args.history:
+            start = time.perf_counter()
+            imported = import_history(args.history, writer)
+            writer.close()
+            print(f"Imported {imported} rows ({writer.sent} sent, {writer.pending} pending) "
+                  f"in {time.perf_counter() - start:.1f}s")
+            return
 
         # Get user input
         exercise_text = get_user_input()
@@ -54,23 +92,16 @@ def main() -> None:
             api_response = nutritionix_client.get_exercises(exercise_text, config.user_profile)
         except Exception as e:
             handle_error(f"Failed to get exercise data: {e}")
-
-        # Process each exercise
-        for exercise in api_response.exercises:
-            # Create workout entry
-            workout = create_workout_entry(
-                exercise.name,
-                exercise.duration_min,
-                exercise.nf_calories
-            )
-
-            # Add to sheet
-            try:
-                response = sheet_client.add_workout(workout)
-                sheet_client.log_request_details(workout, response)
-            except Exception as e:
-                print(f"Failed to add workout to sheet: {e}")
-                continue
+        logging.debug("Exercise cache: %s", exercise_cache.stats())
+
+        # Queue each exercise, then send them together
+        writer.add_many(
+            create_workout_entry(exercise.name, exercise.duration_min, exercise.nf_calories)
+            for exercise in api_response.exercises
+        )
+        writer.close()
+        if writer.pending:
+            print(f"{writer.pending} workouts could not be added and will be retried next time.")
 
     except ValueError as e:
         handle_error(str(e))
@@ -0,0 +1,256 @@
+"""
+Offline MET-based calorie estimator.
+
+Common exercise phrases ("ran for 30 minutes", "swam 45 min", "ran 1h30",
+"1 hour of yoga and walked 5k") are parsed with compiled regular
+expressions, and calories are computed the same way Nutritionix does:
+``MET x weight_kg x hours``. A distance without a duration ("ran 5k",
+"swam 1500m") is turned into a duration with a typical speed for the
+activity. Repetitions ("ran 2x5k"), numbers without a known unit and
+distances for activities without a speed return None.
+
+The client only uses the estimate when the API fails or finds nothing.
+
+MET values are taken from the Compendium of Physical Activities.
+"""
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from config import UserProfile
+from models import Exercise, ExerciseAPIResponse
+
+# name: MET
+MET_TABLE: Dict[str, float] = {
+    "running": 9.8,
+    "jogging": 7.0,
+    "walking": 3.5,
+    "hiking": 6.0,
+    "cycling": 7.5,
+    "swimming": 6.0,
+    "rowing": 7.0,
+    "yoga": 2.5,
+    "pilates": 3.0,
+    "weight lifting": 5.0,
+    "jumping rope": 11.8,
+    "dancing": 5.0,
+    "elliptical": 5.0,
+    "stair climbing": 8.8,
+    "basketball": 6.5,
+    "soccer": 7.0,
+    "tennis": 7.3,
+    "boxing": 7.8,
+    "aerobics": 7.3,
+    "skating": 7.0,
+    "skiing": 7.0,
+    "climbing": 8.0,
+}
+
+# Words and phrases that name each activity
+_SYNONYMS: Dict[str, str] = {
+    "ran": "running", "run": "running", "running": "running", "runs": "running",
+    "jogged": "jogging", "jog": "jogging", "jogging": "jogging",
+    "walked": "walking", "walk": "walking", "walking": "walking", "walks": "walking",
+    "hiked": "hiking", "hike": "hiking", "hiking": "hiking",
+    "cycled": "cycling", "cycle": "cycling", "cycling": "cycling", "biked": "cycling",
+    "bike": "cycling", "biking": "cycling", "rode": "cycling", "bicycling": "cycling",
+    "swam": "swimming", "swim": "swimming", "swimming": "swimming",
+    "rowed": "rowing", "row": "rowing", "rowing": "rowing",
+    "yoga": "yoga",
+    "pilates": "pilates",
+    "lifted weights": "weight lifting", "lifting": "weight lifting", "weights": "weight lifting",
+    "weight lifting": "weight lifting", "weightlifting": "weight lifting", "lifted": "weight lifting",
+    "jump rope": "jumping rope", "jumped rope": "jumping rope", "skipping": "jumping rope",
+    "skipped rope": "jumping rope", "jumping rope": "jumping rope",
+    "danced": "dancing", "dance": "dancing", "dancing": "dancing",
+    "elliptical": "elliptical",
+    "climbed stairs": "stair climbing", "stairs": "stair climbing", "stair climbing": "stair climbing",
+    "basketball": "basketball",
+    "soccer": "soccer", "football": "soccer",
+    "tennis": "tennis",
+    "boxing": "boxing", "boxed": "boxing",
+    "aerobics": "aerobics",
+    "skated": "skating", "skating": "skating", "skate": "skating",
+    "skied": "skiing", "skiing": "skiing", "ski": "skiing",
+    "climbed": "climbing", "climbing": "climbing", "bouldering": "climbing",
+}
+
+# Typical speed (km/h) used to turn a distance into a duration
+SPEED_KMH: Dict[str, float] = {
+    "running": 9.7,
+    "jogging": 8.0,
+    "walking": 4.8,
+    "hiking": 4.0,
+    "cycling": 20.0,
+    "swimming": 2.5,
+    "rowing": 8.0,
+}
+
+# unit word: minutes per unit
+_TIME_UNITS: Dict[str, float] = {
+    **dict.fromkeys(("h", "hr", "hrs", "hour", "hours"), 60.0),
+    **dict.fromkeys(("min", "mins", "minute", "minutes"), 1.0),
+}
+# unit word: kilometres per unit; "m" is metres, except right after hours ("1h30m")
+_DISTANCE_UNITS: Dict[str, float] = {
+    **dict.fromkeys(("k", "km", "kms", "kilometer", "kilometers", "kilometre", "kilometres"), 1.0),
+    **dict.fromkeys(("m", "meter", "meters", "metre", "metres"), 0.001),
+    **dict.fromkeys(("mi", "mile", "miles"), 1.609344),
+}
+_WORD_NUMBERS = {"a": 1.0, "an": 1.0, "half a": 0.5, "half an": 0.5}
+
+# Numbers are replaced by "#" so that "ran 5k" and "ran 10k" share one plan
+_NUMBER = re.compile(r"(\d+(?:\.\d+)?)")
+# The remaining patterns run on lowercased text with single spaces
+_CLAUSE_SPLIT = re.compile(r"[,;&]| (?:and|then|plus) ")
+_ACTIVITY = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, _SYNONYMS), key=len, reverse=True)) + r")\b"
+)
+_QUANTITY = re.compile(r"(#|\ban?\b|\bhalf an?)\s*([a-z]+)")
+# Hours and minutes in one token: "1h30", "1h30m", "1 hr 30" (not "1h 5k")
+_HOURS_MINUTES = re.compile(
+    r"#\s*(?:h|hr|hrs)\s*#(?:\s*(?:m|min|mins)\b|(?!\s*(?:"
+    + "|".join(sorted(_DISTANCE_UNITS, key=len, reverse=True))
+    + r")\b))"
+)
+# Characters that can never appear in a phrase the grammar understands
+_UNSUPPORTED = re.compile(r"[^a-z0-9.,;& ]")
+# Words that repeat or divide a duration ("30 minutes twice", "10 min each")
+_REPEATED = re.compile(r"\b(?:twice|thrice|each|every|per)\b")
+
+
+class ClausePlan(NamedTuple):
+    """How to turn the numbers of one clause into minutes.
+
+    ``slots`` holds (number index, minutes per unit) for each number
+    followed by a unit, with distances already converted at the
+    activity's speed; ``minutes`` comes from words such as "an hour".
+    """
+
+    name: str
+    slots: Tuple[Tuple[int, float], ...]
+    minutes: float
+
+
+def compile_shape(shape: str) -> Optional[List[ClausePlan]]:
+    """Compile a phrase with its numbers replaced by "#"; None if it is not understood.
+
+    Every number must be followed by a known unit. A clause with a duration
+    uses it and ignores any distance ("cycled # km in # minutes"); a clause
+    with only a distance uses the activity's speed. "ran #x#k" and "did #
+    sets" are not understood.
+    """
+    plans = []
+    first_slot = 0
+    for clause in _CLAUSE_SPLIT.split(shape):
+        if not clause.strip():
+            continue
+        activity = _ACTIVITY.search(clause)
+        if activity is None:
+            return None
+        name = _SYNONYMS[activity.group(1)]
+        time_slots = []
+        distance_slots = []
+        minutes = 0.0
+        for match in _HOURS_MINUTES.finditer(clause):
+            index = first_slot + clause.count("#", 0, match.start())
+            time_slots += [(index, 60.0), (index + 1, 1.0)]
+        # Blank out "1h30" so its numbers are not read again below
+        rest = _HOURS_MINUTES.sub(lambda match: " " * len(match.group()), clause)
+        for match in _QUANTITY.finditer(rest):
+            unit = match.group(2)
+            if unit in _TIME_UNITS:
+                if match.group(1) == "#":
+                    time_slots.append((first_slot + clause.count("#", 0, match.start()), _TIME_UNITS[unit]))
+                else:
+                    minutes += _WORD_NUMBERS[match.group(1)] * _TIME_UNITS[unit]
+            elif unit in _DISTANCE_UNITS and match.group(1) == "#":
+                distance_slots.append((first_slot + clause.count("#", 0, match.start()), _DISTANCE_UNITS[unit]))
+            elif match.group(1) == "#":
+                return None  # "2x5k", "3 sets": a count, not a duration
+            # else "a yoga class"
+        numbers = clause.count("#")
+        if len(time_slots) + len(distance_slots) != numbers:
+            return None  # A number without a unit ("ran 5")
+        if time_slots or minutes:
+            slots = time_slots + [(index, 0.0) for index, _ in distance_slots]
+        elif len(distance_slots) == 1 and name in SPEED_KMH:
+            [(index, km)] = distance_slots
+            slots = [(index, km * 60 / SPEED_KMH[name])]
+        else:
+            return None  # No duration, and no single distance to derive one from
+        plans.append(ClausePlan(name, tuple(sorted(slots)), minutes))
+        first_slot += numbers
+    return plans or None
+
+
+_plans: Dict[str, Optional[List[ClausePlan]]] = {}
+
+
+def parse_phrase(query: str) -> Optional[List[Tuple[str, float]]]:
+    """Parse a phrase into (activity, minutes) pairs; None if any part is not understood."""
+    text = " ".join(query.lower().split())
+    if not text or _UNSUPPORTED.search(text) or _REPEATED.search(text):
+        return None
+    pieces = _NUMBER.split(text)
+    shape = "#".join(pieces[::2])
+    if shape in _plans:
+        plans = _plans[shape]
+    else:
+        if len(_plans) >= 10_000:
+            _plans.clear()
+        plans = _plans[shape] = compile_shape(shape)
+    if plans is None:
+        return None
+    numbers = pieces[1::2]
+    parsed = []
+    for plan in plans:
+        minutes = plan.minutes
+        for index, minutes_per_unit in plan.slots:
+            minutes += float(numbers[index]) * minutes_per_unit
+        if minutes <= 0:
+            return None  # "ran 0 minutes"
+        parsed.append((plan.name, minutes))
+    return parsed
+
+
+class METEstimator:
+    """Estimate calories locally and return the same model as the Nutritionix API."""
+
+    def _response(self, parsed: List[Tuple[str, float]], kcal_per_minute: Dict[str, float]) -> ExerciseAPIResponse:
+        return ExerciseAPIResponse(exercises=[
+            Exercise(
+                name=name,
+                duration_min=round(minutes, 2),
+                nf_calories=round(kcal_per_minute[name] * minutes, 2),
+            )
+            for name, minutes in parsed
+        ])
+
+    def _kcal_per_minute(self, user_profile: UserProfile) -> Dict[str, float]:
+        factor = user_profile.weight_kg / 60
+        return {name: met * factor for name, met in MET_TABLE.items()}
+
+    def estimate(self, query: str, user_profile: UserProfile) -> Optional[ExerciseAPIResponse]:
+        """Return an estimate, or None when the phrase cannot be parsed."""
+        parsed = parse_phrase(query)
+        if parsed is None:
+            return None
+        return self._response(parsed, self._kcal_per_minute(user_profile))
+
+    def estimate_batch(
+        self, queries: Iterable[str], user_profile: UserProfile
+    ) -> List[Optional[ExerciseAPIResponse]]:
+        """Estimate many phrases for one profile; repeated phrases share one response."""
+        kcal_per_minute = self._kcal_per_minute(user_profile)
+        seen: Dict[str, Optional[ExerciseAPIResponse]] = {}
+        results = []
+        for query in queries:
+            if query in seen:
+                results.append(seen[query])
+                continue
+            parsed = parse_phrase(query)
+            response = None if parsed is None else self._response(parsed, kcal_per_minute)
+            seen[query] = response
+            results.append(response)
+        return results
+
@@ -1,7 +1,7 @@
 """
 Data models for exercise tracker application.
 """
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import List, Any, Dict
 
 
@@ -36,6 +36,10 @@ class ExerciseAPIResponse:
         exercises = [Exercise.from_api_response(ex) for ex in data["exercises"]]
         return cls(exercises=exercises)
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the API response format (inverse of from_dict)."""
+        return {"exercises": [asdict(exercise) for exercise in self.exercises]}
+
 
 @dataclass
 class WorkoutEntry:
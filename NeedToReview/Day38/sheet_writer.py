@@ -0,0 +1,231 @@
+"""
+Batched, crash-safe writes of workout rows to the sheet.
+
+Rows are first appended to a write-ahead file (JSON lines) and only then
+sent to the Sheet API. Each successful write appends an acknowledgement,
+so rows that were never acknowledged (because of a crash or an API error)
+are replayed the next time the writer is opened. Delivery is therefore
+at-least-once: a crash between a successful POST and its acknowledgement
+may send that row again.
+
+Within one run, a row that fails waits in a retry queue with exponential
+backoff instead of going out with every batch. After ``max_attempts``
+failures it is no longer sent in this run, but stays in the write-ahead
+file for the next one.
+"""
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import requests
+
+from api_client import SheetAPIClient
+from models import WorkoutEntry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WAL_PATH = "pending_workouts.jsonl"
+
+
+class BatchedSheetWriter:
+    """Accumulate workout rows and flush them concurrently over one session."""
+
+    def __init__(
+        self,
+        client: SheetAPIClient,
+        wal_path: str = DEFAULT_WAL_PATH,
+        batch_size: int = 500,
+        max_workers: int = 8,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Open the write-ahead file and load rows left over from earlier runs."""
+        self.client = client
+        self.wal_path = wal_path
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.sent = 0
+        self.failed = 0
+        self.given_up = 0
+        self._pending: Dict[int, WorkoutEntry] = self._replay()
+        # Retry queue: failed attempts and the earliest time of the next one, by row id
+        self._attempts: Dict[int, int] = {}
+        self._retry_at: Dict[int, float] = {}
+        self._next_id = max(self._pending, default=-1) + 1
+        if self._pending:
+            logger.info("Replaying %d unsent workout rows from %s", len(self._pending), wal_path)
+        self._compact()
+        self._wal = open(wal_path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "BatchedSheetWriter":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    @property
+    def pending(self) -> int:
+        """Number of rows not yet acknowledged by the sheet."""
+        return len(self._pending)
+
+    def _replay(self) -> Dict[int, WorkoutEntry]:
+        """Read the write-ahead file and return rows without an acknowledgement."""
+        pending: Dict[int, WorkoutEntry] = {}
+        if not os.path.exists(self.wal_path):
+            return pending
+        with open(self.wal_path, encoding="utf-8") as wal:
+            for line in wal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Partially written last line
+                if record.get("op") == "add":
+                    pending[record["id"]] = WorkoutEntry(**record["row"])
+                elif record.get("op") == "ack":
+                    pending.pop(record["id"], None)
+        return pending
+
+    def _compact(self) -> None:
+        """Rewrite the write-ahead file with only the unacknowledged rows."""
+        tmp_path = f"{self.wal_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            for row_id, entry in self._pending.items():
+                out.write(json.dumps({"op": "add", "id": row_id, "row": asdict(entry)}) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self.wal_path)
+
+    def add(self, workout: WorkoutEntry) -> None:
+        """Record a row in the write-ahead file; flush when a batch is full."""
+        self.add_many([workout])
+
+    def add_many(self, workouts: Iterable[WorkoutEntry]) -> None:
+        """Record many rows with a single fsync."""
+        lines = []
+        for workout in workouts:
+            row_id = self._next_id
+            self._next_id += 1
+            self._pending[row_id] = workout
+            lines.append(json.dumps({"op": "add", "id": row_id, "row": asdict(workout)}) + "\n")
+        self._wal.writelines(lines)
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def _send(self, item: Tuple[int, WorkoutEntry]) -> bool:
+        row_id, workout = item
+        try:
+            response = self.client.add_workout(workout)
+        except requests.RequestException as e:
+            logger.error("Failed to add workout to sheet: %s", e)
+            return False
+        self.client.log_request_details(workout, response)
+        if not response.ok:
+            logger.error("Sheet API returned %s: %s", response.status_code, response.text)
+            return False
+        with self._lock:
+            self._wal.write(json.dumps({"op": "ack", "id": row_id}) + "\n")
+        return True
+
+    def _due(self, now: float) -> List[Tuple[int, WorkoutEntry]]:
+        """Pending rows that are new or whose backoff has elapsed."""
+        return [
+            (row_id, entry)
+            for row_id, entry in sorted(self._pending.items())
+            if self._attempts.get(row_id, 0) < self.max_attempts and self._retry_at.get(row_id, now) <= now
+        ]
+
+    def _failed(self, row_id: int, now: float) -> None:
+        attempts = self._attempts[row_id] = self._attempts.get(row_id, 0) + 1
+        if attempts >= self.max_attempts:
+            self._retry_at.pop(row_id, None)
+            self.given_up += 1
+            logger.error(
+                "Giving up on workout row %d after %d attempts; it stays in %s", row_id, attempts, self.wal_path
+            )
+        else:
+            self._retry_at[row_id] = now + min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+
+    def flush(self) -> int:
+        """Send the rows that are due concurrently and return how many succeeded.
+
+        Rows waiting out a backoff are skipped until their retry time.
+        """
+        now = self.clock()
+        items = self._due(now)
+        if not items:
+            return 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self._send, items))
+        sent = 0
+        for (row_id, _), ok in zip(items, results):
+            if ok:
+                del self._pending[row_id]
+                self._attempts.pop(row_id, None)
+                self._retry_at.pop(row_id, None)
+                sent += 1
+            else:
+                self._failed(row_id, now)
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+        self.sent += sent
+        self.failed += len(items) - sent
+        if not self._pending:
+            # Everything is acknowledged: start over with an empty file
+            self._wal.close()
+            self._compact()
+            self._wal = open(self.wal_path, "a", encoding="utf-8")
+        return sent
+
+    def drain(self) -> None:
+        """Flush until every row is sent or has used up its attempts, sleeping through the backoff."""
+        self.flush()
+        while self._retry_at:
+            self.sleep(max(0.0, min(self._retry_at.values()) - self.clock()))
+            self.flush()
+
+    def close(self) -> None:
+        """Flush remaining rows and close the write-ahead file."""
+        self.flush()
+        self._wal.close()
+
+
+def load_history(path: str) -> List[WorkoutEntry]:
+    """Load a workout history CSV with date,time,exercise,duration,calories columns."""
+    with open(path, newline="", encoding="utf-8") as history:
+        return [
+            WorkoutEntry(
+                date=row["date"],
+                time=row["time"],
+                exercise=row["exercise"],
+                duration=float(row["duration"]),
+                calories=float(row["calories"]),
+            )
+            for row in csv.DictReader(history)
+        ]
+
+
+def import_history(path: str, writer: BatchedSheetWriter) -> int:
+    """Import a workout history file through the batched writer."""
+    entries = load_history(path)
+    for start in range(0, len(entries), writer.batch_size):
+        writer.add_many(entries[start:start + writer.batch_size])
+    writer.drain()
+    return len(entries)
+
@@ -0,0 +1,133 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List
+
+import pytest
+
+from api_client import NutritionixAPIClient
+from config import APICredentials, UserProfile
+from exercise_cache import ExerciseQueryCache, cache_key, normalize_query
+from models import Exercise, ExerciseAPIResponse
+
+PROFILE = UserProfile(gender="female", weight_kg=60, height_cm=165, age=30)
+
+
+class NutritionixStub:
+    """Local Nutritionix stand-in that answers "ran <n>k" and records each query."""
+
+    def __init__(self) -> None:
+        self.queries: List[str] = []
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:  # noqa: N802
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with lock:
+                    stub.queries.append(body["query"])
+                minutes = float(re.search(r"\d+", body["query"]).group()) * 6
+                payload = json.dumps({"exercises": [{
+                    "name": "running",
+                    "duration_min": minutes,
+                    "nf_calories": round(minutes * body["weight_kg"] * 9.8 * 3.5 / 200, 2),
+                }]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v2"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def nutritionix() -> Iterator[NutritionixStub]:
+    stub = NutritionixStub()
+    yield stub
+    stub.server.shutdown()
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def response(minutes: float) -> ExerciseAPIResponse:
+    return ExerciseAPIResponse([Exercise("running", minutes, minutes * 10)])
+
+
+def test_keys_ignore_spelling_but_not_profile() -> None:
+    assert normalize_query("  Ran 5K! ") == normalize_query("ran 5k") == "ran 5k"
+    assert normalize_query("Swam 1.5 km.") == "swam 1.5 km"
+    heavier = UserProfile(gender="female", weight_kg=70, height_cm=165, age=30)
+    assert cache_key("Ran 5K!", PROFILE) == cache_key("ran 5k", PROFILE) != cache_key("ran 5k", heavier)
+
+
+def test_repeated_queries_reach_the_api_once(nutritionix: NutritionixStub, tmp_path) -> None:
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ExerciseQueryCache(path)
+    client = NutritionixAPIClient(APICredentials(app_id="id", api_key="key"), cache=cache)
+    client.BASE_URL = nutritionix.base_url
+    # 50 distinct phrases entered over and over in different spellings
+    phrases = [f"{'Ran' if i % 2 else 'ran'} {i % 50 + 1}k{'!' if i % 3 == 0 else ''}" for i in range(2000)]
+
+    first = [client.get_exercises(phrase, PROFILE) for phrase in phrases]
+    assert len(nutritionix.queries) == 50
+    assert cache.stats() == {"memory_hits": 1950, "disk_hits": 0, "misses": 50, "hit_rate": 0.975}
+    assert first[0].exercises[0].duration_min == 6
+    cache.close()
+
+    # After a restart the SQLite tier answers without calling the API
+    reopened = ExerciseQueryCache(path)
+    client.cache = reopened
+    assert [client.get_exercises(phrase, PROFILE) for phrase in phrases[:50]] == first[:50]
+    assert len(nutritionix.queries) == 50
+    assert reopened.disk_hits == 50
+    reopened.close()
+
+
+def test_entries_expire_after_the_ttl(tmp_path) -> None:
+    clock = FakeClock()
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ExerciseQueryCache(path, ttl=60, clock=clock)
+    cache.put("ran 5k", PROFILE, response(30))
+    clock.now += 59
+    assert cache.get("ran 5k", PROFILE) == response(30)
+    clock.now += 1
+    assert cache.get("ran 5k", PROFILE) is None
+    cache.close()
+
+    # Reopening drops the expired rows from disk
+    reopened = ExerciseQueryCache(path, clock=clock)
+    assert reopened._db.execute("SELECT COUNT(*) FROM exercise_cache").fetchone() == (0,)
+    reopened.close()
+
+
+def test_lru_falls_back_to_the_disk_tier(tmp_path) -> None:
+    cache = ExerciseQueryCache(str(tmp_path / "cache.sqlite3"), capacity=2)
+    for minutes in (10, 20, 30):
+        cache.put(f"ran {minutes} minutes", PROFILE, response(minutes))
+    assert cache.get("ran 10 minutes", PROFILE) == response(10)
+    assert (cache.memory_hits, cache.disk_hits) == (0, 1)
+    assert cache.get("ran 30 minutes", PROFILE) == response(30)
+    assert cache.memory_hits == 1
+    cache.close()
+
+
+def test_in_memory_cache_without_a_path() -> None:
+    cache = ExerciseQueryCache(None)
+    assert cache.get("yoga 1 hour", PROFILE) is None
+    cache.put("yoga 1 hour", PROFILE, response(60))
+    assert cache.get("Yoga, 1 hour", PROFILE) == response(60)
+    assert cache.hit_rate == 0.5
+    cache.close()
@@ -0,0 +1,124 @@
+from typing import List, Optional
+
+import pytest
+import requests
+
+from api_client import NutritionixAPIClient
+from config import APICredentials, UserProfile
+from met_estimator import MET_TABLE, SPEED_KMH, METEstimator, parse_phrase
+from models import Exercise, ExerciseAPIResponse
+
+PROFILE = UserProfile(gender="female", weight_kg=60, height_cm=165, age=30)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("ran for 30 minutes", [("running", 30.0)]),
+    ("Swam 45 min", [("swimming", 45.0)]),
+    ("1 hour of yoga and walked 20 minutes", [("yoga", 60.0), ("walking", 20.0)]),
+    ("cycled 20 km in 60 minutes", [("cycling", 60.0)]),
+    ("half an hour of tennis", [("tennis", 30.0)]),
+    ("ran 1 hour 30 minutes", [("running", 90.0)]),
+    ("walked 1.5 hours", [("walking", 90.0)]),
+    ("a yoga class for 45 mins", [("yoga", 45.0)]),
+    ("hiked 2 hrs, swam 30 mins", [("hiking", 120.0), ("swimming", 30.0)]),
+    ("ran 1h30", [("running", 90.0)]),
+    ("ran 1h30m", [("running", 90.0)]),
+    ("cycled 2 hr 15 and swam 20 minutes", [("cycling", 135.0), ("swimming", 20.0)]),
+    ("ran 1h 5k", [("running", 60.0)]),
+])
+def test_phrases_with_a_duration(query: str, expected: list) -> None:
+    assert parse_phrase(query) == expected
+
+
+@pytest.mark.parametrize("query, name, km", [
+    ("ran 5k", "running", 5.0),
+    ("swam 1500m", "swimming", 1.5),
+    ("ran 400 m", "running", 0.4),
+    ("walked 2 miles", "walking", 2 * 1.609344),
+    ("cycled 20 km", "cycling", 20.0),
+])
+def test_distances_use_the_activity_speed(query: str, name: str, km: float) -> None:
+    assert parse_phrase(query) == [(name, pytest.approx(km / SPEED_KMH[name] * 60))]
+
+
+def test_durations_and_distances_mix_across_clauses() -> None:
+    assert parse_phrase("1 hour of yoga and walked 4.8 km") == [("yoga", 60.0), ("walking", pytest.approx(60.0))]
+
+
+@pytest.mark.parametrize("query", [
+    # "m" is metres; activities without a speed and several distances are not guessed
+    "30m yoga",
+    "danced 5k",
+    "hiked 10 km with 500 m elevation",
+    # Repetitions and counts
+    "ran 2x5k",
+    "ran 30 minutes 3 times",
+    "lifted weights 3 sets 30 minutes",
+    "swam 10 min twice",
+    "ran 4 laps of 5 minutes each",
+    # Numbers without a unit, nonsense and unsupported syntax
+    "ran 5",
+    "ran 0 minutes",
+    "did something odd for 20 minutes",
+    "ran 5k in 25:30",
+    "",
+])
+def test_ambiguous_phrases_fall_back_to_the_api(query: str) -> None:
+    assert parse_phrase(query) is None
+
+
+def test_calories_follow_met_times_weight_times_hours() -> None:
+    [exercise] = METEstimator().estimate("ran for 30 minutes", PROFILE).exercises
+    assert exercise == Exercise("running", 30.0, round(MET_TABLE["running"] * 60 * 0.5, 2))
+
+
+def test_batch_matches_single_estimates_and_shares_repeats() -> None:
+    queries = ["ran for 30 minutes", "ran 2x5k", "Ran for 30 minutes", "ran for 30 minutes", "1 hour of tennis"]
+    estimator = METEstimator()
+    batch = estimator.estimate_batch(queries, PROFILE)
+    assert batch == [estimator.estimate(query, PROFILE) for query in queries]
+    assert batch[1] is None
+    assert batch[0] is batch[3]
+
+
+class FakeAPIClient(NutritionixAPIClient):
+    """Records queries and answers with ``answer``, or raises it."""
+
+    def __init__(self, answer: object, estimator: Optional[METEstimator] = None) -> None:
+        super().__init__(APICredentials(app_id="id", api_key="key"), estimator=estimator)
+        self.answer = answer
+        self.asked: List[str] = []
+
+    def fetch_exercises(self, query: str, user_profile: UserProfile) -> ExerciseAPIResponse:
+        self.asked.append(query)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+def test_client_asks_the_api_first() -> None:
+    api = ExerciseAPIResponse([Exercise("swimming", 30.0, 180.0)])
+    client = FakeAPIClient(api, estimator=METEstimator())
+    assert client.get_exercises("swam for 30 minutes", PROFILE) is api
+    assert client.get_exercises("swam 1500m", PROFILE) is api
+    assert client.asked == ["swam for 30 minutes", "swam 1500m"]
+
+
+@pytest.mark.parametrize("answer", [
+    requests.ConnectionError("offline"),
+    requests.HTTPError("503 Server Error"),
+    ValueError("API error: {}"),
+    ExerciseAPIResponse([]),
+])
+def test_estimate_is_used_when_the_api_fails_or_finds_nothing(answer: object) -> None:
+    client = FakeAPIClient(answer, estimator=METEstimator())
+    assert client.get_exercises("ran 5k", PROFILE) == METEstimator().estimate("ran 5k", PROFILE)
+    assert client.asked == ["ran 5k"]
+
+
+def test_api_errors_surface_without_an_estimate() -> None:
+    with pytest.raises(requests.ConnectionError):
+        FakeAPIClient(requests.ConnectionError("offline"), estimator=METEstimator()).get_exercises("ran 2x5k", PROFILE)
+    with pytest.raises(requests.ConnectionError):
+        FakeAPIClient(requests.ConnectionError("offline")).get_exercises("ran 5k", PROFILE)
+    assert FakeAPIClient(ExerciseAPIResponse([]), estimator=METEstimator()).get_exercises("ran 2x5k", PROFILE).exercises == []
@@ -0,0 +1,256 @@
+import csv
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Set
+
+import pytest
+import requests
+
+from api_client import SheetAPIClient
+from config import SheetConfig
+from models import WorkoutEntry
+from sheet_writer import BatchedSheetWriter, import_history, load_history
+
+EXERCISES = ["Running", "Cycling", "Swimming", "Walking", "Yoga"]
+
+
+class SheetyStub:
+    """Local Sheety stand-in that records rows and the client ports they came from."""
+
+    def __init__(self) -> None:
+        self.rows: List[dict] = []
+        self.ports: Set[int] = set()
+        self.fail_exercises: Set[str] = set()
+        self.posts = 0
+        self.latency = 0.0
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Send headers and body in one packet on keep-alive connections
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:  # noqa: N802
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                workout = body["workout"]
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with lock:
+                    stub.posts += 1
+                    stub.ports.add(self.client_address[1])
+                    failed = workout["exercise"] in stub.fail_exercises
+                    if not failed:
+                        stub.rows.append(workout)
+                        row_id = len(stub.rows)
+                if failed:
+                    payload = json.dumps({"errors": [{"detail": "Bad Request"}]}).encode()
+                    self.send_response(400)
+                else:
+                    payload = json.dumps({"workout": {**workout, "id": row_id}}).encode()
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.config = SheetConfig(
+            endpoint=f"http://127.0.0.1:{self.server.server_address[1]}/workouts",
+            username="user",
+            basic_token="token",
+            email=None,
+        )
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def sheety() -> Iterator[SheetyStub]:
+    stub = SheetyStub()
+    yield stub
+    stub.server.shutdown()
+
+
+@pytest.fixture
+def client(sheety: SheetyStub) -> Iterator[SheetAPIClient]:
+    sheet_client = SheetAPIClient(sheety.config)
+    yield sheet_client
+    sheet_client.close()
+
+
+def workout(i: int) -> WorkoutEntry:
+    return WorkoutEntry(
+        date=f"{1 + i % 28:02d}/{1 + i // 28 % 12:02d}/{2000 + i // 336}",
+        time=f"{6 + i % 12:02d}:00:00",
+        exercise=EXERCISES[i % 5],
+        duration=float(30 + i % 60),
+        calories=float(200 + i % 400),
+    )
+
+
+def write_history(path: str, rows: int) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as history:
+        writer = csv.writer(history)
+        writer.writerow(["date", "time", "exercise", "duration", "calories"])
+        for i in range(rows):
+            entry = workout(i)
+            writer.writerow([entry.date, entry.time, entry.exercise, entry.duration, entry.calories])
+
+
+def test_import_sends_every_row_over_pooled_connections(sheety: SheetyStub, client: SheetAPIClient, tmp_path) -> None:
+    history_path = str(tmp_path / "history.csv")
+    write_history(history_path, 1000)
+    wal_path = str(tmp_path / "wal.jsonl")
+
+    with BatchedSheetWriter(client, wal_path=wal_path, max_workers=8) as writer:
+        assert import_history(history_path, writer) == 1000
+        assert (writer.sent, writer.failed, writer.pending) == (1000, 0, 0)
+
+    assert len(sheety.rows) == 1000
+    assert sorted(row["date"] + row["time"] for row in sheety.rows) == sorted(
+        entry.date + entry.time for entry in load_history(history_path)
+    )
+    # Keep-alive connections are reused instead of one connection per row
+    assert len(sheety.ports) <= 8
+    # Everything was acknowledged, so the write-ahead file starts over empty
+    with open(wal_path, encoding="utf-8") as wal:
+        assert wal.read() == ""
+
+
+def test_failed_rows_are_replayed_on_the_next_run(sheety: SheetyStub, client: SheetAPIClient, tmp_path) -> None:
+    wal_path = str(tmp_path / "wal.jsonl")
+    sheety.fail_exercises = {"Yoga"}
+    with BatchedSheetWriter(client, wal_path=wal_path) as writer:
+        writer.add_many(workout(i) for i in range(20))
+    assert (writer.sent, writer.failed, writer.pending) == (16, 4, 4)
+
+    sheety.fail_exercises = set()
+    with BatchedSheetWriter(client, wal_path=wal_path) as replayed:
+        assert replayed.pending == 4
+    assert replayed.sent == 4
+    assert len(sheety.rows) == 20
+    assert sorted(row["exercise"] for row in sheety.rows).count("Yoga") == 4
+
+
+def test_unsent_rows_survive_a_crash(sheety: SheetyStub, client: SheetAPIClient, tmp_path) -> None:
+    wal_path = str(tmp_path / "wal.jsonl")
+    writer = BatchedSheetWriter(client, wal_path=wal_path, batch_size=100)
+    writer.add_many(workout(i) for i in range(10))
+    # Simulate a crash: no flush, and a torn last line in the write-ahead file
+    writer._wal.write('{"op": "add", "id": 99, "ro')
+    writer._wal.close()
+    assert sheety.rows == []
+
+    with BatchedSheetWriter(client, wal_path=wal_path) as replayed:
+        assert replayed.pending == 10
+        replayed.add(workout(10))
+    assert sorted(row["calories"] for row in sheety.rows) == sorted(workout(i).calories for i in range(11))
+
+
+def test_batches_flush_when_full(sheety: SheetyStub, client: SheetAPIClient, tmp_path) -> None:
+    with BatchedSheetWriter(client, wal_path=str(tmp_path / "wal.jsonl"), batch_size=5) as writer:
+        for i in range(4):
+            writer.add(workout(i))
+        assert writer.pending == 4 and not sheety.rows
+        writer.add(workout(4))
+        assert writer.pending == 0 and len(sheety.rows) == 5
+
+
+def test_debug_log_masks_the_token(sheety: SheetyStub, client: SheetAPIClient, tmp_path, caplog) -> None:
+    with caplog.at_level(logging.DEBUG, logger="api_client"):
+        with BatchedSheetWriter(client, wal_path=str(tmp_path / "wal.jsonl")) as writer:
+            writer.add(workout(0))
+    assert "Basic ***" in caplog.text
+    assert "Basic token" not in caplog.text
+
+
+class Clock:
+    """Manually advanced clock standing in for time.monotonic."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_failed_rows_back_off_and_are_capped(sheety: SheetyStub, client: SheetAPIClient, tmp_path) -> None:
+    sheety.fail_exercises = {"Yoga"}
+    clock = Clock()
+    writer = BatchedSheetWriter(
+        client, wal_path=str(tmp_path / "wal.jsonl"), max_attempts=3, backoff=1, clock=clock, sleep=clock.sleep
+    )
+    writer.add_many(workout(i) for i in range(20))
+    assert writer.flush() == 16
+    assert sheety.posts == 20
+
+    # Later batches do not resend the failed rows while they wait
+    writer.add_many(workout(i) for i in range(20, 24))
+    assert writer.flush() == 4
+    assert sheety.posts == 24
+
+    # 1 s, then 2 s, then the third failure ends the retries for this run
+    for advance, posts in [(1, 28), (1, 28), (1, 32), (10, 32)]:
+        clock.now += advance
+        writer.flush()
+        assert sheety.posts == posts
+    assert (writer.sent, writer.failed, writer.given_up, writer.pending) == (20, 12, 4, 4)
+    writer.close()
+
+    # The rows stay in the write-ahead file for the next run
+    sheety.fail_exercises = set()
+    with BatchedSheetWriter(client, wal_path=str(tmp_path / "wal.jsonl")) as replayed:
+        assert replayed.pending == 4
+    assert len(sheety.rows) == 24
+
+
+def test_drain_sleeps_through_the_backoff(sheety: SheetyStub, client: SheetAPIClient, tmp_path) -> None:
+    sheety.fail_exercises = {"Yoga"}
+    clock = Clock()
+    sleeps: List[float] = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        clock.sleep(seconds)
+
+    with BatchedSheetWriter(
+        client, wal_path=str(tmp_path / "wal.jsonl"), max_attempts=4, backoff=2, max_backoff=5, clock=clock, sleep=sleep
+    ) as writer:
+        writer.add_many(workout(i) for i in range(10))
+        writer.drain()
+    assert sleeps == [2, 4, 5]
+    assert (writer.sent, writer.given_up, sheety.posts) == (8, 2, 16)
+
+
+@pytest.mark.slow
+def test_import_of_fifty_thousand_rows(sheety: SheetyStub, client: SheetAPIClient, tmp_path) -> None:
+    history_path = str(tmp_path / "history.csv")
+    write_history(history_path, 50_000)
+    sheety.latency = 0.005
+
+    # The old path: one new connection per row, one row at a time (timed on a sample)
+    sample = load_history(history_path)[:500]
+    start = time.perf_counter()
+    for entry in sample:
+        requests.post(sheety.config.endpoint, json=entry.to_sheet_payload(), auth=("user", "token"))
+    sequential = (time.perf_counter() - start) / len(sample) * 50_000
+
+    del sheety.rows[:]
+    start = time.perf_counter()
+    with BatchedSheetWriter(client, wal_path=str(tmp_path / "wal.jsonl")) as writer:
+        assert import_history(history_path, writer) == 50_000
+    batched = time.perf_counter() - start
+
+    print(f"\nsequential (estimated): {sequential:.1f} s, batched: {batched:.1f} s ({50_000 / batched:,.0f} rows/s)")
+    assert len(sheety.rows) == 50_000
+    assert batched < sequential